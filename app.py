@@ -1,17 +1,71 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, Response
+import json
+import math
 import os
+from typing import Any, Dict, Tuple
 from datetime import datetime
 from config import Config
 from chatbot.intents_manager import IntentsManager
 from chatbot.response_generator import ResponseGenerator
+from chatbot.utils.conversation_writer import ConversationWriter
+from chatbot.utils.session_store import SessionStore
+from chatbot.utils.admission import AdmissionController, ADMIT, DEGRADE, RATE_LIMITED
+from chatbot.utils.metrics import render_prometheus
 
 app = Flask(__name__)
 app.config.from_object(Config)
 
 # Inicializar componentes del chatbot
 try:
-    intents_manager = IntentsManager(Config.INTENTS_FILE, min_confidence=Config.MIN_CONFIDENCE)
-    response_generator = ResponseGenerator(intents_manager)
+    conversation_writer = None
+    if Config.ENABLE_LOGGING:
+        conversation_writer = ConversationWriter(
+            Config.CONVERSATIONS_DIR,
+            max_queue_size=Config.CONVERSATION_LOG_QUEUE_SIZE,
+            flush_interval=Config.CONVERSATION_LOG_FLUSH_INTERVAL,
+            batch_size=Config.CONVERSATION_LOG_BATCH_SIZE,
+            max_file_bytes=Config.CONVERSATION_LOG_MAX_BYTES,
+            rotate_interval=Config.CONVERSATION_LOG_ROTATE_SECONDS
+        )
+    
+    intents_manager = IntentsManager(
+        Config.INTENTS_FILE,
+        min_confidence=Config.MIN_CONFIDENCE,
+        matcher_backend=Config.MATCHER_BACKEND,
+        cache_size=Config.RESULT_CACHE_SIZE,
+        conversation_writer=conversation_writer,
+        enable_fuzzy=Config.ENABLE_FUZZY_MATCHING,
+        fuzzy_min_similarity=Config.FUZZY_MIN_SIMILARITY,
+        fuzzy_weight=Config.FUZZY_WEIGHT,
+        fuzzy_time_budget_ms=Config.FUZZY_TIME_BUDGET_MS,
+        metrics_sample_rate=Config.METRICS_SAMPLE_RATE,
+        compiled_file=Config.COMPILED_INTENTS_FILE,
+        max_suggestions=Config.MAX_SUGGESTIONS,
+        suggestion_min_confidence=Config.SUGGESTION_MIN_CONFIDENCE,
+        context_boost=Config.CONTEXT_BOOST,
+        context_decay=Config.CONTEXT_DECAY,
+        bm25_k1=Config.BM25_K1,
+        bm25_b=Config.BM25_B
+    )
+    
+    # Se crea al importar: con serve.py la tabla queda compartida entre todos los workers
+    session_store = None
+    if Config.SESSION_MAX_SESSIONS:
+        session_store = SessionStore(
+            Config.SESSION_MAX_SESSIONS,
+            ttl=Config.SESSION_TTL_SECONDS,
+            history=Config.SESSION_HISTORY
+        )
+    # Token bucket por cliente y límite de peticiones de chat en curso (serve.py lo reemplaza por uno para N workers)
+    admission = AdmissionController(
+        rate=Config.ADMISSION_RATE,
+        burst=Config.ADMISSION_BURST,
+        max_clients=Config.ADMISSION_MAX_CLIENTS,
+        max_concurrent=Config.ADMISSION_MAX_CONCURRENT,
+        degrade_at=Config.ADMISSION_DEGRADE_AT
+    )
+    response_generator = ResponseGenerator(intents_manager, session_store, prerender=Config.PRERENDER_RESPONSES)
+    intents_manager.start_auto_reload(Config.INTENTS_RELOAD_INTERVAL)
     print("✅ Chatbot inicializado correctamente")
 except Exception as e:
     print(f"❌ Error inicializando chatbot: {e}")
@@ -22,11 +76,61 @@ def home():
     """Página principal del chatbot"""
     return render_template('index.html')
 
+def client_address() -> str:
+    """Identidad del cliente para el rate limiting: IP remota (o la de X-Forwarded-For detrás de un proxy de confianza)"""
+    if Config.ADMISSION_TRUST_FORWARDED:
+        forwarded = request.headers.get('X-Forwarded-For', '')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.remote_addr or ''
+
+def rejection_payload(decision: str) -> Dict[str, Any]:
+    """Cuerpo del 429 de control de admisión (compartido con asgi.py)"""
+    if decision == RATE_LIMITED:
+        message = '⏳ Estás enviando mensajes muy rápido. Espera un momento antes de continuar.'
+    else:
+        message = '⏳ El servidor está ocupado. Por favor, intenta nuevamente en un momento.'
+    return {
+        'response': message,
+        'status': 'error',
+        'reason': decision,
+        'timestamp': datetime.now().isoformat()
+    }
+
+def batch_cost(messages) -> int:
+    """Tokens de admisión de un lote: uno por mensaje (un lote inválido se rechaza antes de procesarse)"""
+    if isinstance(messages, list) and 0 < len(messages) <= Config.MAX_BATCH_SIZE:
+        return len(messages)
+    return 1
+
+def invalid_payload() -> Dict[str, Any]:
+    """Cuerpo del 400 para una petición que no es un objeto JSON (compartido con asgi.py)"""
+    return {
+        'response': 'La petición debe ser un objeto JSON.',
+        'status': 'error',
+        'timestamp': datetime.now().isoformat()
+    }
+
+def rejection_response(decision: str, retry_after: float):
+    """429 inmediato del control de admisión: no se encola ni se procesa el mensaje"""
+    return jsonify(rejection_payload(decision)), 429, {'Retry-After': str(math.ceil(retry_after))}
+
 @app.route('/chat', methods=['POST'])
 def chat():
     """Endpoint para procesar mensajes del chat"""
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify(invalid_payload()), 400
+    
+    decision, retry_after = admission.admit(client_address())
+    if decision not in (ADMIT, DEGRADE):
+        return rejection_response(decision, retry_after)
+    
+    stage_metrics = intents_manager.stage_metrics
+    stage_metrics.begin()
     try:
-        user_message = request.json.get('message', '').strip()
+        user_message = str(payload.get('message', '')).strip()
+        session_id = payload.get('session_id')
         
         if not user_message:
             return jsonify({
@@ -35,10 +139,15 @@ def chat():
                 'timestamp': datetime.now().isoformat()
             })
         
-        # Obtener respuesta del chatbot
-        bot_response = response_generator.get_response(user_message)
+        # Obtener respuesta del chatbot (cuerpo JSON ya codificado); bajo sobrecarga, sin scoring
+        if decision == DEGRADE:
+            body = response_generator.render_degraded(user_message)
+        else:
+            body = response_generator.render_response(user_message, session_id)
         
-        return jsonify(bot_response)
+        response = Response(body, mimetype='application/json')
+        stage_metrics.mark("serialization")
+        return response
         
     except Exception as e:
         app.logger.error(f"Error en endpoint /chat: {e}")
@@ -47,14 +156,188 @@ def chat():
             'status': 'error',
             'timestamp': datetime.now().isoformat()
         }), 500
+    finally:
+        stage_metrics.end()
+        admission.release()
+
+def sse_event(event: str, data: dict) -> str:
+    """Formatea un evento Server-Sent Events (el JSON no contiene saltos de línea)"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Endpoint de /chat en streaming (SSE): tag y confianza de inmediato, luego el texto por fragmentos"""
+    # El cuerpo se valida antes de la admisión: después, todo error debe liberar la petición en curso
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify(invalid_payload()), 400
+    
+    decision, retry_after = admission.admit(client_address())
+    if decision not in (ADMIT, DEGRADE):
+        return rejection_response(decision, retry_after)
+    
+    stage_metrics = intents_manager.stage_metrics
+    stage_metrics.begin()
+    user_message = str(payload.get('message', '')).strip()
+    session_id = payload.get('session_id')
+    
+    def generate():
+        try:
+            if not user_message:
+                yield sse_event('error', {
+                    'response': 'Por favor, escribe tu mensaje.',
+                    'status': 'error',
+                    'timestamp': datetime.now().isoformat()
+                })
+                return
+            
+            for event, data in response_generator.stream_response(user_message, session_id, Config.STREAM_CHUNK_SIZE,
+                                                                  degraded=decision == DEGRADE):
+                message = sse_event(event, data)
+                if event == 'meta':
+                    stage_metrics.mark("serialization")
+                yield message
+        except Exception as e:
+            app.logger.error(f"Error en endpoint /chat/stream: {e}")
+            yield sse_event('error', {
+                'response': '❌ Lo siento, ha ocurrido un error en el sistema. Por favor, intenta nuevamente.',
+                'status': 'error',
+                'timestamp': datetime.now().isoformat()
+            })
+        finally:
+            # El generador corre en el mismo hilo de la petición, después de retornar la vista
+            stage_metrics.end()
+    
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # La petición sigue en curso hasta terminar el stream; call_on_close se ejecuta aunque el
+    # cliente se desconecte antes de leer el primer evento
+    response.call_on_close(admission.release)
+    return response
+
+def process_batch(messages, degraded: bool = False) -> Tuple[Dict[str, Any], int]:
+    """Valida y clasifica un lote; retorna (cuerpo, código HTTP). Compartido con asgi.py"""
+    if not isinstance(messages, list) or not messages:
+        return {
+            'response': 'Por favor, envía una lista de mensajes en el campo "messages".',
+            'status': 'error',
+            'timestamp': datetime.now().isoformat()
+        }, 400
+    
+    if len(messages) > Config.MAX_BATCH_SIZE:
+        return {
+            'response': f'El lote excede el máximo de {Config.MAX_BATCH_SIZE} mensajes.',
+            'status': 'error',
+            'timestamp': datetime.now().isoformat()
+        }, 413
+    
+    user_messages = [message.strip() if isinstance(message, str) else '' for message in messages]
+    valid_messages = [message for message in user_messages if message]
+    
+    # Clasificar todos los mensajes válidos en una sola pasada
+    bot_responses = iter(response_generator.get_responses(valid_messages, degraded))
+    
+    responses = []
+    for message in user_messages:
+        if message:
+            responses.append(next(bot_responses))
+        else:
+            responses.append({
+                'response': 'Por favor, escribe tu mensaje.',
+                'status': 'error',
+                'timestamp': datetime.now().isoformat()
+            })
+    
+    return {
+        'responses': responses,
+        'count': len(responses),
+        'status': 'success',
+        'timestamp': datetime.now().isoformat()
+    }, 200
+
+@app.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    """Endpoint para procesar un lote de mensajes en una sola petición"""
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify(invalid_payload()), 400
+    messages = payload.get('messages')
+    # Un token de admisión por mensaje: un lote no evade el límite por cliente
+    decision, retry_after = admission.admit(client_address(), batch_cost(messages))
+    if decision not in (ADMIT, DEGRADE):
+        return rejection_response(decision, retry_after)
+    
+    try:
+        payload, status_code = process_batch(messages, decision == DEGRADE)
+        return jsonify(payload), status_code
+        
+    except Exception as e:
+        app.logger.error(f"Error en endpoint /chat/batch: {e}")
+        return jsonify({
+            'response': '❌ Lo siento, ha ocurrido un error en el sistema. Por favor, intenta nuevamente.',
+            'status': 'error',
+            'timestamp': datetime.now().isoformat()
+        }), 500
+    finally:
+        admission.release()
+
+def collect_statistics() -> Dict[str, Any]:
+    """Estadísticas del chatbot, sesiones, fragmentos de respuesta y control de admisión (compartido con asgi.py)"""
+    stats = intents_manager.get_statistics()
+    stats['sessions'] = session_store.get_statistics() if session_store is not None else None
+    stats['response_fragments'] = response_generator.get_fragment_statistics()
+    stats['admission'] = admission.get_statistics()
+    return stats
+
+def render_metrics() -> str:
+    """Contadores, gauges e histogramas por etapa en formato de texto de Prometheus"""
+    stats = collect_statistics()
+    cache = stats['result_cache']
+    writer = stats['conversation_writer'] or {}
+    sessions = stats['sessions'] or {}
+    admission_stats = stats['admission']
+    
+    counters = {
+        'queries_total': stats['total_queries'],
+        'recognized_intents_total': stats['recognized_intents'],
+        'unknown_intents_total': stats['unknown_intents'],
+        'fuzzy_expansions_total': stats['fuzzy_expansions'],
+        'fuzzy_budget_exhausted_total': stats['fuzzy_budget_exhausted'],
+        'result_cache_hits_total': cache['hits'],
+        'result_cache_misses_total': cache['misses'],
+        'result_cache_evictions_total': cache['evictions'],
+        'intents_reloads_total': stats['intents_reloads'],
+        'conversation_log_written_total': writer.get('written', 0),
+        'conversation_log_dropped_total': writer.get('dropped', 0),
+        'sessions_created_total': sessions.get('created', 0),
+        'sessions_evicted_total': sessions.get('evictions', 0),
+        'sessions_expired_total': sessions.get('expirations', 0),
+        'admission_degraded_total': admission_stats['degraded'],
+        'admission_rate_limited_total': admission_stats['rate_limited'],
+        'admission_overloaded_total': admission_stats['overloaded']
+    }
+    gauges = {
+        'average_confidence': stats['average_confidence'],
+        'result_cache_size': cache['size'],
+        'intents_version': stats['intents_version'],
+        'conversation_log_size': stats['conversation_log_size'],
+        'conversation_log_queue_size': writer.get('queue_size', 0),
+        'sessions_active': sessions.get('active', 0),
+        'admission_in_flight': admission_stats['in_flight']
+    }
+    
+    # Con serve.py los histogramas por etapa se suman entre workers (no dependen de quién responde)
+    return render_prometheus(intents_manager.stage_metrics, counters, gauges,
+                             stage_values=intents_manager.stage_metric_values())
 
 @app.route('/stats', methods=['GET'])
 def get_stats():
     """Endpoint para obtener estadísticas del chatbot"""
     try:
-        stats = intents_manager.get_statistics()
         return jsonify({
-            'statistics': stats,
+            'statistics': collect_statistics(),
             'status': 'success',
             'timestamp': datetime.now().isoformat()
         })
@@ -64,6 +347,37 @@ def get_stats():
             'status': 'error'
         }), 500
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Endpoint de métricas en formato de texto de Prometheus"""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/admin/reload', methods=['POST'])
+def reload_intents():
+    """Endpoint para recargar intents.json sin reiniciar el servidor"""
+    if Config.ADMIN_TOKEN:
+        authorized = request.headers.get('X-Admin-Token') == Config.ADMIN_TOKEN
+    else:
+        authorized = request.remote_addr in ('127.0.0.1', '::1')
+    
+    if not authorized:
+        return jsonify({
+            'error': 'No autorizado',
+            'status': 'error'
+        }), 403
+    
+    reloaded = intents_manager.reload_intents()
+    stats = intents_manager.get_statistics()
+    
+    return jsonify({
+        'reloaded': reloaded,
+        'intents_version': stats['intents_version'],
+        'intents_count': len(intents_manager.intents['intents']),
+        'error': stats['last_reload_error'],
+        'status': 'success' if reloaded else 'error',
+        'timestamp': datetime.now().isoformat()
+    }), 200 if reloaded else 422
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Endpoint de health check"""
@@ -73,7 +387,8 @@ def health_check():
         'version': '1.0.0'
     })
 
-if __name__ == '__main__':
+def main():
+    """Servidor de desarrollo (un proceso); en producción usar serve.py"""
     # Crear directorios necesarios
     os.makedirs(Config.CONVERSATIONS_DIR, exist_ok=True)
     
@@ -81,8 +396,11 @@ if __name__ == '__main__':
     print(f"📊 Configuración: {Config.get_settings()}")
     
     app.run(
-        host='0.0.0.0', 
-        port=5000, 
+        host=Config.SERVER_HOST, 
+        port=Config.SERVER_PORT, 
         debug=Config.DEBUG,
         threaded=True
-    )
\ No newline at end of file
+    )
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,409 @@
+"""Aplicación ASGI (asyncio) con las mismas rutas y respuestas que la aplicación Flask.
+
+Reutiliza los componentes ya inicializados en app.py (IntentsManager, ResponseGenerator,
+sesiones y escritor de conversaciones). El event loop solo lee peticiones y escribe
+respuestas, así que las conexiones keep-alive inactivas no ocupan hilos. El scoring corre
+en un executor acotado: ASGI_EXECUTOR_WORKERS hilos y a lo sumo ASGI_MAX_PENDING peticiones
+en espera; por encima de ese límite se responde 503 en lugar de acumular trabajo.
+
+Uso: uvicorn asgi:app --port 5000   (o python asgi.py)
+"""
+import asyncio
+import json
+import math
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+from config import Config
+from chatbot.utils.admission import ADMIT, DEGRADE
+import app as wsgi
+
+HandlerResult = Tuple[int, bytes, bytes]
+
+
+class ExecutorSaturated(Exception):
+    """La cola del executor está llena"""
+
+
+class RequestTooLarge(Exception):
+    """El cuerpo de la petición excede ASGI_MAX_BODY_BYTES"""
+
+
+class BoundedExecutor:
+    """Pool de hilos con cola acotada para el trabajo CPU de las peticiones.
+
+    `pending` solo se modifica desde el event loop, así que no necesita lock.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ASGIWorker")
+
+    async def run(self, function: Callable, *args) -> Any:
+        """Ejecuta function en el pool; ExecutorSaturated si ya hay max_pending en curso"""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ExecutorSaturated()
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+        finally:
+            self.pending -= 1
+
+    async def iterate(self, function: Callable[..., Iterator], *args) -> AsyncIterator:
+        """Ejecuta el generador function en el pool y entrega cada elemento en cuanto se produce.
+
+        ExecutorSaturated al pedir el primer elemento si ya hay max_pending en curso.
+        """
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ExecutorSaturated()
+        self.pending += 1
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        finished = object()
+
+        def produce():
+            # Todo el generador corre en un mismo hilo (las métricas por etapa son por hilo)
+            try:
+                for item in function(*args):
+                    loop.call_soon_threadsafe(queue.put_nowait, item)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, finished)
+
+        future = loop.run_in_executor(self._executor, produce)
+        # El trabajo sigue en curso hasta que el hilo termina, aunque el cliente se desconecte antes
+        future.add_done_callback(self._finished)
+        while True:
+            item = await queue.get()
+            if item is finished:
+                break
+            yield item
+        await future
+
+    def _finished(self, future: asyncio.Future):
+        self.pending -= 1
+
+    def get_statistics(self) -> Dict[str, int]:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "rejected": self.rejected
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+executor = BoundedExecutor(Config.ASGI_EXECUTOR_WORKERS, Config.ASGI_MAX_PENDING)
+
+JSON_CONTENT_TYPE = b"application/json; charset=utf-8"
+
+
+def json_body(payload: Dict[str, Any]) -> bytes:
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def error_payload(message: str) -> Dict[str, Any]:
+    return {
+        'response': message,
+        'status': 'error',
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+# Manejadores: se ejecutan en el executor y retornan (código, content-type, cuerpo)
+
+def handle_chat(payload: Dict[str, Any], degraded: bool = False) -> HandlerResult:
+    """Mismo flujo y esquema que /chat en app.py (degraded: respuesta desde la caché o aviso de espera)"""
+    stage_metrics = wsgi.intents_manager.stage_metrics
+    stage_metrics.begin()
+    try:
+        user_message = str(payload.get('message', '')).strip()
+        if not user_message:
+            return 200, JSON_CONTENT_TYPE, json_body(error_payload('Por favor, escribe tu mensaje.'))
+
+        if degraded:
+            body = wsgi.response_generator.render_degraded(user_message)
+        else:
+            body = wsgi.response_generator.render_response(user_message, payload.get('session_id'))
+        stage_metrics.mark("serialization")
+        return 200, JSON_CONTENT_TYPE, body
+    except Exception as e:
+        wsgi.app.logger.error(f"Error en endpoint /chat (ASGI): {e}")
+        return 500, JSON_CONTENT_TYPE, json_body(error_payload(
+            '❌ Lo siento, ha ocurrido un error en el sistema. Por favor, intenta nuevamente.'))
+    finally:
+        stage_metrics.end()
+
+
+def handle_chat_stream(payload: Dict[str, Any], degraded: bool = False) -> Iterator[bytes]:
+    """Mismos eventos que /chat/stream; se producen en el executor y el event loop envía cada uno al llegar"""
+    stage_metrics = wsgi.intents_manager.stage_metrics
+    stage_metrics.begin()
+    try:
+        user_message = str(payload.get('message', '')).strip()
+        if not user_message:
+            yield wsgi.sse_event('error', error_payload('Por favor, escribe tu mensaje.')).encode("utf-8")
+            return
+
+        for event, data in wsgi.response_generator.stream_response(
+                user_message, payload.get('session_id'), Config.STREAM_CHUNK_SIZE, degraded):
+            message = wsgi.sse_event(event, data).encode("utf-8")
+            if event == 'meta':
+                stage_metrics.mark("serialization")
+            yield message
+    except Exception as e:
+        wsgi.app.logger.error(f"Error en endpoint /chat/stream (ASGI): {e}")
+        yield wsgi.sse_event('error', error_payload(
+            '❌ Lo siento, ha ocurrido un error en el sistema. Por favor, intenta nuevamente.')).encode("utf-8")
+    finally:
+        stage_metrics.end()
+
+
+def handle_batch(payload: Dict[str, Any], degraded: bool = False) -> HandlerResult:
+    try:
+        response_payload, status_code = wsgi.process_batch(payload.get('messages'), degraded)
+        return status_code, JSON_CONTENT_TYPE, json_body(response_payload)
+    except Exception as e:
+        wsgi.app.logger.error(f"Error en endpoint /chat/batch (ASGI): {e}")
+        return 500, JSON_CONTENT_TYPE, json_body(error_payload(
+            '❌ Lo siento, ha ocurrido un error en el sistema. Por favor, intenta nuevamente.'))
+
+
+def handle_stats(payload: Dict[str, Any]) -> HandlerResult:
+    try:
+        statistics = wsgi.collect_statistics()
+        statistics['asgi_executor'] = executor.get_statistics()
+        return 200, JSON_CONTENT_TYPE, json_body({
+            'statistics': statistics,
+            'status': 'success',
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        return 500, JSON_CONTENT_TYPE, json_body({'error': str(e), 'status': 'error'})
+
+
+def handle_metrics(payload: Dict[str, Any]) -> HandlerResult:
+    return 200, b"text/plain; version=0.0.4; charset=utf-8", wsgi.render_metrics().encode("utf-8")
+
+
+ROUTES: Dict[Tuple[str, str], Callable[..., Any]] = {
+    ("POST", "/chat"): handle_chat,
+    ("POST", "/chat/stream"): handle_chat_stream,
+    ("POST", "/chat/batch"): handle_batch,
+    ("GET", "/stats"): handle_stats,
+    ("GET", "/metrics"): handle_metrics,
+}
+
+# Manejadores que producen el cuerpo por partes (generadores de eventos SSE)
+STREAMING_HANDLERS = (handle_chat_stream,)
+
+SSE_CONTENT_TYPE = b"text/event-stream; charset=utf-8"
+
+
+async def send_response(send, status: int, content_type: bytes, body: bytes, headers: List[Tuple[bytes, bytes]] = ()):
+    """Envía una respuesta completa"""
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode()), *headers]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def read_body(receive, max_bytes: int) -> Optional[bytes]:
+    """Lee el cuerpo de la petición; None si el cliente se desconectó antes de enviarlo"""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > max_bytes:
+            raise RequestTooLarge()
+        chunks.append(chunk)
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+def client_address(scope) -> str:
+    """Misma identidad de cliente que app.client_address"""
+    if Config.ADMISSION_TRUST_FORWARDED:
+        for name, value in scope.get("headers", ()):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else ""
+
+
+def parse_payload(body: bytes) -> Optional[Dict[str, Any]]:
+    """JSON del cuerpo; None si no es un objeto JSON (se responde 400, igual que en app.py)"""
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            wsgi.intents_manager.stop_auto_reload()
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+            if wsgi.conversation_writer is not None:
+                wsgi.conversation_writer.close()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """Punto de entrada ASGI"""
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    method, path = scope["method"], scope["path"]
+    if method == "GET" and path == "/health":
+        await send_response(send, 200, JSON_CONTENT_TYPE, json_body({
+            'status': 'healthy',
+            'timestamp': datetime.now().isoformat(),
+            'version': '1.0.0'
+        }))
+        return
+
+    handler = ROUTES.get((method, path))
+    if handler is None:
+        allowed = any(route_path == path for _, route_path in ROUTES)
+        status = 405 if allowed else 404
+        await send_response(send, status, JSON_CONTENT_TYPE, json_body({
+            'error': 'Método no permitido' if allowed else 'No encontrado',
+            'status': 'error'
+        }))
+        return
+
+    # /chat y /chat/stream pasan por el control de admisión antes de leer el cuerpo;
+    # /chat/batch después de leerlo, porque cobra un token por mensaje (ver dispatch)
+    decision = None
+    if handler in (handle_chat, handle_chat_stream):
+        decision = await admit(scope, send)
+        if decision is None:
+            return
+    try:
+        await dispatch(handler, scope, receive, send, decision == DEGRADE)
+    finally:
+        if decision is not None:
+            wsgi.admission.release()
+
+
+async def admit(scope, send, cost: int = 1) -> Optional[str]:
+    """Aplica el control de admisión; si se rechaza responde 429 y retorna None"""
+    decision, retry_after = wsgi.admission.admit(client_address(scope), cost)
+    if decision not in (ADMIT, DEGRADE):
+        await send_response(send, 429, JSON_CONTENT_TYPE, json_body(wsgi.rejection_payload(decision)),
+                            headers=[(b"retry-after", str(math.ceil(retry_after)).encode())])
+        return None
+    return decision
+
+
+async def dispatch(handler: Callable, scope, receive, send, degraded: bool = False):
+    """Lee el cuerpo, ejecuta el manejador en el executor y envía la respuesta"""
+    payload = {}
+    if scope["method"] == "POST":
+        try:
+            body = await read_body(receive, Config.ASGI_MAX_BODY_BYTES)
+        except RequestTooLarge:
+            await send_response(send, 413, JSON_CONTENT_TYPE, json_body(
+                error_payload('La petición excede el tamaño máximo permitido.')))
+            return
+        if body is None:
+            return
+        payload = parse_payload(body)
+        if payload is None:
+            await send_response(send, 400, JSON_CONTENT_TYPE, json_body(wsgi.invalid_payload()))
+            return
+
+    if handler is handle_batch:
+        decision = await admit(scope, send, wsgi.batch_cost(payload.get('messages')))
+        if decision is None:
+            return
+        try:
+            await run_handler(handler, payload, send, decision == DEGRADE)
+        finally:
+            wsgi.admission.release()
+        return
+    await run_handler(handler, payload, send, degraded)
+
+
+async def run_handler(handler: Callable, payload: Dict[str, Any], send, degraded: bool = False):
+    """Ejecuta el manejador en el executor y envía su respuesta (503 si el executor está saturado)"""
+    if handler in STREAMING_HANDLERS:
+        await run_stream(handler, payload, send, degraded)
+        return
+    try:
+        args = (payload, True) if degraded else (payload,)
+        status, content_type, response_body = await executor.run(handler, *args)
+    except ExecutorSaturated:
+        await send_response(send, 503, JSON_CONTENT_TYPE, json_body(
+            error_payload('⏳ El servidor está ocupado. Por favor, intenta nuevamente en un momento.')),
+            headers=[(b"retry-after", b"1")])
+        return
+    await send_response(send, status, content_type, response_body)
+
+
+async def run_stream(handler: Callable, payload: Dict[str, Any], send, degraded: bool = False):
+    """Envía cada parte del cuerpo con more_body=True en cuanto el manejador la produce"""
+    chunks = executor.iterate(handler, payload, degraded)
+    try:
+        first = await chunks.__anext__()
+    except ExecutorSaturated:
+        await send_response(send, 503, JSON_CONTENT_TYPE, json_body(
+            error_payload('⏳ El servidor está ocupado. Por favor, intenta nuevamente en un momento.')),
+            headers=[(b"retry-after", b"1")])
+        return
+    except StopAsyncIteration:
+        first = b""
+
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", SSE_CONTENT_TYPE), (b"cache-control", b"no-cache")]
+    })
+    await send({"type": "http.response.body", "body": first, "more_body": True})
+    async for chunk in chunks:
+        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def main():
+    """Servidor ASGI con uvicorn (dependencia opcional)"""
+    try:
+        import uvicorn
+    except ImportError:
+        print("❌ Se necesita un servidor ASGI: pip install uvicorn")
+        sys.exit(1)
+
+    print("🚀 Iniciando ChatBot Avanzado (ASGI)...")
+    uvicorn.run(
+        "asgi:app",
+        host=Config.SERVER_HOST,
+        port=Config.SERVER_PORT,
+        timeout_keep_alive=Config.ASGI_KEEP_ALIVE_SECONDS,
+        lifespan="on"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""Benchmark de carga y latencia del pipeline de /chat.
+
+Genera corpus sintéticos de intents de tamaño creciente, ejecuta mezclas de consultas
+por cada etapa del pipeline en proceso (preprocesamiento, matching, respuesta, pipeline
+completo) y a través del cliente de pruebas de Flask, y reporta p50/p95/p99, throughput
+y memoria pico por etapa. Funciona sin red y emite JSON para comparar versiones.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_pipeline --sizes 100 1000 10000 --output results.json
+    python -m benchmarks.bench_pipeline --compare antes.json despues.json
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Sequence
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from chatbot.intents_manager import IntentsManager
+from chatbot.response_generator import ResponseGenerator
+from chatbot.utils.admission import AdmissionController
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+PATTERNS_PER_INTENT = 10
+QUERY_MIX = {"exact": 0.4, "partial": 0.3, "typo": 0.2, "unknown": 0.1}
+
+SYLLABLES = ["ma", "te", "ri", "so", "lu", "ca", "pe", "dro", "ven", "tal", "mo", "du", "lo",
+             "pla", "ta", "for", "e", "va", "cion", "es", "tu", "dio", "gra", "nes", "ti"]
+
+
+# ---------------------------------------------------------------------------
+# Generación de corpus y consultas
+# ---------------------------------------------------------------------------
+
+def base_vocabulary(rng: random.Random, size: int = 5000) -> List[str]:
+    """Vocabulario: palabras reales de intents.json más palabras sintéticas en español"""
+    with open(Config.INTENTS_FILE, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    words = {word for intent in data["intents"] for pattern in intent["patterns"] for word in pattern.split()}
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def generate_corpus(n_patterns: int, rng: random.Random) -> Dict[str, Any]:
+    """Corpus sintético con n_patterns patrones repartidos en intents de PATTERNS_PER_INTENT"""
+    vocabulary = base_vocabulary(rng, size=max(2000, n_patterns // 5))
+    intents = []
+    for intent_idx in range(max(1, n_patterns // PATTERNS_PER_INTENT)):
+        # Cada intent tiene un subconjunto temático de palabras para que haya solapamiento realista
+        topic = rng.sample(vocabulary, 12)
+        patterns = [
+            " ".join(rng.sample(topic, rng.randint(2, 5)) + rng.sample(vocabulary, rng.randint(0, 2)))
+            for _ in range(PATTERNS_PER_INTENT)
+        ]
+        intents.append({
+            "tag": f"intent_{intent_idx}",
+            "patterns": patterns,
+            "responses": [f"Respuesta {i} del intent {intent_idx}. " * rng.randint(1, 8) for i in range(3)],
+            "context": f"contexto_{intent_idx % 20}"
+        })
+    return {"intents": intents}
+
+
+def add_typo(word: str, rng: random.Random) -> str:
+    if len(word) < 4:
+        return word
+    position = rng.randrange(1, len(word) - 1)
+    operation = rng.choice(("drop", "double", "swap"))
+    if operation == "drop":
+        return word[:position] + word[position + 1:]
+    if operation == "double":
+        return word[:position] + word[position] + word[position:]
+    return word[:position - 1] + word[position] + word[position - 1] + word[position + 1:]
+
+
+def generate_queries(corpus: Dict[str, Any], n_queries: int, mix: Dict[str, float],
+                     rng: random.Random) -> List[str]:
+    """Mezcla de consultas: exactas, parciales, con errores de escritura y desconocidas"""
+    patterns = [pattern for intent in corpus["intents"] for pattern in intent["patterns"]]
+    kinds = rng.choices(list(mix), weights=list(mix.values()), k=n_queries)
+    queries = []
+    for kind in kinds:
+        words = rng.choice(patterns).split()
+        if kind == "exact":
+            query = " ".join(words)
+        elif kind == "partial":
+            query = "hola, " + " ".join(rng.sample(words, max(1, len(words) // 2))) + " por favor?"
+        elif kind == "typo":
+            query = " ".join(add_typo(word, rng) for word in words)
+        else:
+            query = " ".join("".join(rng.choice("bcdfgjkqxz") for _ in range(6)) for _ in range(3))
+        queries.append(query)
+    return queries
+
+
+# ---------------------------------------------------------------------------
+# Medición
+# ---------------------------------------------------------------------------
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure_stage(operation: Callable[[Any], Any], inputs: Sequence[Any]) -> Dict[str, float]:
+    """Latencias por operación (ms), throughput y memoria pico (pasada separada con tracemalloc)"""
+    gc.collect()
+    latencies = []
+    start = time.perf_counter()
+    for item in inputs:
+        op_start = time.perf_counter()
+        operation(item)
+        latencies.append((time.perf_counter() - op_start) * 1000)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    # tracemalloc distorsiona los tiempos, por eso la memoria se mide aparte
+    sample = inputs[:min(len(inputs), 200)]
+    tracemalloc.start()
+    for item in sample:
+        operation(item)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "operations": len(inputs),
+        "p50_ms": round(percentile(latencies, 0.50), 4),
+        "p95_ms": round(percentile(latencies, 0.95), 4),
+        "p99_ms": round(percentile(latencies, 0.99), 4),
+        "mean_ms": round(sum(latencies) / len(latencies), 4) if latencies else 0.0,
+        "throughput_ops": round(len(inputs) / elapsed, 1) if elapsed else 0.0,
+        "peak_memory_kb": round(peak / 1024, 1)
+    }
+
+
+def build_manager(intents_file: str, args) -> IntentsManager:
+    return IntentsManager(
+        intents_file,
+        min_confidence=Config.MIN_CONFIDENCE,
+        matcher_backend=args.backend,
+        cache_size=Config.RESULT_CACHE_SIZE if args.cache else 0,
+        enable_fuzzy=not args.no_fuzzy,
+        fuzzy_min_similarity=Config.FUZZY_MIN_SIMILARITY,
+        fuzzy_weight=Config.FUZZY_WEIGHT,
+        fuzzy_time_budget_ms=Config.FUZZY_TIME_BUDGET_MS
+    )
+
+
+def flask_client(manager: IntentsManager, generator: ResponseGenerator):
+    """Cliente de pruebas de Flask apuntando al corpus sintético (None si Flask no está disponible).
+
+    El control de admisión queda sin límites: la etapa mide el camino completo de /chat, no el del 429.
+    """
+    try:
+        import app as app_module
+    except ImportError as e:
+        print(f"⚠️  Etapa HTTP omitida: {e}")
+        return None
+    app_module.intents_manager.stop_auto_reload()
+    app_module.intents_manager = manager
+    app_module.response_generator = generator
+    app_module.admission = AdmissionController(rate=0, max_concurrent=0, degrade_at=0)
+    return app_module.app.test_client()
+
+
+def post_chat(client, query: str):
+    """POST /chat de la etapa HTTP; falla si la respuesta no es 200 para no medir un camino de error"""
+    response = client.post('/chat', json={'message': query})
+    if response.status_code != 200:
+        raise RuntimeError(f"/chat respondió {response.status_code} en la etapa HTTP: "
+                           f"{response.get_data(as_text=True)[:200]}")
+    return response
+
+
+def run_size(n_patterns: int, args) -> Dict[str, Any]:
+    rng = random.Random(args.seed + n_patterns)
+    corpus = generate_corpus(n_patterns, rng)
+    queries = generate_queries(corpus, args.queries, QUERY_MIX, rng)
+
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False, encoding='utf-8') as file:
+        json.dump(corpus, file, ensure_ascii=False)
+        intents_file = file.name
+
+    try:
+        # Compilación del corpus (carga + índices)
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        manager = build_manager(intents_file, args)
+        compile_seconds = time.perf_counter() - start
+        _, compile_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        generator = ResponseGenerator(manager)
+        corpus_snapshot = manager._corpus
+        tokenized = [corpus_snapshot.pattern_index.tokenize(query) for query in queries]
+        results = [manager.find_best_intent(query) for query in queries]
+
+        stages = {
+            "preprocess": measure_stage(corpus_snapshot.pattern_index.tokenize, queries),
+            "fuzzy": measure_stage(lambda words: manager._expand_fuzzy(corpus_snapshot, words), tokenized),
+            "match": measure_stage(
+                lambda words: corpus_snapshot.matcher.best_match(words, manager._expand_fuzzy(corpus_snapshot, words)[0]),
+                tokenized
+            ),
+            "response": measure_stage(
+                lambda pair: generator._build_response(pair[0], pair[1]), list(zip(queries, results))
+            ),
+            "pipeline": measure_stage(generator.get_response, queries),
+        }
+
+        if not args.no_http:
+            client = flask_client(manager, generator)
+            if client is not None:
+                stages["http"] = measure_stage(lambda query: post_chat(client, query), queries)
+
+        recognized = sum(1 for result in results if result["status"] == "success")
+        return {
+            "patterns": len(corpus_snapshot.pattern_index),
+            "intents": len(corpus["intents"]),
+            "vocabulary": len(corpus_snapshot.pattern_index.postings),
+            "compile_seconds": round(compile_seconds, 4),
+            "compile_peak_memory_kb": round(compile_peak / 1024, 1),
+            "recognition_rate": round(recognized / len(results) * 100, 2) if results else 0.0,
+            "stages": stages
+        }
+    finally:
+        os.unlink(intents_file)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Config.BASE_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+# ---------------------------------------------------------------------------
+# Reportes
+# ---------------------------------------------------------------------------
+
+def print_report(report: Dict[str, Any]):
+    for size, result in report["results"].items():
+        print(f"\n📦 {size} patrones ({result['intents']} intents, vocabulario {result['vocabulary']}) "
+              f"- compilación {result['compile_seconds']:.3f}s, {result['compile_peak_memory_kb']:.0f} KB, "
+              f"reconocimiento {result['recognition_rate']}%")
+        print(f"   {'etapa':<11}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>12}{'pico KB':>10}")
+        for stage, metrics in result["stages"].items():
+            print(f"   {stage:<11}{metrics['p50_ms']:>10.4f}{metrics['p95_ms']:>10.4f}{metrics['p99_ms']:>10.4f}"
+                  f"{metrics['throughput_ops']:>12,.0f}{metrics['peak_memory_kb']:>10.1f}")
+
+
+def compare_reports(before_path: str, after_path: str):
+    """Muestra la variación de p50/p99/throughput entre dos ejecuciones"""
+    with open(before_path, 'r', encoding='utf-8') as file:
+        before = json.load(file)
+    with open(after_path, 'r', encoding='utf-8') as file:
+        after = json.load(file)
+
+    print(f"Comparando {before['revision']} → {after['revision']}")
+    for size, result in after["results"].items():
+        if size not in before["results"]:
+            continue
+        print(f"\n📦 {size} patrones")
+        for stage, metrics in result["stages"].items():
+            old = before["results"][size]["stages"].get(stage)
+            if not old:
+                continue
+            deltas = []
+            for key in ("p50_ms", "p99_ms", "throughput_ops"):
+                change = (metrics[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+                deltas.append(f"{key} {old[key]} → {metrics[key]} ({change:+.1f}%)")
+            print(f"   {stage:<11}" + " | ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de latencia del pipeline de /chat")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Número de patrones por corpus")
+    parser.add_argument('--queries', type=int, default=2000, help="Consultas por corpus")
+    parser.add_argument('--backend', default=Config.MATCHER_BACKEND, help="Backend de matching")
+    parser.add_argument('--cache', action='store_true', help="Activar la caché de resultados")
+    parser.add_argument('--no-fuzzy', action='store_true', help="Desactivar la coincidencia parcial")
+    parser.add_argument('--no-http', action='store_true', help="Omitir la etapa con el cliente de Flask")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Archivo JSON de resultados")
+    parser.add_argument('--compare', nargs=2, metavar=('ANTES', 'DESPUES'), help="Comparar dos archivos de resultados")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_reports(*args.compare)
+        return
+
+    # El logger de ResponseGenerator escribe una línea por respuesta
+    logging.disable(logging.INFO)
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "backend": args.backend, "cache": args.cache, "fuzzy": not args.no_fuzzy,
+            "queries": args.queries, "seed": args.seed, "query_mix": QUERY_MIX
+        },
+        "results": {}
+    }
+    for size in args.sizes:
+        report["results"][str(size)] = run_size(size, args)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+        print(f"\n✅ Resultados guardados en: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Micro-benchmark del preprocesamiento de texto: pipeline clásico vs. pipeline fusionado.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_preprocessor [--messages 20000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from chatbot.utils.text_preprocessor import TextPreprocessor
+
+# Fragmentos típicos de mensajes de estudiantes (acentos, signos, mayúsculas, emojis)
+PREFIXES = ["", "Hola, ", "Oye ", "¡Buenas tardes! ", "Disculpa, ", "Una pregunta: ", "Profe, "]
+SUFFIXES = ["", "?", " por favor", "... gracias 🙏", " ¿me ayudas?", "!!", " 😅"]
+
+
+def build_corpus(n_messages: int, seed: int = 42):
+    """Genera mensajes realistas a partir de los patrones de intents.json"""
+    with open(Config.INTENTS_FILE, 'r', encoding='utf-8') as file:
+        patterns = [pattern for intent in json.load(file)["intents"] for pattern in intent["patterns"]]
+
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(n_messages):
+        pattern = rng.choice(patterns)
+        if rng.random() < 0.3:
+            pattern = pattern.upper() if rng.random() < 0.5 else pattern.capitalize()
+        corpus.append(f"{rng.choice(PREFIXES)}¿{pattern}{rng.choice(SUFFIXES)}")
+    return corpus
+
+
+def legacy_pipeline(text: str):
+    return TextPreprocessor.tokenize(TextPreprocessor.full_preprocess(text))
+
+
+def fused_pipeline(text: str):
+    return TextPreprocessor.preprocess_tokens(text)
+
+
+def measure(pipeline, corpus, repeat: int):
+    """Retorna (tokens/seg, mensajes/seg) tomando la mejor de varias repeticiones"""
+    best = float('inf')
+    tokens = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tokens = sum(len(pipeline(text)) for text in corpus)
+        best = min(best, time.perf_counter() - start)
+    return tokens / best, len(corpus) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.messages)
+
+    # La salida de ambos pipelines debe ser idéntica
+    mismatches = sum(1 for text in corpus if tuple(legacy_pipeline(text)) != fused_pipeline(text))
+    if mismatches:
+        print(f"❌ {mismatches} mensajes producen tokens distintos")
+        sys.exit(1)
+
+    fused_pipeline("calentamiento")  # construir la tabla de traducción fuera de la medición
+    results = {}
+    for name, pipeline in (("full_preprocess+tokenize", legacy_pipeline), ("preprocess_tokens", fused_pipeline)):
+        tokens_per_sec, messages_per_sec = measure(pipeline, corpus, args.repeat)
+        results[name] = tokens_per_sec
+        print(f"{name:<26} {tokens_per_sec:>12,.0f} tokens/s {messages_per_sec:>12,.0f} mensajes/s")
+
+    speedup = results["preprocess_tokens"] / results["full_preprocess+tokenize"]
+    print(f"Aceleración: {speedup:.2f}x ({len(corpus)} mensajes, salida idéntica)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""Comparación offline de motores de matching: precisión y throughput.
+
+Evalúa cada backend (por defecto "index" y "bm25") con patrones retenidos: el corpus se
+divide en particiones, cada partición se quita del índice y sus patrones se usan como
+consultas (exactas, parciales y con errores de escritura) cuya etiqueta es su intent.
+Así se mide la generalización a frases nuevas y no la memorización del patrón. Se agregan
+consultas sin sentido, que deberían quedar como "unknown".
+
+Métricas por backend: exactitud top-1, reconocimiento correcto de consultas conocidas,
+rechazo de desconocidas, MRR sobre el top-k (mejor intent + alternativas) y latencia y
+throughput de find_best_intent sin caché.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.compare_matchers                       # intents.json
+    python -m benchmarks.compare_matchers --synthetic 10000     # corpus sintético
+    python -m benchmarks.compare_matchers --backends index bm25 pruned --output comparacion.json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from chatbot.intents_manager import IntentsManager
+from benchmarks.bench_pipeline import add_typo, generate_corpus, percentile
+
+DEFAULT_BACKENDS = ["index", "bm25"]
+QUERY_KINDS = ("exact", "partial", "typo")
+FILLERS = ["hola", "oye", "por favor", "una pregunta", "gracias", "profe"]
+
+# (consulta, tag esperado o "unknown")
+LabeledQuery = Tuple[str, str]
+
+
+def load_corpus(args, rng: random.Random) -> Dict[str, Any]:
+    if args.synthetic:
+        return generate_corpus(args.synthetic, rng)
+    with open(args.intents, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def split_folds(corpus: Dict[str, Any], folds: int, rng: random.Random) -> List[Tuple[Dict[str, Any], List[Tuple[str, str]]]]:
+    """Particiones (corpus sin los patrones retenidos, [(patrón retenido, tag)]).
+
+    Cada intent conserva al menos un patrón en todas las particiones.
+    """
+    assignments = []
+    for intent in corpus["intents"]:
+        positions = list(range(len(intent["patterns"])))
+        rng.shuffle(positions)
+        # El primer patrón barajado nunca se retiene
+        assignments.append({position: index % folds for index, position in enumerate(positions[1:])})
+
+    splits = []
+    for fold in range(folds):
+        intents, held_out = [], []
+        for intent, assignment in zip(corpus["intents"], assignments):
+            kept = []
+            for position, pattern in enumerate(intent["patterns"]):
+                if assignment.get(position) == fold:
+                    held_out.append((pattern, intent["tag"]))
+                else:
+                    kept.append(pattern)
+            intents.append({**intent, "patterns": kept})
+        splits.append(({"intents": intents}, held_out))
+    return splits
+
+
+def make_queries(held_out: Sequence[Tuple[str, str]], unknown_fraction: float,
+                 rng: random.Random) -> List[LabeledQuery]:
+    """Variantes de cada patrón retenido más consultas desconocidas"""
+    queries = []
+    for pattern, tag in held_out:
+        words = pattern.split()
+        for kind in QUERY_KINDS:
+            if kind == "exact":
+                query = pattern
+            elif kind == "partial":
+                kept = rng.sample(words, max(1, (len(words) + 1) // 2))
+                query = f"{rng.choice(FILLERS)}, {' '.join(kept)}?"
+            else:
+                query = " ".join(add_typo(word, rng) for word in words)
+            queries.append((query, tag))
+    for _ in range(int(len(queries) * unknown_fraction)):
+        gibberish = " ".join("".join(rng.choice("bcdfgjkqxz") for _ in range(6)) for _ in range(3))
+        queries.append((gibberish, "unknown"))
+    rng.shuffle(queries)
+    return queries
+
+
+def build_manager(intents: Dict[str, Any], backend: str, args) -> IntentsManager:
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False, encoding='utf-8') as file:
+        json.dump(intents, file, ensure_ascii=False)
+        intents_file = file.name
+    try:
+        return IntentsManager(
+            intents_file,
+            min_confidence=Config.MIN_CONFIDENCE,
+            matcher_backend=backend,
+            cache_size=0,
+            enable_fuzzy=not args.no_fuzzy,
+            fuzzy_min_similarity=Config.FUZZY_MIN_SIMILARITY,
+            fuzzy_weight=Config.FUZZY_WEIGHT,
+            fuzzy_time_budget_ms=Config.FUZZY_TIME_BUDGET_MS,
+            max_suggestions=args.top_k - 1,
+            bm25_k1=Config.BM25_K1,
+            bm25_b=Config.BM25_B
+        )
+    finally:
+        os.unlink(intents_file)
+
+
+def ranked_tags(result: Dict[str, Any]) -> List[str]:
+    """Tags en orden de ranking: mejor intent (aunque no alcance el umbral) y alternativas"""
+    tags = []
+    if result["status"] == "success":
+        tags.append(result["tag"])
+    elif result.get("best_guess"):
+        tags.append(result["best_guess"]["tag"])
+    tags.extend(alternative["tag"] for alternative in result.get("alternatives", []))
+    return tags
+
+
+def evaluate_backend(backend: str, splits, queries_by_fold, args) -> Dict[str, Any]:
+    correct = known = known_correct = unknown = unknown_rejected = 0
+    reciprocal_rank = 0.0
+    latencies = []
+    for (intents, _), queries in zip(splits, queries_by_fold):
+        manager = build_manager(intents, backend, args)
+        for query, expected in queries:
+            start = time.perf_counter()
+            result = manager.find_best_intent(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+            correct += result["tag"] == expected
+            if expected == "unknown":
+                unknown += 1
+                unknown_rejected += result["status"] != "success"
+                continue
+            known += 1
+            known_correct += result["tag"] == expected
+            tags = ranked_tags(result)
+            if expected in tags:
+                reciprocal_rank += 1.0 / (tags.index(expected) + 1)
+
+    total = known + unknown
+    elapsed = sum(latencies) / 1000
+    latencies.sort()
+    return {
+        "queries": total,
+        "accuracy": round(correct / total * 100, 2) if total else 0.0,
+        "known_accuracy": round(known_correct / known * 100, 2) if known else 0.0,
+        "unknown_rejection": round(unknown_rejected / unknown * 100, 2) if unknown else 0.0,
+        "mrr": round(reciprocal_rank / known, 4) if known else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 4),
+        "p99_ms": round(percentile(latencies, 0.99), 4),
+        "throughput_qps": round(total / elapsed, 1) if elapsed else 0.0
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    settings = report["settings"]
+    print(f"\n📦 Corpus: {settings['corpus']} - {settings['folds']} particiones, top-{settings['top_k']}, "
+          f"fuzzy {'sí' if settings['fuzzy'] else 'no'}")
+    print(f"   {'backend':<9}{'exactitud':>11}{'conocidas':>11}{'rechazo':>10}{'MRR':>8}"
+          f"{'p50 ms':>10}{'p99 ms':>10}{'consultas/s':>13}")
+    for backend, metrics in report["results"].items():
+        print(f"   {backend:<9}{metrics['accuracy']:>10.2f}%{metrics['known_accuracy']:>10.2f}%"
+              f"{metrics['unknown_rejection']:>9.2f}%{metrics['mrr']:>8.3f}{metrics['p50_ms']:>10.4f}"
+              f"{metrics['p99_ms']:>10.4f}{metrics['throughput_qps']:>13,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparación offline de motores de matching")
+    parser.add_argument('--backends', nargs='+', default=DEFAULT_BACKENDS, help="Backends a comparar")
+    parser.add_argument('--intents', default=Config.INTENTS_FILE, help="Archivo de intents a evaluar")
+    parser.add_argument('--synthetic', type=int, default=0, help="Usar un corpus sintético con N patrones")
+    parser.add_argument('--folds', type=int, default=5, help="Particiones de patrones retenidos")
+    parser.add_argument('--unknown', type=float, default=0.1, help="Fracción de consultas desconocidas")
+    parser.add_argument('--top-k', type=int, default=3, help="Intents considerados para el MRR")
+    parser.add_argument('--no-fuzzy', action='store_true', help="Desactivar la coincidencia parcial")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Archivo JSON de resultados")
+    args = parser.parse_args()
+
+    # El logger de ResponseGenerator y los mensajes de carga no aportan aquí
+    logging.disable(logging.INFO)
+
+    rng = random.Random(args.seed)
+    corpus = load_corpus(args, rng)
+    splits = split_folds(corpus, args.folds, rng)
+    queries_by_fold = [make_queries(held_out, args.unknown, rng) for _, held_out in splits]
+
+    report = {
+        "settings": {
+            "corpus": f"sintético ({args.synthetic} patrones)" if args.synthetic else os.path.basename(args.intents),
+            "folds": args.folds, "top_k": args.top_k, "fuzzy": not args.no_fuzzy,
+            "unknown_fraction": args.unknown, "seed": args.seed
+        },
+        "results": {}
+    }
+    for backend in args.backends:
+        report["results"][backend] = evaluate_backend(backend, splits, queries_by_fold, args)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+        print(f"\n✅ Resultados guardados en: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+import heapq
+import math
+from array import array
+from typing import Dict, List, Tuple, Optional, Iterable
+from .pattern_index import PatternIndex
+from .matchers import IndexMatcher
+
+class BM25Matcher(IndexMatcher):
+    """Motor de ranking BM25: cada token pesa según su IDF en lugar de contar igual.
+
+    Con patrones como conjuntos de tokens (tf = 1), el score BM25 de un patrón es
+    factor_p · Σ idf(t) sobre los tokens compartidos, con factor_p = (k1 + 1) / (1 + k1·norma_p)
+    y norma_p = 1 - b + b·|p| / longitud media. El ranking usa ese score; la confianza
+    que se reporta es score / score del patrón completo (cobertura ponderada por IDF, en [0, 1]),
+    de modo que MIN_CONFIDENCE conserva su significado. Los pesos se precalculan al cargar
+    en arreglos compactos: IDF alineado con el vocabulario CSR y factor y score máximo por patrón.
+    """
+
+    name = "bm25"
+
+    def __init__(self, pattern_index: PatternIndex, k1: float = 1.2, b: float = 0.75):
+        super().__init__(pattern_index)
+        self.k1 = k1
+        self.b = b
+
+        vocabulary, offsets, _ = pattern_index.posting_arrays()
+        self._term_ids = {token: term_id for term_id, token in enumerate(vocabulary)}
+
+        # IDF de cada token (variante de Lucene, siempre positiva)
+        n_patterns = len(pattern_index)
+        self.idf = array('d', (
+            math.log(1.0 + (n_patterns - df + 0.5) / (df + 0.5))
+            for df in (offsets[term_id + 1] - offsets[term_id] for term_id in range(len(vocabulary)))
+        ))
+
+        # Por patrón: factor de normalización por longitud y score del patrón completo
+        lengths = pattern_index.pattern_lengths
+        average_length = (sum(lengths) / n_patterns) if n_patterns else 1.0
+        self.factors = array('d', (
+            (k1 + 1.0) / (1.0 + k1 * (1.0 - b + b * length / (average_length or 1.0))) for length in lengths
+        ))
+        idf_sums = array('d', bytes(8 * n_patterns))
+        for token, posting in pattern_index.postings.items():
+            weight = self.idf[self._term_ids[token]]
+            for pattern_id in posting:
+                idf_sums[pattern_id] += weight
+        self.max_scores = array('d', (factor * idf_sum for factor, idf_sum in zip(self.factors, idf_sums)))
+
+    def _accumulate(self, scores: Dict[int, float], token: str, weight: float = 1.0):
+        term_id = self._term_ids.get(token)
+        if term_id is None:
+            return
+        contribution = self.idf[term_id] * weight
+        for pattern_id in self.index.postings[token]:
+            scores[pattern_id] = scores.get(pattern_id, 0.0) + contribution
+
+    def retrieve(self, query_tokens: Iterable[str], fuzzy_matches: Dict[str, float] = None,
+                 k: int = 1, min_score: float = 0.0) -> Dict[int, float]:
+        """Patrones candidatos con su score BM25 (las coincidencias parciales pesan idf · peso)"""
+        scores: Dict[int, float] = {}
+        for token in set(query_tokens):
+            self._accumulate(scores, token)
+        if fuzzy_matches:
+            for token, weight in fuzzy_matches.items():
+                self._accumulate(scores, token, weight)
+        factors = self.factors
+        return {pattern_id: idf_sum * factors[pattern_id] for pattern_id, idf_sum in scores.items()}
+
+    def confidence(self, pattern_id: int, score: float) -> float:
+        """Score BM25 relativo al del patrón completo"""
+        max_score = self.max_scores[pattern_id]
+        return min(score / max_score, 1.0) if max_score else 0.0
+
+    def _best_by_intent(self, candidates: Dict[int, float]) -> Dict[int, Tuple[float, int]]:
+        """Intent → (score, id) de su patrón con mayor score BM25 (empates: menor id)"""
+        best_by_intent: Dict[int, Tuple[float, int]] = {}
+        for pattern_id, score in candidates.items():
+            intent_idx = self.index.pattern_intents[pattern_id]
+            current = best_by_intent.get(intent_idx)
+            if current is None or score > current[0] or (score == current[0] and pattern_id < current[1]):
+                best_by_intent[intent_idx] = (score, pattern_id)
+        return best_by_intent
+
+    def select(self, candidates: Dict[int, float]) -> Tuple[Optional[int], float]:
+        """Mejor candidato por score BM25 (empates: menor id), con su confianza"""
+        top = self.select_top(candidates, 1)
+        return top[0] if top else (None, 0.0)
+
+    def select_top(self, candidates: Dict[int, float], k: int, min_score: float = 0.0) -> List[Tuple[int, float]]:
+        """Mejor patrón de cada intent para los k intents con mayor score BM25.
+
+        min_score se compara con la confianza; el primero siempre se incluye.
+        """
+        ranked = heapq.nsmallest(k, self._best_by_intent(candidates).values(), key=lambda item: (-item[0], item[1]))
+
+        matches = []
+        for rank, (score, pattern_id) in enumerate(ranked):
+            confidence = self.confidence(pattern_id, score)
+            if score > 0.0 and (rank == 0 or confidence >= min_score):
+                matches.append((pattern_id, confidence))
+        return matches
+
+    def best_match(self, query_tokens: Iterable[str],
+                   fuzzy_matches: Dict[str, float] = None) -> Tuple[Optional[int], float]:
+        """Retorna (id de patrón, confianza) del mejor candidato"""
+        return self.select(self.retrieve(query_tokens, fuzzy_matches))
+
+    def best_matches(self, queries: List[Iterable[str]],
+                     fuzzy_matches: List[Dict[str, float]] = None) -> List[Tuple[Optional[int], float]]:
+        """Retorna el mejor candidato para cada consulta de un lote"""
+        fuzzy_matches = fuzzy_matches or [None] * len(queries)
+        return [self.best_match(query_tokens, fuzzy) for query_tokens, fuzzy in zip(queries, fuzzy_matches)]
+
+    def intent_scores(self, query_tokens: Iterable[str],
+                      fuzzy_matches: Dict[str, float] = None) -> List[float]:
+        """Retorna la confianza del patrón con mayor score BM25 de cada intent"""
+        scores = [0.0] * len(self.index.intents)
+        for intent_idx, (score, pattern_id) in self._best_by_intent(self.retrieve(query_tokens, fuzzy_matches)).items():
+            scores[intent_idx] = self.confidence(pattern_id, score)
+        return scores
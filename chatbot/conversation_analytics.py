@@ -0,0 +1,344 @@
+"""Análisis offline de las conversaciones archivadas en data/conversations/.
+
+Lee los archivos en streaming (línea por línea los .jsonl del escritor y objeto por objeto
+los .json antiguos de save_conversation_log), así que la memoria no depende del volumen
+archivado. Agrega el volumen y la distribución de confianza de cada intent y las consultas
+más frecuentes (normalizadas) que no se reconocieron o se reconocieron con baja confianza,
+estas últimas con resúmenes Space-Saving de tamaño fijo.
+
+El estado agregado y la posición leída de cada archivo se guardan en un checkpoint: la
+siguiente ejecución (por ejemplo, nocturna) solo procesa los archivos nuevos y las líneas
+agregadas a los .jsonl que seguían abiertos.
+
+Uso (desde la raíz del repositorio):
+    python -m chatbot.conversation_analytics
+    python -m chatbot.conversation_analytics --top 50 --output reporte.json
+    python -m chatbot.conversation_analytics --reset          # ignorar el checkpoint y empezar de cero
+"""
+import json
+import os
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from .utils.heavy_hitters import SpaceSaving
+from .utils.text_preprocessor import TextPreprocessor
+
+CHECKPOINT_VERSION = 1
+# Misma frontera que ResponseGenerator para agregar la nota "¿Es esto lo que necesitabas?"
+LOW_CONFIDENCE = 0.6
+CONFIDENCE_BUCKETS = 10
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def normalize_query(text: str) -> str:
+    """Consulta normalizada (minúsculas, sin acentos ni signos) para agrupar variantes"""
+    return " ".join(TextPreprocessor.preprocess_tokens(text, remove_stopwords=False))
+
+
+class ConversationAnalytics:
+    """Agregados acumulados de las entradas del log de conversaciones"""
+
+    def __init__(self, sketch_size: int = 1000):
+        self.entries = 0
+        self.recognized = 0
+        self.invalid = 0
+        self.first_timestamp: Optional[str] = None
+        self.last_timestamp: Optional[str] = None
+        # tag → consultas reconocidas, no reconocidas (mejor candidato), baja confianza e histograma
+        self.intents: Dict[str, Dict[str, Any]] = {}
+        self.unknown_queries = SpaceSaving(sketch_size)
+        # Clave "tag\tconsulta": posibles intents que se disparan por error
+        self.low_confidence_queries = SpaceSaving(sketch_size)
+
+    def add(self, entry: Any):
+        """Agrega una entrada (_make_log_entry); las que no tienen el formato esperado se cuentan como inválidas"""
+        try:
+            tag = str(entry["intent_tag"])
+            confidence = float(entry["confidence"])
+            query = normalize_query(str(entry["user_input"]))
+        except (TypeError, KeyError, ValueError):
+            self.invalid += 1
+            return
+
+        self.entries += 1
+        recognized = bool(entry.get("recognized", tag != "unknown"))
+        timestamp = entry.get("timestamp")
+        if isinstance(timestamp, str):
+            if self.first_timestamp is None or timestamp < self.first_timestamp:
+                self.first_timestamp = timestamp
+            if self.last_timestamp is None or timestamp > self.last_timestamp:
+                self.last_timestamp = timestamp
+
+        stats = self.intents.get(tag)
+        if stats is None:
+            stats = self.intents[tag] = {
+                "recognized": 0, "unrecognized": 0, "low_confidence": 0,
+                "confidence_sum": 0.0, "histogram": [0] * CONFIDENCE_BUCKETS
+            }
+        stats["confidence_sum"] += confidence
+        stats["histogram"][min(max(int(confidence * CONFIDENCE_BUCKETS), 0), CONFIDENCE_BUCKETS - 1)] += 1
+
+        if recognized:
+            self.recognized += 1
+            stats["recognized"] += 1
+            if confidence < LOW_CONFIDENCE:
+                stats["low_confidence"] += 1
+                self.low_confidence_queries.add(f"{tag}\t{query}")
+        else:
+            stats["unrecognized"] += 1
+            self.unknown_queries.add(query)
+
+    def report(self, top: int = 20) -> Dict[str, Any]:
+        """Resumen: totales, intents por volumen y consultas más frecuentes"""
+        intents = []
+        for tag, stats in self.intents.items():
+            total = stats["recognized"] + stats["unrecognized"]
+            intents.append({
+                "tag": tag,
+                "recognized": stats["recognized"],
+                "unrecognized": stats["unrecognized"],
+                "share": round(stats["recognized"] / self.recognized * 100, 2) if self.recognized else 0.0,
+                "average_confidence": round(stats["confidence_sum"] / total, 4) if total else 0.0,
+                "low_confidence_rate": round(stats["low_confidence"] / stats["recognized"] * 100, 2)
+                if stats["recognized"] else 0.0,
+                "confidence_histogram": list(stats["histogram"])
+            })
+        intents.sort(key=lambda item: (-item["recognized"], -item["unrecognized"], item["tag"]))
+
+        low_confidence = []
+        for item in self.low_confidence_queries.top(top):
+            tag, query = item["key"].split("\t", 1)
+            low_confidence.append({"tag": tag, "query": query, "count": item["count"], "error": item["error"]})
+
+        return {
+            "entries": self.entries,
+            "recognized": self.recognized,
+            "unknown": self.entries - self.recognized,
+            "invalid": self.invalid,
+            "first_timestamp": self.first_timestamp,
+            "last_timestamp": self.last_timestamp,
+            "intents": intents,
+            "top_unknown_queries": [
+                {"query": item["key"], "count": item["count"], "error": item["error"]}
+                for item in self.unknown_queries.top(top)
+            ],
+            "top_low_confidence_queries": low_confidence
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "entries": self.entries,
+            "recognized": self.recognized,
+            "invalid": self.invalid,
+            "first_timestamp": self.first_timestamp,
+            "last_timestamp": self.last_timestamp,
+            "intents": self.intents,
+            "unknown_queries": self.unknown_queries.to_dict(),
+            "low_confidence_queries": self.low_confidence_queries.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], sketch_size: int = 1000) -> "ConversationAnalytics":
+        analytics = cls(sketch_size)
+        analytics.entries = data["entries"]
+        analytics.recognized = data["recognized"]
+        analytics.invalid = data["invalid"]
+        analytics.first_timestamp = data["first_timestamp"]
+        analytics.last_timestamp = data["last_timestamp"]
+        analytics.intents = data["intents"]
+        analytics.unknown_queries = SpaceSaving.from_dict(data["unknown_queries"], sketch_size)
+        analytics.low_confidence_queries = SpaceSaving.from_dict(data["low_confidence_queries"], sketch_size)
+        return analytics
+
+
+def iter_jsonl(path: str, offset: int = 0) -> Iterator[Tuple[Any, int]]:
+    """(entrada o None si la línea no es JSON válido, posición tras la línea) desde `offset`.
+
+    Una última línea sin salto de línea puede estar a medio escribir: se deja para la siguiente ejecución.
+    """
+    with open(path, 'rb') as file:
+        file.seek(offset)
+        for line in file:
+            if not line.endswith(b"\n"):
+                return
+            offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line), offset
+            except ValueError:
+                yield None, offset
+
+
+def iter_json_array(path: str) -> Iterator[Any]:
+    """Elementos de un archivo con un arreglo JSON, decodificados por bloques sin cargar el archivo completo"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = finished = False
+    with open(path, 'r', encoding='utf-8') as file:
+        for chunk in iter(lambda: file.read(READ_CHUNK_SIZE), ""):
+            buffer += chunk
+            position = 0
+            while not finished:
+                while position < len(buffer) and buffer[position] in " \t\r\n,":
+                    position += 1
+                if position >= len(buffer):
+                    break
+                if not started:
+                    if buffer[position] != "[":
+                        raise ValueError("se esperaba un arreglo JSON")
+                    started = True
+                    position += 1
+                    continue
+                if buffer[position] == "]":
+                    finished = True
+                    break
+                try:
+                    item, position = decoder.raw_decode(buffer, position)
+                except ValueError:
+                    # Objeto incompleto: esperar el siguiente bloque
+                    break
+                yield item
+            buffer = buffer[position:]
+    if not finished:
+        raise ValueError("arreglo JSON incompleto")
+
+
+def load_checkpoint(path: Optional[str], sketch_size: int) -> Tuple[ConversationAnalytics, Dict[str, Dict[str, int]]]:
+    """Estado agregado y posición por archivo; vacíos si no hay checkpoint o no es válido"""
+    if path and os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                checkpoint = json.load(file)
+            if checkpoint.get("version") == CHECKPOINT_VERSION:
+                return ConversationAnalytics.from_dict(checkpoint["analytics"], sketch_size), checkpoint["files"]
+            print(f"⚠️ Checkpoint con versión distinta, se procesará todo de nuevo: {path}")
+        except Exception as e:
+            print(f"❌ Checkpoint inválido, se procesará todo de nuevo: {e}")
+    return ConversationAnalytics(sketch_size), {}
+
+
+def save_checkpoint(path: str, analytics: ConversationAnalytics, files: Dict[str, Dict[str, int]]):
+    """Escritura atómica (archivo temporal + rename): un corte nunca deja un checkpoint a medias"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump({"version": CHECKPOINT_VERSION, "files": files, "analytics": analytics.to_dict()},
+                  file, ensure_ascii=False)
+    os.replace(temporary, path)
+
+
+def process_directory(directory: str, analytics: ConversationAnalytics,
+                      files: Dict[str, Dict[str, int]], checkpoint_path: Optional[str] = None) -> Dict[str, int]:
+    """Procesa lo nuevo de cada archivo del directorio; actualiza `files` y guarda el checkpoint tras cada archivo"""
+    summary = {"files": 0, "entries": 0, "skipped": 0}
+    names = sorted(name for name in os.listdir(directory) if name.endswith((".jsonl", ".json"))) \
+        if os.path.isdir(directory) else []
+
+    for name in names:
+        path = os.path.join(directory, name)
+        size = os.path.getsize(path)
+        position = files.get(name, {}).get("offset", 0)
+        if position == size:
+            summary["skipped"] += 1
+            continue
+
+        before = analytics.entries + analytics.invalid
+        if name.endswith(".jsonl"):
+            if position > size:
+                print(f"⚠️ {name} es más corto que en el checkpoint, se lee desde el inicio")
+                position = 0
+            for entry, position in iter_jsonl(path, position):
+                analytics.add(entry)
+        else:
+            # Formato antiguo: el archivo se escribe completo una sola vez
+            if name in files:
+                print(f"⚠️ {name} cambió después de procesarse, se omite")
+                summary["skipped"] += 1
+                continue
+            try:
+                # Validar antes de agregar: un archivo inválido no debe dejar conteos parciales
+                for _ in iter_json_array(path):
+                    pass
+            except ValueError as e:
+                # Puede estar a medio escribir; se reintenta en la siguiente ejecución
+                print(f"❌ No se pudo leer {name}: {e}")
+                continue
+            for entry in iter_json_array(path):
+                analytics.add(entry)
+            position = size
+
+        files[name] = {"offset": position, "size": size}
+        summary["files"] += 1
+        summary["entries"] += analytics.entries + analytics.invalid - before
+        if checkpoint_path:
+            save_checkpoint(checkpoint_path, analytics, files)
+
+    return summary
+
+
+def print_report(report: Dict[str, Any], summary: Dict[str, int]):
+    print(f"\n📊 Conversaciones analizadas: {report['entries']:,} "
+          f"({summary['entries']:,} nuevas en {summary['files']} archivos, {summary['skipped']} sin cambios)")
+    if report["first_timestamp"]:
+        print(f"   Periodo: {report['first_timestamp']} → {report['last_timestamp']}")
+    if report["entries"]:
+        print(f"   Reconocidas: {report['recognized']:,} ({report['recognized'] / report['entries'] * 100:.1f}%) - "
+              f"no reconocidas: {report['unknown']:,} - inválidas: {report['invalid']:,}")
+
+    print("\n🎯 Volumen por intent:")
+    print(f"   {'intent':<28}{'reconocidas':>12}{'%':>8}{'no recon.':>11}{'confianza':>11}{'baja conf.':>12}")
+    for intent in report["intents"]:
+        print(f"   {intent['tag']:<28}{intent['recognized']:>12,}{intent['share']:>7.1f}%{intent['unrecognized']:>11,}"
+              f"{intent['average_confidence']:>11.3f}{intent['low_confidence_rate']:>11.1f}%")
+
+    print("\n❓ Consultas no reconocidas más frecuentes:")
+    for item in report["top_unknown_queries"]:
+        error = f" (±{item['error']})" if item["error"] else ""
+        print(f"   {item['count']:>8,}{error}  {item['query']}")
+
+    print("\n⚠️ Reconocidas con baja confianza más frecuentes:")
+    for item in report["top_low_confidence_queries"]:
+        error = f" (±{item['error']})" if item["error"] else ""
+        print(f"   {item['count']:>8,}{error}  [{item['tag']}] {item['query']}")
+
+
+def main(argv: List[str] = None):
+    """Actualiza los agregados con las conversaciones nuevas y muestra el reporte"""
+    import argparse
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="Análisis de las conversaciones archivadas")
+    parser.add_argument("--dir", default=Config.CONVERSATIONS_DIR, help="Directorio de conversaciones")
+    parser.add_argument("--checkpoint", default=Config.ANALYTICS_CHECKPOINT_FILE, help="Archivo de checkpoint")
+    parser.add_argument("--no-checkpoint", action="store_true", help="Procesar todo sin leer ni guardar el checkpoint")
+    parser.add_argument("--reset", action="store_true", help="Ignorar el checkpoint existente y empezar de cero")
+    parser.add_argument("--sketch-size", type=int, default=Config.ANALYTICS_SKETCH_SIZE,
+                        help="Consultas vigiladas por cada resumen de frecuencias")
+    parser.add_argument("--top", type=int, default=Config.ANALYTICS_TOP_QUERIES, help="Consultas a reportar")
+    parser.add_argument("--output", help="Archivo JSON del reporte")
+    args = parser.parse_args(argv)
+
+    checkpoint_path = None if args.no_checkpoint else args.checkpoint
+    if checkpoint_path and not args.reset:
+        analytics, files = load_checkpoint(checkpoint_path, args.sketch_size)
+    else:
+        analytics, files = ConversationAnalytics(args.sketch_size), {}
+
+    if not os.path.isdir(args.dir):
+        print(f"❌ No existe el directorio de conversaciones: {args.dir}")
+        sys.exit(1)
+
+    summary = process_directory(args.dir, analytics, files, checkpoint_path)
+    if checkpoint_path:
+        save_checkpoint(checkpoint_path, analytics, files)
+
+    report = analytics.report(args.top)
+    print_report(report, summary)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+        print(f"\n✅ Reporte guardado en: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from .pattern_index import PatternIndex
+from .utils.fuzzy_index import TrigramIndex
+from .utils.text_preprocessor import TextPreprocessor, SPECIAL_CHARS_RE
+
+# Formato del artefacto compilado:
+#   magic (8 bytes) | versión (uint32) | longitud del encabezado (uint32) | encabezado JSON | secciones
+# Cada sección empieza alineada a 8 bytes; los arreglos numéricos se leen sin copia desde el mmap.
+ARTIFACT_MAGIC = b"CHBTCORP"
+ARTIFACT_VERSION = 1
+_PREAMBLE = struct.Struct("<8sII")
+_ALIGNMENT = 8
+
+
+def file_checksum(path: str) -> str:
+    """SHA-256 del archivo fuente de intents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def preprocessor_fingerprint(text_preprocessor: TextPreprocessor) -> str:
+    """Huella del preprocesamiento: si cambian las stop words o la normalización, el artefacto caduca"""
+    digest = hashlib.sha256()
+    digest.update(SPECIAL_CHARS_RE.pattern.encode('utf-8'))
+    digest.update("\n".join(sorted(text_preprocessor.SPANISH_STOP_WORDS)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class _StringTable(Sequence):
+    """Secuencia de cadenas UTF-8 sobre el mmap; cada elemento se decodifica al accederlo"""
+
+    def __init__(self, blob: memoryview, offsets: memoryview):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        return str(self._blob[self._offsets[position]:self._offsets[position + 1]], 'utf-8')
+
+
+class _LazyIntents(Sequence):
+    """Intents decodificados bajo demanda: solo se parsea el JSON de los intents consultados"""
+
+    def __init__(self, encoded: _StringTable):
+        self._encoded = encoded
+        self._decoded: List[Optional[Dict[str, Any]]] = [None] * len(encoded)
+
+    def __len__(self) -> int:
+        return len(self._decoded)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        intent = self._decoded[position]
+        if intent is None:
+            # Carrera benigna: dos hilos pueden decodificar el mismo intent, el resultado es igual
+            intent = json.loads(self._encoded[position])
+            self._decoded[position] = intent
+        return intent
+
+
+def _csr(keys: Sequence[str], postings: Dict[str, Sequence[int]]) -> Tuple[bytes, array, array]:
+    """Codifica una lista invertida como claves unidas por '\\n', offsets (int64) y filas (int32)"""
+    offsets = array('q', [0])
+    rows = array('i')
+    for key in keys:
+        rows.extend(postings[key])
+        offsets.append(len(rows))
+    return "\n".join(keys).encode('utf-8'), offsets, rows
+
+
+def _string_table(values: Iterable[str]) -> Tuple[bytes, array]:
+    offsets = array('q', [0])
+    chunks = []
+    size = 0
+    for value in values:
+        encoded = value.encode('utf-8')
+        chunks.append(encoded)
+        size += len(encoded)
+        offsets.append(size)
+    return b"".join(chunks), offsets
+
+
+def write_artifact(path: str, source_checksum: Tuple[str, int], intents: Dict[str, Any],
+                   pattern_index: PatternIndex, fuzzy_index: TrigramIndex = None) -> str:
+    """Serializa el corpus compilado en `path` (escritura atómica) y retorna la ruta.
+
+    source_checksum es (sha256, tamaño) del contenido de intents.json que se compiló.
+    """
+    intent_list = intents.get("intents", [])
+    vocabulary = sorted(pattern_index.postings)
+
+    sections: Dict[str, Tuple[str, bytes]] = {}
+    blob, offsets = _string_table(
+        json.dumps(intent, ensure_ascii=False, separators=(',', ':')) for intent in intent_list
+    )
+    sections["intents_blob"], sections["intents_offsets"] = ("B", blob), ("q", offsets.tobytes())
+    blob, offsets = _string_table(pattern_index.patterns)
+    sections["patterns_blob"], sections["patterns_offsets"] = ("B", blob), ("q", offsets.tobytes())
+    sections["pattern_intents"] = ("i", array('i', pattern_index.pattern_intents).tobytes())
+    sections["pattern_lengths"] = ("i", array('i', pattern_index.pattern_lengths).tobytes())
+
+    keys, offsets, rows = _csr(vocabulary, pattern_index.postings)
+    sections["vocabulary"] = ("B", keys)
+    sections["posting_offsets"], sections["posting_rows"] = ("q", offsets.tobytes()), ("i", rows.tobytes())
+
+    header: Dict[str, Any] = {
+        "source_sha256": source_checksum[0],
+        "source_size": source_checksum[1],
+        "preprocessor": preprocessor_fingerprint(pattern_index.text_preprocessor),
+        "byteorder": sys.byteorder,
+        "counts": {"intents": len(intent_list), "patterns": len(pattern_index), "vocabulary": len(vocabulary)},
+        "fuzzy_min_token_length": None
+    }
+
+    if fuzzy_index is not None:
+        trigrams = sorted(fuzzy_index.postings)
+        keys, offsets, rows = _csr(trigrams, fuzzy_index.postings)
+        sections["fuzzy_words"] = ("B", "\n".join(fuzzy_index.words).encode('utf-8'))
+        sections["fuzzy_trigram_counts"] = ("i", array('i', fuzzy_index.word_trigram_counts).tobytes())
+        sections["trigrams"] = ("B", keys)
+        sections["trigram_offsets"], sections["trigram_rows"] = ("q", offsets.tobytes()), ("i", rows.tobytes())
+        header["fuzzy_min_token_length"] = fuzzy_index.min_token_length
+
+    # Posiciones relativas al inicio de las secciones, alineadas para los arreglos
+    layout = {}
+    payload = bytearray()
+    for name, (typecode, data) in sections.items():
+        payload.extend(b"\0" * (-len(payload) % _ALIGNMENT))
+        layout[name] = [len(payload), len(data), typecode]
+        payload.extend(data)
+    header["sections"] = layout
+    header["payload_size"] = len(payload)
+    header["payload_crc32"] = zlib.crc32(payload)
+
+    encoded_header = json.dumps(header).encode('utf-8')
+    encoded_header += b" " * (-(_PREAMBLE.size + len(encoded_header)) % _ALIGNMENT)
+
+    # Archivo temporal + os.replace: los procesos que ya mapearon la versión anterior no se ven afectados
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, 'wb') as file:
+        file.write(_PREAMBLE.pack(ARTIFACT_MAGIC, ARTIFACT_VERSION, len(encoded_header)))
+        file.write(encoded_header)
+        file.write(payload)
+    os.replace(temporary, path)
+    return path
+
+
+class CorpusArtifact:
+    """Artefacto compilado abierto con mmap: las páginas se comparten entre procesos"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        if len(view) < _PREAMBLE.size:
+            raise ValueError("Artefacto truncado")
+        magic, version, header_length = _PREAMBLE.unpack_from(view)
+        if magic != ARTIFACT_MAGIC:
+            raise ValueError("No es un artefacto de corpus compilado")
+        if version != ARTIFACT_VERSION:
+            raise ValueError(f"Versión de artefacto {version} no soportada (se esperaba {ARTIFACT_VERSION})")
+
+        payload_start = _PREAMBLE.size + header_length
+        self.header: Dict[str, Any] = json.loads(bytes(view[_PREAMBLE.size:payload_start]))
+        if self.header["byteorder"] != sys.byteorder:
+            raise ValueError("Artefacto compilado en una máquina con otro orden de bytes")
+        self._payload = view[payload_start:]
+        if len(self._payload) != self.header["payload_size"]:
+            raise ValueError("Artefacto truncado")
+
+    def verify(self) -> bool:
+        """Comprueba la integridad del contenido (CRC32)"""
+        return zlib.crc32(self._payload) == self.header["payload_crc32"]
+
+    def is_current(self, source_path: str, text_preprocessor: TextPreprocessor) -> bool:
+        """True si el artefacto corresponde al archivo fuente y al preprocesamiento actuales"""
+        if self.header["preprocessor"] != preprocessor_fingerprint(text_preprocessor):
+            return False
+        # El tamaño descarta la mayoría de los cambios sin leer el archivo completo
+        if os.path.getsize(source_path) != self.header["source_size"]:
+            return False
+        return file_checksum(source_path) == self.header["source_sha256"]
+
+    def has_section(self, name: str) -> bool:
+        return name in self.header["sections"]
+
+    def section(self, name: str) -> memoryview:
+        """Vista sin copia de una sección; los arreglos numéricos se exponen con su tipo"""
+        offset, length, typecode = self.header["sections"][name]
+        data = self._payload[offset:offset + length]
+        return data if typecode == "B" else data.cast(typecode)
+
+    def strings(self, name: str) -> List[str]:
+        """Decodifica una sección de cadenas separadas por '\\n'"""
+        data = self.section(name)
+        return str(data, 'utf-8').split("\n") if len(data) else []
+
+    def string_table(self, name: str) -> _StringTable:
+        return _StringTable(self.section(f"{name}_blob"), self.section(f"{name}_offsets"))
+
+    def postings(self, keys_section: str, offsets_section: str, rows_section: str) -> Dict[str, memoryview]:
+        """Lista invertida clave → vista de las filas, sin copiar los ids"""
+        keys = self.strings(keys_section)
+        offsets = self.section(offsets_section)
+        rows = self.section(rows_section)
+        return {key: rows[offsets[i]:offsets[i + 1]] for i, key in enumerate(keys)}
+
+    def pattern_index(self, text_preprocessor: TextPreprocessor) -> PatternIndex:
+        """Reconstruye el índice de patrones sobre las vistas del mmap"""
+        return PatternIndex.from_tables(
+            intents={"intents": _LazyIntents(self.string_table("intents"))},
+            patterns=self.string_table("patterns"),
+            pattern_intents=self.section("pattern_intents"),
+            pattern_lengths=self.section("pattern_lengths"),
+            postings=self.postings("vocabulary", "posting_offsets", "posting_rows"),
+            posting_arrays=(self.strings("vocabulary"), self.section("posting_offsets"), self.section("posting_rows")),
+            text_preprocessor=text_preprocessor
+        )
+
+    def fuzzy_index(self) -> Optional[TrigramIndex]:
+        """Reconstruye el índice de trigramas si el artefacto lo incluye"""
+        if self.header.get("fuzzy_min_token_length") is None:
+            return None
+        return TrigramIndex.from_tables(
+            words=self.strings("fuzzy_words"),
+            word_trigram_counts=self.section("fuzzy_trigram_counts"),
+            postings=self.postings("trigrams", "trigram_offsets", "trigram_rows"),
+            min_token_length=self.header["fuzzy_min_token_length"]
+        )
+
+
+def load_artifact(path: str, source_path: str, text_preprocessor: TextPreprocessor) -> Optional[CorpusArtifact]:
+    """Abre el artefacto si existe, está íntegro y corresponde al archivo fuente; si no, retorna None"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        artifact = CorpusArtifact(path)
+        if not artifact.is_current(source_path, text_preprocessor):
+            print(f"🔄 Artefacto compilado desactualizado, se usará {os.path.basename(source_path)}")
+            return None
+        if not artifact.verify():
+            print("❌ Artefacto compilado corrupto (checksum inválido), se usará el JSON")
+            return None
+        return artifact
+    except Exception as e:
+        print(f"❌ Error abriendo artefacto compilado: {e}")
+        return None
+
+
+def main(argv: List[str] = None):
+    """Compila intents.json: python -m chatbot.corpus_artifact [intents.json] [salida]"""
+    import argparse
+    from .intents_manager import IntentsManager
+
+    parser = argparse.ArgumentParser(description="Compila intents.json en un artefacto binario mapeable")
+    parser.add_argument("source", nargs="?", default=os.path.join("data", "intents.json"))
+    parser.add_argument("output", nargs="?", default=None)
+    parser.add_argument("--no-fuzzy", action="store_true", help="No incluir el índice de trigramas")
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.splitext(args.source)[0] + ".compiled"
+    manager = IntentsManager(args.source, enable_fuzzy=not args.no_fuzzy, compiled_file=None)
+    if not manager.compile_to(output):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,158 @@
+import hashlib
 import json
 import re
 import os
-from typing import Dict, List, Any, Tuple
+import threading
+from collections import deque
+from typing import Dict, List, Any, Tuple, Optional, Iterable, Sequence
 from datetime import datetime
 from .utils.text_preprocessor import TextPreprocessor
+from .pattern_index import PatternIndex
+from .matchers import create_matcher
+from .utils.lru_cache import LRUCache
+from .utils.periodic_task import PeriodicTask
+from .utils.metrics import ShardedCounters, StageMetrics
+from .utils.conversation_writer import ConversationWriter
+from .utils.fuzzy_index import TrigramIndex
+from .utils.shared_stats import SharedStatsTable
+from .utils.session_store import SessionStore
+from .corpus_artifact import CorpusArtifact, load_artifact, write_artifact
+
+class CompiledIntents:
+    """Instantánea inmutable del corpus: intents, índice y matcher de una misma versión"""
+    
+    def __init__(self, intents: Dict[str, Any], pattern_index: PatternIndex, matcher, generation: int,
+                 source_signature: Optional[Tuple[int, int]] = None, fuzzy_index: TrigramIndex = None,
+                 source_checksum: Optional[Tuple[str, int]] = None, source: str = "json"):
+        self.intents = intents
+        self.pattern_index = pattern_index
+        self.matcher = matcher
+        self.fuzzy_index = fuzzy_index
+        self.generation = generation
+        self.source_signature = source_signature
+        # (sha256, tamaño) del contenido compilado y origen: "json" o "artifact"
+        self.source_checksum = source_checksum
+        self.source = source
+        self.loaded_at = datetime.now().isoformat()
+        self._tag_contexts = None
+    
+    def tag_contexts(self) -> Dict[int, str]:
+        """Clave compacta del tag (SessionStore.tag_key) → contexto del intent; se calcula al primer uso"""
+        if self._tag_contexts is None:
+            self._tag_contexts = {
+                SessionStore.tag_key(intent["tag"]): intent.get("context", "general")
+                for intent in self.intents["intents"]
+            }
+        return self._tag_contexts
+
 
 class IntentsManager:
-    def __init__(self, intents_file: str, min_confidence: float = 0.3):
+    MAX_LOG_ENTRIES = 100
+    # Campos de la tabla compartida que son niveles actuales (se suman entre workers vivos, no se acumulan)
+    SHARED_GAUGES = ("conversation_log_size", "cache_size", "writer_queue_size")
+    
+    def __init__(self, intents_file: str, min_confidence: float = 0.3, matcher_backend: str = "index",
+                 cache_size: int = 1024, conversation_writer: ConversationWriter = None,
+                 enable_fuzzy: bool = True, fuzzy_min_similarity: float = 0.7, fuzzy_weight: float = 0.9,
+                 fuzzy_time_budget_ms: float = 2.0, metrics_sample_rate: float = 1.0,
+                 compiled_file: Optional[str] = None, max_suggestions: int = 2,
+                 suggestion_min_confidence: float = 0.25, context_boost: float = 0.1,
+                 context_decay: float = 0.5, bm25_k1: float = 1.2, bm25_b: float = 0.75):
         self.intents_file = intents_file
+        # Artefacto binario precompilado (mmap); None = compilar siempre desde el JSON
+        self.compiled_file = compiled_file
         self.min_confidence = min_confidence
-        self.intents = self.load_intents()
-        self.conversation_log = []
+        self.matcher_backend = matcher_backend
+        # Parámetros del backend "bm25": saturación (k1) y normalización por longitud (b)
+        self.bm25_k1 = bm25_k1
+        self.bm25_b = bm25_b
+        
+        # Alternativas "¿quisiste decir...?": intents siguientes del top-k con score suficiente
+        self.max_suggestions = max_suggestions
+        self.suggestion_min_confidence = suggestion_min_confidence
+        
+        # Sesgo de contexto: bono para intents del mismo contexto que los turnos recientes de la sesión
+        self.context_boost = context_boost
+        self.context_decay = context_decay
+        
+        # Coincidencias parciales (tokens con errores o flexiones) vía índice de trigramas
+        self.enable_fuzzy = enable_fuzzy
+        self.fuzzy_min_similarity = fuzzy_min_similarity
+        self.fuzzy_weight = fuzzy_weight
+        self.fuzzy_time_budget = fuzzy_time_budget_ms / 1000.0
+        
+        # Histogramas de latencia por etapa (activos solo dentro de una petición muestreada)
+        self.stage_metrics = StageMetrics(metrics_sample_rate)
         self.text_preprocessor = TextPreprocessor()
         
-        # Estadísticas
-        self.stats = {
-            "total_queries": 0,
-            "recognized_intents": 0,
-            "unknown_intents": 0,
-            "average_confidence": 0.0
-        }
+        # Buffer circular acotado: append O(1) y seguro entre hilos
+        self.conversation_log = deque(maxlen=self.MAX_LOG_ENTRIES)
+        
+        # Persistencia opcional en segundo plano (JSON Lines)
+        self.conversation_writer = conversation_writer
+        
+        # Caché de resultados: (versión del corpus, entrada preprocesada) → (id de patrón, score)
+        self.result_cache = LRUCache(cache_size)
+        
+        # Las recargas se serializan entre sí; las consultas nunca esperan este lock
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._rejected_signature = None
+        # Firma del artefacto compilado ya revisado (workers que solo remapean, ver start_auto_reload)
+        self._artifact_signature = None
+        self.reload_count = 0
+        self.last_reload_error = None
+        
+        self._corpus = self._load_initial_corpus()
+        
+        # Estadísticas: contadores por hilo, sin lock en el camino de las peticiones
+        self.stats = ShardedCounters((
+            "total_queries", "recognized_intents", "unknown_intents", "confidence_sum",
+            "fuzzy_expansions", "fuzzy_budget_exhausted"
+        ))
+        
+        # Agregación entre procesos (modo pre-fork): fila propia en una tabla compartida
+        self.shared_stats: Optional[SharedStatsTable] = None
+        self.worker_slot: Optional[int] = None
+        self._publisher = None
+    
+    @property
+    def corpus(self) -> CompiledIntents:
+        """Instantánea vigente del corpus (cambia de objeto en cada recarga)"""
+        return self._corpus
+    
+    @property
+    def intents(self) -> Dict[str, Any]:
+        return self._corpus.intents
+    
+    @property
+    def pattern_index(self) -> PatternIndex:
+        return self._corpus.pattern_index
+    
+    @property
+    def matcher(self):
+        return self._corpus.matcher
+    
+    def _load_initial_corpus(self) -> CompiledIntents:
+        """Carga el artefacto compilado si está vigente; si no, compila desde el JSON y lo regenera"""
+        signature = self._source_signature()
+        artifact = load_artifact(self.compiled_file, self.intents_file, self.text_preprocessor)
+        if artifact is not None:
+            corpus = self.compile_from_artifact(artifact, generation=0, source_signature=signature)
+            print(f"✅ Cargados {len(corpus.intents['intents'])} intents desde el artefacto compilado")
+            return corpus
+        
+        data = self.load_intents()
+        corpus = self.compile_intents(data, generation=0, source_signature=signature,
+                                      source_checksum=data.pop("_checksum", None))
+        if self.compiled_file and corpus.source_checksum is not None:
+            self.compile_to(self.compiled_file, corpus)
+        return corpus
     
     def load_intents(self) -> Dict[str, Any]:
         """Carga y valida los intents desde el archivo JSON"""
         try:
-            if not os.path.exists(self.intents_file):
-                raise FileNotFoundError(f"Archivo de intents no encontrado: {self.intents_file}")
-            
-            with open(self.intents_file, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-            
-            # Validar estructura básica
-            if "intents" not in data:
-                raise ValueError("El archivo JSON debe contener una clave 'intents'")
-            
+            data = self._read_intents_file()
             print(f"✅ Cargados {len(data['intents'])} intents correctamente")
             return data
             
@@ -41,6 +160,166 @@ class IntentsManager:
             print(f"❌ Error cargando intents: {e}")
             return {"intents": []}
     
+    def _read_intents_file(self) -> Dict[str, Any]:
+        """Lee y valida el archivo de intents; lanza excepción si no es válido.
+        
+        La clave '_checksum' guarda (sha256, tamaño) de los bytes leídos, para el artefacto compilado.
+        """
+        if not os.path.exists(self.intents_file):
+            raise FileNotFoundError(f"Archivo de intents no encontrado: {self.intents_file}")
+        
+        with open(self.intents_file, 'rb') as file:
+            raw = file.read()
+        data = json.loads(raw.decode('utf-8'))
+        
+        # Validar estructura básica
+        if not isinstance(data, dict) or "intents" not in data:
+            raise ValueError("El archivo JSON debe contener una clave 'intents'")
+        if not isinstance(data["intents"], list):
+            raise ValueError("La clave 'intents' debe ser una lista")
+        
+        for position, intent in enumerate(data["intents"]):
+            for key in ("tag", "patterns", "responses"):
+                if key not in intent:
+                    raise ValueError(f"El intent #{position} no tiene la clave '{key}'")
+            if not isinstance(intent["patterns"], list) or not isinstance(intent["responses"], list):
+                raise ValueError(f"El intent '{intent['tag']}' debe tener listas de patterns y responses")
+            if not intent["responses"]:
+                raise ValueError(f"El intent '{intent['tag']}' no tiene respuestas")
+        
+        data["_checksum"] = (hashlib.sha256(raw).hexdigest(), len(raw))
+        return data
+    
+    def _source_signature(self) -> Optional[Tuple[int, int]]:
+        """Firma (mtime, tamaño) del archivo de intents para detectar cambios"""
+        return self._file_signature(self.intents_file)
+    
+    @staticmethod
+    def _file_signature(path: Optional[str]) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+            return stat.st_mtime_ns, stat.st_size
+        except (OSError, TypeError):
+            return None
+    
+    def compile_intents(self, intents: Dict[str, Any], generation: int,
+                        source_signature: Optional[Tuple[int, int]] = None,
+                        source_checksum: Optional[Tuple[str, int]] = None) -> CompiledIntents:
+        """Compila índice y matcher para un conjunto de intents sin afectar al corpus en servicio"""
+        pattern_index = PatternIndex(intents, self.text_preprocessor)
+        matcher = create_matcher(self.matcher_backend, pattern_index, self.bm25_k1, self.bm25_b)
+        fuzzy_index = TrigramIndex(pattern_index.postings) if self.enable_fuzzy else None
+        return CompiledIntents(intents, pattern_index, matcher, generation, source_signature, fuzzy_index,
+                               source_checksum)
+    
+    def compile_from_artifact(self, artifact: CorpusArtifact, generation: int,
+                              source_signature: Optional[Tuple[int, int]] = None) -> CompiledIntents:
+        """Construye el corpus sobre las tablas mapeadas del artefacto, sin parsear ni tokenizar"""
+        pattern_index = artifact.pattern_index(self.text_preprocessor)
+        matcher = create_matcher(self.matcher_backend, pattern_index, self.bm25_k1, self.bm25_b)
+        fuzzy_index = None
+        if self.enable_fuzzy:
+            fuzzy_index = artifact.fuzzy_index() or TrigramIndex(pattern_index.postings)
+        checksum = (artifact.header["source_sha256"], artifact.header["source_size"])
+        return CompiledIntents({"intents": pattern_index.intents}, pattern_index,
+                               matcher, generation, source_signature, fuzzy_index, checksum, source="artifact")
+    
+    def compile_to(self, path: str, corpus: CompiledIntents = None) -> bool:
+        """Guarda el corpus (por defecto, el que está en servicio) como artefacto compilado"""
+        corpus = corpus or self._corpus
+        if corpus.source_checksum is None:
+            print("❌ No se puede compilar: el corpus no proviene de un intents.json válido")
+            return False
+        try:
+            write_artifact(path, corpus.source_checksum, corpus.intents, corpus.pattern_index, corpus.fuzzy_index)
+            print(f"✅ Artefacto compilado guardado en {path}")
+            return True
+        except Exception as e:
+            print(f"❌ Error guardando artefacto compilado: {e}")
+            return False
+    
+    def reload_intents(self) -> bool:
+        """Recarga intents.json, compila el nuevo corpus y lo intercambia de forma atómica.
+        
+        Si el archivo no es válido se conserva el corpus actual y se retorna False.
+        """
+        with self._reload_lock:
+            signature = self._source_signature()
+            try:
+                data = self._read_intents_file()
+                corpus = self.compile_intents(data, self._corpus.generation + 1, signature, data.pop("_checksum"))
+            except Exception as e:
+                self.last_reload_error = str(e)
+                # Recordar la firma fallida para no reintentar hasta el próximo cambio
+                self._rejected_signature = signature
+                print(f"❌ Recarga de intents rechazada, se mantiene la versión {self._corpus.generation}: {e}")
+                return False
+            
+            # Intercambio atómico: una sola asignación de referencia
+            self._corpus = corpus
+            self.result_cache.clear()
+            self.reload_count += 1
+            self.last_reload_error = None
+            print(f"🔄 Recargados {len(data['intents'])} intents (versión {corpus.generation})")
+            if self.compiled_file:
+                self.compile_to(self.compiled_file, corpus)
+            return True
+    
+    def reload_if_changed(self) -> bool:
+        """Recarga los intents solo si el archivo cambió desde la última carga"""
+        signature = self._source_signature()
+        if signature in (self._corpus.source_signature, self._rejected_signature):
+            return False
+        return self.reload_intents()
+    
+    def reload_from_artifact(self) -> bool:
+        """Remapea el artefacto compilado si corresponde al intents.json actual y a otra versión del corpus.
+        
+        No lee ni compila el JSON: el artefacto lo regenera otro proceso (ver start_auto_reload).
+        """
+        with self._reload_lock:
+            artifact = load_artifact(self.compiled_file, self.intents_file, self.text_preprocessor)
+            if artifact is None:
+                return False
+            checksum = (artifact.header["source_sha256"], artifact.header["source_size"])
+            if checksum == self._corpus.source_checksum:
+                return False
+            corpus = self.compile_from_artifact(artifact, self._corpus.generation + 1, self._source_signature())
+            
+            self._corpus = corpus
+            self.result_cache.clear()
+            self.reload_count += 1
+            self.last_reload_error = None
+            print(f"🔄 Remapeados {len(corpus.intents['intents'])} intents del artefacto (versión {corpus.generation})")
+            return True
+    
+    def remap_if_changed(self) -> bool:
+        """Remapea el artefacto compilado solo si el archivo cambió desde la última revisión"""
+        signature = self._file_signature(self.compiled_file)
+        if signature is None or signature == self._artifact_signature:
+            return False
+        self._artifact_signature = signature
+        return self.reload_from_artifact()
+    
+    def start_auto_reload(self, interval: float, rebuild: bool = True):
+        """Inicia un hilo que vigila cambios y recarga en segundo plano.
+        
+        Con rebuild=True vigila el mtime de intents.json, compila y regenera el artefacto; con
+        rebuild=False (y artefacto configurado) solo vigila el artefacto y lo remapea, para que
+        varios procesos no compilen ni reescriban el mismo archivo a la vez.
+        """
+        if interval <= 0 or self._watcher is not None:
+            return
+        check = self.reload_if_changed if rebuild or not self.compiled_file else self.remap_if_changed
+        self._watcher = PeriodicTask(check, interval, name="IntentsReloader")
+        self._watcher.start()
+    
+    def stop_auto_reload(self):
+        """Detiene el hilo de recarga automática"""
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+    
     def calculate_similarity(self, user_input: str, pattern: str) -> float:
         """Calcula similitud usando múltiples estrategias"""
         user_processed = self.text_preprocessor.full_preprocess(user_input)
@@ -67,34 +346,179 @@ class IntentsManager:
         
         return min(total_score, 1.0)  # Asegurar que no exceda 1.0
     
-    def find_best_intent(self, user_input: str) -> Dict[str, Any]:
-        """Encuentra el intent que mejor coincide con la entrada del usuario"""
-        best_intent = None
-        best_score = 0.0
-        best_pattern = ""
-        
-        for intent in self.intents["intents"]:
-            for pattern in intent["patterns"]:
-                score = self.calculate_similarity(user_input, pattern)
-                if score > best_score:
-                    best_score = score
-                    best_intent = intent
-                    best_pattern = pattern
-        
-        # Actualizar estadísticas
-        self.stats["total_queries"] += 1
-        if best_score > self.min_confidence:
-            self.stats["recognized_intents"] += 1
-        else:
-            self.stats["unknown_intents"] += 1
+    def find_best_intent(self, user_input: str, recent_tags: Sequence[int] = ()) -> Dict[str, Any]:
+        """Encuentra el intent que mejor coincide con la entrada del usuario (y el contexto de su sesión)"""
+        # Una sola lectura del corpus: toda la consulta usa la misma versión aunque haya una recarga
+        corpus = self._corpus
+        metrics = self.stage_metrics
+        
+        # La entrada se preprocesa una sola vez y solo se evalúan patrones con tokens en común
+        user_words = corpus.pattern_index.tokenize(user_input)
+        metrics.mark("preprocess")
+        
+        top_k = 1 + self.max_suggestions
+        cache_key = self._cache_key(corpus, user_words, top_k)
+        matches = self.result_cache.get(cache_key)
+        metrics.mark("cache")
         
-        # Actualizar confianza promedio
-        total_confidence = self.stats["average_confidence"] * (self.stats["total_queries"] - 1)
-        self.stats["average_confidence"] = (total_confidence + best_score) / self.stats["total_queries"]
+        if matches is None:
+            fuzzy_matches, exhausted = self._expand_fuzzy(corpus, user_words)
+            metrics.mark("fuzzy")
+            candidates = corpus.matcher.retrieve(user_words, fuzzy_matches, top_k, self.suggestion_min_confidence)
+            metrics.mark("retrieval")
+            matches = tuple(corpus.matcher.select_top(candidates, top_k, self.suggestion_min_confidence))
+            metrics.mark("scoring")
+            # Una expansión incompleta (presupuesto agotado) no se cachea: la siguiente consulta la reintenta
+            if not exhausted:
+                self.result_cache.put(cache_key, matches)
+        if recent_tags and matches and self.context_boost:
+            # La caché guarda el ranking sin sesgo; el contexto solo reordena el top-k
+            matches = self._apply_context(corpus, matches, recent_tags)
+        return self._finish_result(corpus, user_input, matches)
+    
+    def find_cached_intent(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """Como find_best_intent, pero solo desde la caché de resultados (modo degradado); None si no está"""
+        corpus = self._corpus
+        user_words = corpus.pattern_index.tokenize(user_input)
+        matches = self.result_cache.get(self._cache_key(corpus, user_words, 1 + self.max_suggestions))
+        if matches is None:
+            return None
+        return self._finish_result(corpus, user_input, matches)
+    
+    def _finish_result(self, corpus: CompiledIntents, user_input: str,
+                       matches: Tuple[Tuple[int, float], ...]) -> Dict[str, Any]:
+        """Resultado de clasificación a partir del top-k: estadísticas, log, alternativas y mejor candidato"""
+        best_id, best_score = matches[0] if matches else (None, 0.0)
+        best_intent, best_pattern = self._resolve_match(corpus, best_id)
         
-        # Log de la conversación
+        # Actualizar estadísticas y log de la conversación
+        self._update_stats([best_score])
         self.log_conversation(user_input, best_intent, best_score, best_pattern)
+        self.stage_metrics.mark("logging")
+        
+        result = self._build_result(best_intent, best_score, best_pattern)
+        result["alternatives"] = self._build_alternatives(corpus, matches[1:])
+        if result["status"] != "success" and best_intent is not None:
+            # Mejor candidato por debajo del umbral: útil como sugerencia, no como respuesta
+            result["best_guess"] = self._build_alternatives(corpus, matches[:1])[0]
+        return result
+    
+    def find_best_intents(self, user_inputs: List[str]) -> List[Dict[str, Any]]:
+        """Clasifica un lote de entradas en una sola pasada sobre el corpus"""
+        if not user_inputs:
+            return []
+        
+        corpus = self._corpus
+        
+        # Preprocesar en conjunto: entradas repetidas se tokenizan y evalúan una sola vez
+        input_keys = {
+            user_input: self._cache_key(corpus, corpus.pattern_index.tokenize(user_input), 1)
+            for user_input in dict.fromkeys(user_inputs)
+        }
+        key_matches = {}
+        for cache_key in dict.fromkeys(input_keys.values()):
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                key_matches[cache_key] = cached
+        
+        # Solo las entradas que no están en caché se evalúan contra el corpus
+        pending = [cache_key for cache_key in dict.fromkeys(input_keys.values()) if cache_key not in key_matches]
+        pending_words = [cache_key[2] for cache_key in pending]
+        expansions = [self._expand_fuzzy(corpus, user_words) for user_words in pending_words]
+        pending_fuzzy = [fuzzy_matches for fuzzy_matches, _ in expansions]
+        best = corpus.matcher.best_matches(pending_words, pending_fuzzy)
+        for cache_key, (best_id, best_score), (_, exhausted) in zip(pending, best, expansions):
+            # Mismo formato que find_best_intent con top-k = 1: tupla de (id de patrón, score)
+            matches = ((best_id, best_score),) if best_id is not None else ()
+            key_matches[cache_key] = matches
+            if not exhausted:
+                self.result_cache.put(cache_key, matches)
+        
+        unique_matches = {user_input: key_matches[cache_key] for user_input, cache_key in input_keys.items()}
+        
+        results = []
+        log_entries = []
+        scores = []
+        for user_input in user_inputs:
+            matches = unique_matches[user_input]
+            best_id, best_score = matches[0] if matches else (None, 0.0)
+            best_intent, best_pattern = self._resolve_match(corpus, best_id)
+            scores.append(best_score)
+            log_entries.append(self._make_log_entry(user_input, best_intent, best_score, best_pattern))
+            results.append(self._build_result(best_intent, best_score, best_pattern))
+        
+        # Estadísticas y log se actualizan una vez por lote
+        self._update_stats(scores)
+        self._append_log_entries(log_entries)
+        
+        return results
+    
+    def _expand_fuzzy(self, corpus: CompiledIntents,
+                      user_words: Iterable[str]) -> Tuple[Optional[Dict[str, float]], bool]:
+        """Etapa de coincidencia parcial: tokens fuera del vocabulario → palabras cercanas con peso.
+        
+        Retorna (coincidencias, presupuesto_agotado); con el presupuesto agotado la expansión es parcial.
+        """
+        if corpus.fuzzy_index is None:
+            return None, False
         
+        fuzzy_matches, exhausted = corpus.fuzzy_index.expand(
+            user_words,
+            known=corpus.pattern_index.postings,
+            min_similarity=self.fuzzy_min_similarity,
+            weight=self.fuzzy_weight,
+            time_budget=self.fuzzy_time_budget
+        )
+        if fuzzy_matches or exhausted:
+            self.stats.add_many({"fuzzy_expansions": len(fuzzy_matches), "fuzzy_budget_exhausted": int(exhausted)})
+        return fuzzy_matches, exhausted
+    
+    def _apply_context(self, corpus: CompiledIntents, matches: Tuple[Tuple[int, float], ...],
+                       recent_tags: Sequence[int]) -> Tuple[Tuple[int, float], ...]:
+        """Reordena el top-k sumando a cada candidato el bono de su contexto (decae con la antigüedad del turno).
+        
+        El bono solo afecta al orden: cada candidato conserva su confianza original, y uno no reconocido
+        (score <= min_confidence, igual que en _build_result) nunca pasa delante de uno reconocido, así el contexto no vuelve reconocida
+        una entrada que no lo era ni altera la confianza registrada.
+        """
+        tag_contexts = corpus.tag_contexts()
+        boosts = {}
+        for age, tag_key in enumerate(recent_tags):
+            context = tag_contexts.get(tag_key)
+            if context is not None:
+                boosts.setdefault(context, self.context_boost * self.context_decay ** age)
+        if not boosts:
+            return matches
+        
+        def rank(match: Tuple[int, float]) -> Tuple[bool, float, int]:
+            pattern_id, score = match
+            context = corpus.pattern_index.intent_for(pattern_id).get("context", "general")
+            return score <= self.min_confidence, -(score + boosts.get(context, 0.0)), pattern_id
+        
+        return tuple(sorted(matches, key=rank))
+    
+    @staticmethod
+    def _cache_key(corpus: CompiledIntents, user_words: Tuple[str, ...], top_k: int) -> Tuple[int, int, frozenset]:
+        """Clave de caché: el scoring solo depende de la versión del corpus, del top-k y del conjunto de tokens"""
+        return corpus.generation, top_k, frozenset(user_words)
+    
+    @staticmethod
+    def _resolve_match(corpus: CompiledIntents, best_id: Optional[int]) -> Tuple[Optional[Dict], str]:
+        """Traduce un id de patrón al intent y patrón correspondientes"""
+        if best_id is None:
+            return None, ""
+        return corpus.pattern_index.intent_for(best_id), corpus.pattern_index.patterns[best_id]
+    
+    def _build_alternatives(self, corpus: CompiledIntents, matches: Iterable[Tuple[int, float]]) -> List[Dict[str, Any]]:
+        """Intents alternativos (sin el mejor) con el patrón que coincidió, para sugerencias"""
+        alternatives = []
+        for pattern_id, score in matches:
+            intent, pattern = self._resolve_match(corpus, pattern_id)
+            alternatives.append({"tag": intent["tag"], "confidence": score, "matched_pattern": pattern})
+        return alternatives
+    
+    def _build_result(self, best_intent: Optional[Dict], best_score: float, best_pattern: str) -> Dict[str, Any]:
+        """Construye el resultado de clasificación según el umbral de confianza"""
         if best_score > self.min_confidence:
             return {
                 "intent": best_intent,
@@ -112,9 +536,23 @@ class IntentsManager:
                 "status": "unknown"
             }
     
+    def _update_stats(self, scores: List[float]):
+        """Actualiza contadores y suma de confianza con los scores de una o más consultas"""
+        recognized = sum(1 for score in scores if score > self.min_confidence)
+        self.stats.add_many({
+            "total_queries": len(scores),
+            "recognized_intents": recognized,
+            "unknown_intents": len(scores) - recognized,
+            "confidence_sum": sum(scores)
+        })
+    
     def log_conversation(self, user_input: str, intent: Dict, confidence: float, pattern: str):
         """Registra la conversación para análisis posterior"""
-        log_entry = {
+        self._append_log_entries([self._make_log_entry(user_input, intent, confidence, pattern)])
+    
+    def _make_log_entry(self, user_input: str, intent: Dict, confidence: float, pattern: str) -> Dict[str, Any]:
+        """Construye una entrada del log de conversaciones"""
+        return {
             "timestamp": datetime.now().isoformat(),
             "user_input": user_input,
             "intent_tag": intent["tag"] if intent else "unknown",
@@ -122,23 +560,110 @@ class IntentsManager:
             "matched_pattern": pattern,
             "recognized": confidence > self.min_confidence
         }
-        self.conversation_log.append(log_entry)
-        
-        # Mantener solo los últimos 100 logs en memoria
-        if len(self.conversation_log) > 100:
-            self.conversation_log.pop(0)
+    
+    def _append_log_entries(self, log_entries: List[Dict[str, Any]]):
+        """Agrega entradas al log; el deque descarta las más antiguas por encima de MAX_LOG_ENTRIES"""
+        self.conversation_log.extend(log_entries)
+        if self.conversation_writer is not None:
+            self.conversation_writer.submit_many(log_entries)
+    
+    def shared_stats_fields(self) -> List[str]:
+        """Campos que se agregan entre workers: consultas, caché ('cache_'), escritor ('writer_'),
+        histogramas por etapa ('stage_') y los niveles de SHARED_GAUGES"""
+        fields = list(self.stats.fields)
+        fields += [f"cache_{field}" for field in self.result_cache.counters.fields]
+        if self.conversation_writer is not None:
+            fields += [f"writer_{field}" for field in self.conversation_writer.counters.fields]
+        fields += self.stage_metrics.shared_fields()
+        fields += ["conversation_log_size", "cache_size"]
+        if self.conversation_writer is not None:
+            fields.append("writer_queue_size")
+        return fields
+    
+    def _local_counters(self) -> Dict[str, float]:
+        """Contadores de este proceso con los nombres de shared_stats_fields"""
+        counters = self.stats.snapshot()
+        counters.update({f"cache_{k}": v for k, v in self.result_cache.counters.snapshot().items()})
+        if self.conversation_writer is not None:
+            counters.update({f"writer_{k}": v for k, v in self.conversation_writer.counters.snapshot().items()})
+            counters["writer_queue_size"] = self.conversation_writer.get_statistics()["queue_size"]
+        counters.update(self.stage_metrics.values())
+        counters["conversation_log_size"] = len(self.conversation_log)
+        counters["cache_size"] = len(self.result_cache)
+        return counters
+    
+    def publish_statistics(self):
+        """Publica los contadores de este worker en la tabla compartida"""
+        if self.shared_stats is not None:
+            self.shared_stats.publish(self.worker_slot, self._local_counters())
+    
+    def attach_shared_stats(self, table: SharedStatsTable, slot: int, interval: float = 1.0):
+        """Activa la agregación entre workers: publica periódicamente en la fila `slot`"""
+        self.shared_stats = table
+        self.worker_slot = slot
+        self.publish_statistics()
+        self._publisher = PeriodicTask(self.publish_statistics, interval, name="StatsPublisher")
+        self._publisher.start()
     
     def get_statistics(self) -> Dict[str, Any]:
-        """Retorna estadísticas de uso del chatbot"""
-        recognition_rate = (self.stats["recognized_intents"] / self.stats["total_queries"] * 100) if self.stats["total_queries"] > 0 else 0
+        """Retorna estadísticas de uso del chatbot (sumadas entre workers en modo pre-fork)"""
+        if self.shared_stats is not None:
+            # La fila propia se publica al momento; las demás tienen a lo sumo un intervalo de retraso
+            self.publish_statistics()
+            counters = self.shared_stats.totals()
+        else:
+            counters = self._local_counters()
+        stats = {field: counters[field] for field in self.stats.fields}
+        cache_counters = {field: counters[f"cache_{field}"] for field in self.result_cache.counters.fields}
+        cache_statistics = self.result_cache.get_statistics(cache_counters)
+        cache_statistics["size"] = counters["cache_size"]
+        writer_statistics = None
+        if self.conversation_writer is not None:
+            writer_statistics = self.conversation_writer.get_statistics(
+                {field: counters[f"writer_{field}"] for field in self.conversation_writer.counters.fields}
+            )
+            writer_statistics["queue_size"] = counters["writer_queue_size"]
+        
+        total_queries = stats["total_queries"]
+        recognition_rate = (stats["recognized_intents"] / total_queries * 100) if total_queries > 0 else 0
+        average_confidence = (stats["confidence_sum"] / total_queries) if total_queries > 0 else 0.0
         
         return {
-            "total_queries": self.stats["total_queries"],
-            "recognized_intents": self.stats["recognized_intents"],
-            "unknown_intents": self.stats["unknown_intents"],
+            "total_queries": total_queries,
+            "recognized_intents": stats["recognized_intents"],
+            "unknown_intents": stats["unknown_intents"],
             "recognition_rate": round(recognition_rate, 2),
-            "average_confidence": round(self.stats["average_confidence"], 3),
-            "conversation_log_size": len(self.conversation_log)
+            "average_confidence": round(average_confidence, 3),
+            "conversation_log_size": counters["conversation_log_size"],
+            "matcher_backend": self.matcher.name,
+            "fuzzy_expansions": stats["fuzzy_expansions"],
+            "fuzzy_budget_exhausted": stats["fuzzy_budget_exhausted"],
+            "result_cache": cache_statistics,
+            "intents_version": self._corpus.generation,
+            "intents_loaded_at": self._corpus.loaded_at,
+            "intents_source": self._corpus.source,
+            "intents_reloads": self.reload_count,
+            "last_reload_error": self.last_reload_error,
+            "conversation_writer": writer_statistics,
+            "stage_latency": self.stage_metrics.get_statistics(self.stage_metric_values(counters)),
+            "workers": self._worker_statistics()
+        }
+    
+    def stage_metric_values(self, counters: Dict[str, float] = None) -> Optional[Dict[str, float]]:
+        """Histogramas por etapa sumados entre workers; None en un solo proceso (se usan los locales)"""
+        if self.shared_stats is None:
+            return None
+        return counters if counters is not None else self.shared_stats.totals()
+    
+    def _worker_statistics(self) -> Optional[Dict[str, Any]]:
+        """Resumen por worker en modo pre-fork; None en un solo proceso"""
+        if self.shared_stats is None:
+            return None
+        rows = self.shared_stats.rows()
+        return {
+            "count": len(rows),
+            "current_pid": os.getpid(),
+            "queries_per_worker": {str(int(row["pid"])): row["total_queries"] for row in rows}
         }
     
     def save_conversation_log(self, file_path: str = None):
@@ -150,7 +675,7 @@ class IntentsManager:
         
         try:
             with open(file_path, 'w', encoding='utf-8') as file:
-                json.dump(self.conversation_log, file, indent=2, ensure_ascii=False)
+                json.dump(list(self.conversation_log), file, indent=2, ensure_ascii=False)
             print(f"✅ Log de conversaciones guardado en: {file_path}")
         except Exception as e:
             print(f"❌ Error guardando log: {e}")
\ No newline at end of file
@@ -0,0 +1,231 @@
+import heapq
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Tuple, Optional, Iterable, Sequence
+from .pattern_index import PatternIndex
+
+class IndexMatcher:
+    """Motor de matching por defecto: recorre la lista invertida en Python puro"""
+
+    name = "index"
+
+    def __init__(self, pattern_index: PatternIndex):
+        self.index = pattern_index
+
+    def best_match(self, query_tokens: Iterable[str],
+                   fuzzy_matches: Dict[str, float] = None) -> Tuple[Optional[int], float]:
+        """Retorna (id de patrón, score) del mejor candidato"""
+        return self.index.best_match(query_tokens, fuzzy_matches)
+
+    def retrieve(self, query_tokens: Iterable[str], fuzzy_matches: Dict[str, float] = None,
+                 k: int = 1, min_score: float = 0.0) -> Dict[int, float]:
+        """Etapa de recuperación: patrones candidatos con su solapamiento (k y min_score solo los usa la poda)"""
+        return self.index.count_overlaps(set(query_tokens), fuzzy_matches)
+
+    def select(self, candidates: Dict[int, float]) -> Tuple[Optional[int], float]:
+        """Etapa de scoring: elige el mejor candidato recuperado"""
+        return self.index.select_best(candidates)
+
+    def select_top(self, candidates: Dict[int, float], k: int, min_score: float = 0.0) -> List[Tuple[int, float]]:
+        """Mejor patrón de cada intent para los k intents con mayor score (empates: menor id de patrón).
+
+        El primero siempre se incluye; los siguientes solo si su score es >= min_score.
+        """
+        best_by_intent: Dict[int, Tuple[float, int]] = {}
+        for pattern_id, overlap in candidates.items():
+            intent_idx = self.index.pattern_intents[pattern_id]
+            score = overlap / self.index.pattern_lengths[pattern_id]
+            current = best_by_intent.get(intent_idx)
+            if current is None or score > current[0] or (score == current[0] and pattern_id < current[1]):
+                best_by_intent[intent_idx] = (score, pattern_id)
+        ranked = heapq.nsmallest(k, best_by_intent.values(), key=lambda item: (-item[0], item[1]))
+        return [
+            (pattern_id, min(score, 1.0)) for rank, (score, pattern_id) in enumerate(ranked)
+            if score > 0.0 and (rank == 0 or score >= min_score)
+        ]
+
+    def top_matches(self, query_tokens: Iterable[str], fuzzy_matches: Dict[str, float] = None,
+                    k: int = 3, min_score: float = 0.0) -> List[Tuple[int, float]]:
+        """Retorna (id de patrón, score) del mejor patrón de los k intents más probables"""
+        return self.select_top(self.retrieve(query_tokens, fuzzy_matches, k, min_score), k, min_score)
+
+    def best_matches(self, queries: List[Iterable[str]],
+                     fuzzy_matches: List[Dict[str, float]] = None) -> List[Tuple[Optional[int], float]]:
+        """Retorna el mejor candidato para cada consulta de un lote"""
+        fuzzy_matches = fuzzy_matches or [None] * len(queries)
+        return [self.index.best_match(query_tokens, fuzzy) for query_tokens, fuzzy in zip(queries, fuzzy_matches)]
+
+    def intent_scores(self, query_tokens: Iterable[str],
+                      fuzzy_matches: Dict[str, float] = None) -> List[float]:
+        """Retorna el score máximo de cada intent"""
+        scores = [0.0] * len(self.index.intents)
+        for pattern_id, overlap in self.index.count_overlaps(set(query_tokens), fuzzy_matches).items():
+            intent_idx = self.index.pattern_intents[pattern_id]
+            score = overlap / self.index.pattern_lengths[pattern_id]
+            if score > scores[intent_idx]:
+                scores[intent_idx] = min(score, 1.0)
+        return scores
+
+
+class PrunedMatcher(IndexMatcher):
+    """Motor con poda estilo MaxScore para el top-k de intents.
+
+    Los términos de la consulta se procesan del más raro al más frecuente (orden IDF).
+    Un patrón de longitud L que solo contiene términos aún no procesados tiene score
+    <= peso_restante / L, así que una vez que hay un umbral (k-ésimo mejor score de
+    intent) solo hace falta recorrer el prefijo de patrones cortos de cada lista
+    (ordenada por longitud); los candidatos existentes se completan con búsqueda
+    binaria y se descartan en cuanto su cota superior queda por debajo del umbral.
+    El resultado es idéntico al del recorrido completo, con los mismos desempates.
+    """
+
+    name = "pruned"
+    # Margen para que las cotas en punto flotante nunca descarten un empate
+    EPSILON = 1e-9
+
+    def __init__(self, pattern_index: PatternIndex):
+        super().__init__(pattern_index)
+        # Listas ordenadas por (longitud, id) con sus longitudes, calculadas perezosamente por token
+        self._length_postings: Dict[str, Tuple[List[int], List[int]]] = {}
+
+    def _by_length(self, token: str) -> Tuple[List[int], List[int]]:
+        entry = self._length_postings.get(token)
+        if entry is None:
+            lengths = self.index.pattern_lengths
+            ordered = sorted(self.index.postings[token], key=lambda pattern_id: (lengths[pattern_id], pattern_id))
+            entry = (ordered, [lengths[pattern_id] for pattern_id in ordered])
+            # Carrera benigna: dos hilos pueden calcular la misma lista
+            self._length_postings[token] = entry
+        return entry
+
+    def retrieve(self, query_tokens: Iterable[str], fuzzy_matches: Dict[str, float] = None,
+                 k: int = 1, min_score: float = 0.0) -> Dict[int, float]:
+        """Recorrido podado: retorna los patrones que pueden estar en el top-k con su solapamiento exacto.
+
+        El mejor intent siempre es exacto; los siguientes k-1 solo se garantizan si su score es >= min_score.
+        """
+        postings = self.index.postings
+        lengths = self.index.pattern_lengths
+        exact_terms = [token for token in set(query_tokens) if token in postings]
+        fuzzy_terms = [(token, weight) for token, weight in (fuzzy_matches or {}).items() if token in postings]
+
+        # (token, peso, bit) con bit = posición del término; del más raro al más frecuente
+        terms = [(token, 1) for token in exact_terms] + fuzzy_terms
+        if not terms:
+            return {}
+        order = sorted(range(len(terms)), key=lambda position: len(postings[terms[position][0]]))
+        remaining = [0.0] * (len(order) + 1)
+        for step in range(len(order) - 1, -1, -1):
+            remaining[step] = remaining[step + 1] + terms[order[step]][1]
+
+        partial: Dict[int, float] = {}
+        hits: Dict[int, int] = {}
+        track_hits = bool(fuzzy_terms)
+
+        for step, position in enumerate(order):
+            token, weight = terms[position]
+            bit = 1 << position
+            posting = postings[token]
+
+            # El umbral solo compensa calcularlo cuando la lista es más larga que los candidatos
+            threshold = self._threshold(partial, k, min_score) if len(posting) > len(partial) else 0.0
+            if threshold <= 0.0:
+                for pattern_id in posting:
+                    partial[pattern_id] = partial.get(pattern_id, 0) + weight
+                    if track_hits:
+                        hits[pattern_id] = hits.get(pattern_id, 0) | bit
+                continue
+
+            # Patrones nuevos: solo los de longitud <= peso_restante / umbral pueden alcanzarlo
+            cutoff = threshold - self.EPSILON
+            limit = remaining[step] / cutoff
+            after = remaining[step + 1]
+            for pattern_id in list(partial):
+                length = lengths[pattern_id]
+                if length <= limit:
+                    continue  # se visita en el prefijo
+                overlap = partial[pattern_id]
+                if (overlap + remaining[step]) / length < cutoff:
+                    # Ni con todos los términos restantes alcanza el umbral
+                    del partial[pattern_id]
+                    hits.pop(pattern_id, None)
+                elif self._contains(posting, pattern_id):
+                    partial[pattern_id] = overlap + weight
+                    if track_hits:
+                        hits[pattern_id] |= bit
+                elif (overlap + after) / length < cutoff:
+                    del partial[pattern_id]
+                    hits.pop(pattern_id, None)
+
+            ordered, ordered_lengths = self._by_length(token)
+            for pattern_id in ordered[:bisect_right(ordered_lengths, limit)]:
+                partial[pattern_id] = partial.get(pattern_id, 0) + weight
+                if track_hits:
+                    hits[pattern_id] = hits.get(pattern_id, 0) | bit
+
+        if not track_hits:
+            return partial
+
+        # Solapamiento en el mismo orden de suma que count_overlaps: enteros primero, luego parciales
+        overlaps: Dict[int, float] = {}
+        n_exact = len(exact_terms)
+        for pattern_id, mask in hits.items():
+            overlap = bin(mask & ((1 << n_exact) - 1)).count("1")
+            for offset, (_, weight) in enumerate(fuzzy_terms):
+                if mask >> (n_exact + offset) & 1:
+                    overlap += weight
+            overlaps[pattern_id] = overlap
+        return overlaps
+
+    def _threshold(self, partial: Dict[int, float], k: int, min_score: float) -> float:
+        """Umbral de poda según los solapamientos parciales (cotas inferiores de los scores).
+
+        Un patrón por debajo del k-ésimo mejor intent no entra en el top-k; uno por debajo
+        de min(mejor intent, min_score) no puede ser ni el mejor ni una alternativa válida.
+        """
+        lengths = self.index.pattern_lengths
+        pattern_intents = self.index.pattern_intents
+        best_by_intent: Dict[int, float] = {}
+        for pattern_id, overlap in partial.items():
+            score = overlap / lengths[pattern_id]
+            intent_idx = pattern_intents[pattern_id]
+            if score > best_by_intent.get(intent_idx, 0.0):
+                best_by_intent[intent_idx] = score
+        if not best_by_intent:
+            return 0.0
+        ranked = heapq.nlargest(k, best_by_intent.values())
+        kth_score = ranked[-1] if len(ranked) == k else 0.0
+        return max(kth_score, min(ranked[0], min_score))
+
+    @staticmethod
+    def _contains(posting: Sequence[int], pattern_id: int) -> bool:
+        position = bisect_left(posting, pattern_id)
+        return position < len(posting) and posting[position] == pattern_id
+
+    def best_match(self, query_tokens: Iterable[str],
+                   fuzzy_matches: Dict[str, float] = None) -> Tuple[Optional[int], float]:
+        """Retorna (id de patrón, score) del mejor candidato"""
+        return self.select(self.retrieve(query_tokens, fuzzy_matches, 1))
+
+    def best_matches(self, queries: List[Iterable[str]],
+                     fuzzy_matches: List[Dict[str, float]] = None) -> List[Tuple[Optional[int], float]]:
+        """Retorna el mejor candidato para cada consulta de un lote"""
+        fuzzy_matches = fuzzy_matches or [None] * len(queries)
+        return [self.best_match(query_tokens, fuzzy) for query_tokens, fuzzy in zip(queries, fuzzy_matches)]
+
+
+MATCHER_BACKENDS = ("index", "pruned", "numpy", "bm25")
+
+def create_matcher(backend: str, pattern_index: PatternIndex, bm25_k1: float = 1.2, bm25_b: float = 0.75):
+    """Construye el motor de matching configurado en Config.MATCHER_BACKEND"""
+    if backend == "index":
+        return IndexMatcher(pattern_index)
+    if backend == "pruned":
+        return PrunedMatcher(pattern_index)
+    if backend == "numpy":
+        # Importación diferida: numpy solo se requiere si se selecciona este backend
+        from .numpy_matcher import NumpyMatcher
+        return NumpyMatcher(pattern_index)
+    if backend == "bm25":
+        from .bm25_matcher import BM25Matcher
+        return BM25Matcher(pattern_index, k1=bm25_k1, b=bm25_b)
+    raise ValueError(f"Backend de matching desconocido: {backend} (opciones: {', '.join(MATCHER_BACKENDS)})")
@@ -0,0 +1,179 @@
+import numpy as np
+from typing import Dict, List, Tuple, Optional, Iterable
+from .pattern_index import PatternIndex
+
+class NumpyMatcher:
+    """Motor de matching vectorizado sobre una matriz dispersa patrón × vocabulario (formato CSC)"""
+
+    name = "numpy"
+    BATCH_CELLS = 4_000_000
+
+    def __init__(self, pattern_index: PatternIndex):
+        self.index = pattern_index
+        self.n_patterns = len(pattern_index)
+        self.n_intents = len(pattern_index.intents)
+
+        # Vocabulario fijo: token → columna
+        vocabulary, offsets, rows = pattern_index.posting_arrays()
+        self.vocabulary = {token: column for column, token in enumerate(vocabulary)}
+
+        # Columnas de la matriz: ids de patrón concatenados y offsets por token.
+        # Con un artefacto mapeado en memoria np.frombuffer no copia: las páginas se comparten
+        self.column_offsets = np.frombuffer(offsets, dtype=np.int64)
+        self.column_rows = np.frombuffer(rows, dtype=np.int32) if len(rows) else np.zeros(0, dtype=np.int32)
+
+        # |pattern_words| como float64; los patrones vacíos nunca aparecen en la matriz
+        self.pattern_lengths = np.maximum(np.asarray(pattern_index.pattern_lengths, dtype=np.float64), 1.0)
+        self.pattern_intents = np.asarray(pattern_index.pattern_intents, dtype=np.int64)
+
+        # Inicio del bloque de patrones de cada intent con al menos un patrón (para reduceat)
+        counts = np.bincount(self.pattern_intents, minlength=self.n_intents)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1])) if self.n_intents else np.zeros(0, dtype=np.int64)
+        self.nonempty_intents = np.flatnonzero(counts)
+        self.intent_starts = starts[self.nonempty_intents]
+
+    def _columns(self, query_tokens: Iterable[str]) -> List[int]:
+        """Traduce los tokens de la consulta a columnas del vocabulario"""
+        columns = (self.vocabulary.get(token) for token in set(query_tokens))
+        return [column for column in columns if column is not None]
+
+    def _rows(self, columns: List[int]) -> np.ndarray:
+        """Concatena las filas (ids de patrón) no nulas de las columnas dadas"""
+        return np.concatenate([self.column_rows[self.column_offsets[c]:self.column_offsets[c + 1]] for c in columns])
+
+    def _fuzzy_rows(self, fuzzy_matches: Dict[str, float]) -> List[Tuple[np.ndarray, float]]:
+        """Filas y peso de cada coincidencia parcial {palabra del vocabulario: peso}, en el orden del dict"""
+        rows = []
+        for token, weight in (fuzzy_matches or {}).items():
+            column = self.vocabulary.get(token)
+            if column is None:
+                continue
+            rows.append((self.column_rows[self.column_offsets[column]:self.column_offsets[column + 1]], weight))
+        return rows
+
+    @staticmethod
+    def _add_fuzzy(overlaps: np.ndarray, fuzzy_rows: List[Tuple[np.ndarray, float]]) -> np.ndarray:
+        """Suma los pesos parciales token por token sobre los conteos exactos.
+
+        Mismo orden de sumas que PatternIndex.count_overlaps, ((conteo + w1) + w2): sumar
+        primero los pesos entre sí podría redondear distinto. Las filas de una columna no
+        se repiten, así que la suma con índices es segura.
+        """
+        overlaps = overlaps.astype(np.float64)
+        for rows, weight in fuzzy_rows:
+            overlaps[rows] += weight
+        return overlaps
+
+    def retrieve(self, query_tokens: Iterable[str], fuzzy_matches: Dict[str, float] = None,
+                 k: int = 1, min_score: float = 0.0) -> np.ndarray:
+        """Etapa de recuperación: vector de solapamiento de todos los patrones"""
+        columns = self._columns(query_tokens)
+        fuzzy_rows = self._fuzzy_rows(fuzzy_matches)
+        if not self.n_patterns or not (columns or fuzzy_rows):
+            return np.zeros(self.n_patterns, dtype=np.int64)
+
+        # Coincidencias exactas como conteos enteros: mismo resultado que |overlap|/|pattern|
+        if columns:
+            overlaps = np.bincount(self._rows(columns), minlength=self.n_patterns)
+        else:
+            overlaps = np.zeros(self.n_patterns, dtype=np.int64)
+        if fuzzy_rows:
+            overlaps = self._add_fuzzy(overlaps, fuzzy_rows)
+        return overlaps
+
+    def pattern_scores(self, query_tokens: Iterable[str], fuzzy_matches: Dict[str, float] = None) -> np.ndarray:
+        """Calcula overlap/|pattern| para todos los patrones en una sola operación"""
+        return self.retrieve(query_tokens, fuzzy_matches) / self.pattern_lengths
+
+    def select(self, overlaps: np.ndarray) -> Tuple[Optional[int], float]:
+        """Etapa de scoring: argmax devuelve el primer máximo, igual que el bucle original"""
+        if not len(overlaps):
+            return None, 0.0
+
+        scores = overlaps / self.pattern_lengths
+        best_id = int(np.argmax(scores))
+        best_score = float(scores[best_id])
+        if best_score <= 0.0:
+            return None, 0.0
+        return best_id, min(best_score, 1.0)
+
+    def select_top(self, overlaps: np.ndarray, k: int, min_score: float = 0.0) -> List[Tuple[int, float]]:
+        """Mejor patrón de cada intent para los k intents con mayor score (empates: menor id de patrón).
+
+        El primero siempre se incluye; los siguientes solo si su score es >= min_score.
+        """
+        candidates = np.flatnonzero(overlaps)
+        if not len(candidates):
+            return []
+        scores = overlaps[candidates] / self.pattern_lengths[candidates]
+        # Orden por score descendente y, en empate, id de patrón ascendente
+        order = np.lexsort((candidates, -scores))
+        results: List[Tuple[int, float]] = []
+        seen_intents = set()
+        for position in order.tolist():
+            pattern_id = int(candidates[position])
+            intent_idx = int(self.pattern_intents[pattern_id])
+            if intent_idx in seen_intents:
+                continue
+            if results and scores[position] < min_score:
+                break
+            seen_intents.add(intent_idx)
+            results.append((pattern_id, min(float(scores[position]), 1.0)))
+            if len(results) == k:
+                break
+        return results
+
+    def top_matches(self, query_tokens: Iterable[str], fuzzy_matches: Dict[str, float] = None,
+                    k: int = 3, min_score: float = 0.0) -> List[Tuple[int, float]]:
+        """Retorna (id de patrón, score) del mejor patrón de los k intents más probables"""
+        return self.select_top(self.retrieve(query_tokens, fuzzy_matches), k, min_score)
+
+    def best_match(self, query_tokens: Iterable[str],
+                   fuzzy_matches: Dict[str, float] = None) -> Tuple[Optional[int], float]:
+        """Retorna (id de patrón, score) del mejor candidato"""
+        return self.select(self.retrieve(query_tokens, fuzzy_matches))
+
+    def best_matches(self, queries: List[Iterable[str]],
+                     fuzzy_matches: List[Dict[str, float]] = None) -> List[Tuple[Optional[int], float]]:
+        """Evalúa un lote de consultas como una matriz consultas × patrones, por bloques"""
+        results: List[Tuple[Optional[int], float]] = []
+        if not self.n_patterns:
+            return [(None, 0.0)] * len(queries)
+        fuzzy_matches = fuzzy_matches or [None] * len(queries)
+
+        # Limitar la matriz densa de cada bloque a ~4M celdas
+        block_size = max(1, self.BATCH_CELLS // self.n_patterns)
+        for block_start in range(0, len(queries), block_size):
+            block = queries[block_start:block_start + block_size]
+            block_fuzzy = fuzzy_matches[block_start:block_start + block_size]
+            cells = len(block) * self.n_patterns
+            row_chunks, fuzzy_chunks = [], []
+            for query_idx, (query_tokens, fuzzy) in enumerate(zip(block, block_fuzzy)):
+                offset = query_idx * self.n_patterns
+                for c in self._columns(query_tokens):
+                    row_chunks.append(self.column_rows[self.column_offsets[c]:self.column_offsets[c + 1]] + offset)
+                fuzzy_chunks.extend((rows + offset, weight) for rows, weight in self._fuzzy_rows(fuzzy))
+
+            if row_chunks:
+                overlaps = np.bincount(np.concatenate(row_chunks), minlength=cells)
+            else:
+                overlaps = np.zeros(cells, dtype=np.int64)
+            if fuzzy_chunks:
+                # Cada consulta ocupa su propio bloque de celdas: el orden por celda se conserva
+                overlaps = self._add_fuzzy(overlaps, fuzzy_chunks)
+            scores = overlaps.reshape(len(block), self.n_patterns) / self.pattern_lengths
+
+            best_ids = np.argmax(scores, axis=1)
+            best_scores = scores[np.arange(len(block)), best_ids]
+            for best_id, best_score in zip(best_ids.tolist(), best_scores.tolist()):
+                results.append((best_id, min(best_score, 1.0)) if best_score > 0.0 else (None, 0.0))
+
+        return results
+
+    def intent_scores(self, query_tokens: Iterable[str], fuzzy_matches: Dict[str, float] = None) -> List[float]:
+        """Retorna el score máximo de cada intent"""
+        scores = np.minimum(self.pattern_scores(query_tokens, fuzzy_matches), 1.0)
+        maxima = np.zeros(self.n_intents, dtype=np.float64)
+        if len(self.intent_starts):
+            maxima[self.nonempty_intents] = np.maximum.reduceat(scores, self.intent_starts)
+        return maxima.tolist()
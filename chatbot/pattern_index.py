@@ -0,0 +1,109 @@
+from array import array
+from typing import Dict, List, Any, Tuple, Optional, Iterable, Sequence
+from .utils.text_preprocessor import TextPreprocessor
+
+class PatternIndex:
+    """Índice compilado de patrones: tokens precalculados y lista invertida token → patrones"""
+
+    def __init__(self, intents: Dict[str, Any], text_preprocessor: TextPreprocessor = None):
+        self.text_preprocessor = text_preprocessor or TextPreprocessor()
+
+        # Tablas paralelas indexadas por id de patrón (orden de aparición en intents.json)
+        self.patterns: List[str] = []
+        self.pattern_intents: List[int] = []
+        self.pattern_lengths: List[int] = []
+
+        # Lista invertida: token → ids de patrón en orden creciente
+        self.postings: Dict[str, Sequence[int]] = {}
+
+        self.intents = intents.get("intents", [])
+        self._posting_arrays = None
+        self._build()
+
+    @classmethod
+    def from_tables(cls, intents: Dict[str, Any], patterns: Sequence[str], pattern_intents: Sequence[int],
+                    pattern_lengths: Sequence[int], postings: Dict[str, Sequence[int]],
+                    posting_arrays: Tuple[List[str], Sequence[int], Sequence[int]] = None,
+                    text_preprocessor: TextPreprocessor = None) -> "PatternIndex":
+        """Construye el índice a partir de tablas ya compiladas (artefacto en disco), sin tokenizar"""
+        index = cls.__new__(cls)
+        index.text_preprocessor = text_preprocessor or TextPreprocessor()
+        index.patterns = patterns
+        index.pattern_intents = pattern_intents
+        index.pattern_lengths = pattern_lengths
+        index.postings = postings
+        index.intents = intents.get("intents", [])
+        index._posting_arrays = posting_arrays
+        return index
+
+    def _build(self):
+        """Preprocesa cada patrón una sola vez y construye la lista invertida"""
+        for intent_idx, intent in enumerate(self.intents):
+            for pattern in intent["patterns"]:
+                pattern_id = len(self.patterns)
+                pattern_words = set(self.tokenize(pattern))
+
+                self.patterns.append(pattern)
+                self.pattern_intents.append(intent_idx)
+                self.pattern_lengths.append(len(pattern_words))
+
+                for token in pattern_words:
+                    self.postings.setdefault(token, []).append(pattern_id)
+
+    def posting_arrays(self) -> Tuple[List[str], Sequence[int], Sequence[int]]:
+        """Lista invertida en formato CSR: (tokens ordenados, offsets int64, ids de patrón int32)"""
+        if self._posting_arrays is None:
+            vocabulary = sorted(self.postings)
+            offsets = array('q', [0])
+            rows = array('i')
+            for token in vocabulary:
+                rows.extend(self.postings[token])
+                offsets.append(len(rows))
+            self._posting_arrays = (vocabulary, offsets, rows)
+        return self._posting_arrays
+
+    def tokenize(self, text: str) -> Tuple[str, ...]:
+        """Aplica el mismo preprocesamiento que calculate_similarity en una sola pasada"""
+        return self.text_preprocessor.preprocess_tokens(text)
+
+    def count_overlaps(self, query_tokens: Iterable[str],
+                       fuzzy_matches: Dict[str, float] = None) -> Dict[int, float]:
+        """Cuenta tokens compartidos solo para los patrones candidatos.
+
+        fuzzy_matches ({palabra del vocabulario: peso}) suma coincidencias parciales
+        con peso menor a 1; sin ellas los conteos son enteros, como el score exacto.
+        """
+        overlaps: Dict[int, float] = {}
+        for token in query_tokens:
+            for pattern_id in self.postings.get(token, ()):
+                overlaps[pattern_id] = overlaps.get(pattern_id, 0) + 1
+        if fuzzy_matches:
+            for token, weight in fuzzy_matches.items():
+                for pattern_id in self.postings.get(token, ()):
+                    overlaps[pattern_id] = overlaps.get(pattern_id, 0) + weight
+        return overlaps
+
+    def best_match(self, query_tokens: Iterable[str],
+                   fuzzy_matches: Dict[str, float] = None) -> Tuple[Optional[int], float]:
+        """Retorna (id de patrón, score) del mejor candidato; en empate gana el primer patrón"""
+        return self.select_best(self.count_overlaps(set(query_tokens), fuzzy_matches))
+
+    def select_best(self, overlaps: Dict[int, float]) -> Tuple[Optional[int], float]:
+        """Calcula overlap/|pattern| de los candidatos y elige el mejor"""
+        best_id = None
+        best_score = 0.0
+
+        for pattern_id, overlap in overlaps.items():
+            score = overlap / self.pattern_lengths[pattern_id]
+            if score > best_score or (score == best_score and best_id is not None and pattern_id < best_id):
+                best_score = score
+                best_id = pattern_id
+
+        return best_id, min(best_score, 1.0)
+
+    def intent_for(self, pattern_id: int) -> Dict[str, Any]:
+        """Retorna el intent al que pertenece un patrón"""
+        return self.intents[self.pattern_intents[pattern_id]]
+
+    def __len__(self) -> int:
+        return len(self.patterns)
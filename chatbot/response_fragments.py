@@ -0,0 +1,58 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+# Campos que cambian en cada petición; todo lo demás del cuerpo de /chat es estático
+DYNAMIC_FIELDS = ("confidence", "input_length", "timestamp")
+# Separador entre fragmentos: json.dumps nunca deja un NUL literal en su salida
+_SPLIT = "\x00"
+
+
+def encode_json(payload: Dict[str, Any]) -> bytes:
+    """Serialización de /chat cuando no hay fragmento: mismas claves ordenadas y formato compacto"""
+    return json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+class ResponseFragments:
+    """Cuerpos JSON de /chat precodificados en UTF-8 para una versión del corpus.
+
+    Cada variante posible de la respuesta (texto elegido, nota de confianza media,
+    combinación de respaldo) se serializa una sola vez: las claves ordenadas y el texto
+    escapado quedan como fragmentos de bytes, y por petición solo se intercalan la
+    confianza, la longitud de la entrada y el timestamp. Las respuestas con sugerencias
+    dependen de la consulta y no tienen fragmento (render retorna None).
+    """
+
+    def __init__(self, generation: int, variants: Iterable[Tuple[Hashable, Dict[str, Any]]]):
+        self.generation = generation
+        self.templates: Dict[Hashable, Tuple[bytes, ...]] = {key: self.compile(fields) for key, fields in variants}
+        self.memory_bytes = sum(len(part) for parts in self.templates.values() for part in parts)
+
+    @staticmethod
+    def compile(fields: Dict[str, Any]) -> Tuple[bytes, ...]:
+        """Serializa los campos estáticos y deja un hueco por cada campo dinámico (en orden de clave)"""
+        placeholders = {name: f"{_SPLIT}{name}{_SPLIT}" for name in DYNAMIC_FIELDS}
+        text = json.dumps({**fields, **placeholders}, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        for placeholder in placeholders.values():
+            text = text.replace(json.dumps(placeholder), _SPLIT)
+        return tuple(part.encode("utf-8") for part in text.split(_SPLIT))
+
+    def render(self, key: Hashable, confidence: float, input_length: int) -> Optional[bytes]:
+        """Cuerpo completo de la variante `key`; None si no hay fragmento para ella"""
+        parts = self.templates.get(key)
+        if parts is None:
+            return None
+        head, after_confidence, after_length, tail = parts
+        return b"".join((
+            head, repr(float(confidence)).encode(),
+            after_confidence, str(input_length).encode(),
+            after_length, b'"', datetime.now().isoformat().encode(), b'"',
+            tail
+        ))
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            "generation": self.generation,
+            "templates": len(self.templates),
+            "memory_bytes": self.memory_bytes
+        }
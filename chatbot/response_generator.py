@@ -1,11 +1,33 @@
 import random
 import logging
-from typing import Dict, Any, List
+import threading
+from collections import Counter
+from typing import Dict, Any, Iterator, List, NamedTuple, Optional, Tuple
 from datetime import datetime
+from .response_fragments import ResponseFragments, encode_json
+from .utils.session_store import SessionState, SessionStore
+
+class ResponsePlan(NamedTuple):
+    """Respuesta elegida para una consulta, sin construir el texto.
+
+    source: "responses" (del intent), "welcome" (saludo de regreso), "fallback" (respaldo;
+    index combina respuesta general y sugerencia), "suggestions" (¿quisiste decir...?) o
+    "busy" (aviso de espera del modo degradado, status "degraded").
+    """
+    status: str
+    tag: str
+    intent: Optional[Dict[str, Any]]
+    source: str
+    index: int
+    low_confidence: bool
+    suggestions: List[Dict[str, Any]]
+
 
 class ResponseGenerator:
-    def __init__(self, intents_manager):
+    def __init__(self, intents_manager, session_store: SessionStore = None, prerender: bool = True):
         self.intents_manager = intents_manager
+        # Contexto por conversación (opcional): sesga el scoring y la elección de respuesta
+        self.session_store = session_store
         self.logger = self.setup_logger()
         
         # Respuestas por defecto organizadas por contexto
@@ -24,8 +46,18 @@ class ResponseGenerator:
                 "¿Te interesa saber sobre las **técnicas de estudio** como Pomodoro o mapas mentales?",
                 "¿Necesitas ayuda con el **acceso a la plataforma** o **participación en foros**?",
                 "¿Quieres información sobre la **evaluación** o **duración del módulo**?"
+            ],
+            "busy": [
+                "⏳ En este momento estoy atendiendo a muchos estudiantes. Por favor, intenta tu pregunta de nuevo en unos segundos."
             ]
         }
+        
+        # Cuerpos JSON precodificados por versión del corpus (render_response)
+        self.prerender = prerender
+        self._fragments: Optional[ResponseFragments] = None
+        self._fragments_lock = threading.Lock()
+        if prerender:
+            self._fragments_for(intents_manager.corpus)
     
     def setup_logger(self):
         """Configura el sistema de logging"""
@@ -40,67 +72,299 @@ class ResponseGenerator:
         
         return logger
     
-    def get_response(self, user_input: str) -> Dict[str, Any]:
+    def get_response(self, user_input: str, session_id: str = None) -> Dict[str, Any]:
         """Genera una respuesta contextual para la entrada del usuario"""
         try:
-            intent_result = self.intents_manager.find_best_intent(user_input)
+            intent_result, plan = self._respond(user_input, session_id)
+            return self._response_data(user_input, intent_result, plan)
             
-            if intent_result["status"] == "success":
-                response_data = self._get_intent_response(intent_result)
-            else:
-                response_data = self._get_unknown_response(intent_result)
+        except Exception as e:
+            self.logger.error(f"Error generando respuesta: {e}")
+            return self._get_error_response()
+    
+    def render_response(self, user_input: str, session_id: str = None) -> bytes:
+        """Como get_response, pero retorna el cuerpo JSON ya codificado (desde los fragmentos si es posible)"""
+        try:
+            corpus = self.intents_manager.corpus
+            intent_result, plan = self._respond(user_input, session_id)
             
-            # Agregar metadata
-            response_data.update({
-                "timestamp": datetime.now().isoformat(),
-                "input_length": len(user_input),
-                "response_length": len(response_data["response"])
-            })
+            body = None
+            # Si hubo una recarga durante la clasificación, el intent no pertenece a estos fragmentos
+            if self.prerender and self.intents_manager.corpus is corpus:
+                body = self._fragments_for(corpus).render(
+                    self._fragment_key(plan), intent_result["confidence"], len(user_input))
+            if body is None:
+                body = encode_json(self._response_data(user_input, intent_result, plan))
+            return body
             
-            self.logger.info(f"Respuesta generada - Tag: {response_data['tag']}, Confianza: {intent_result['confidence']:.3f}")
+        except Exception as e:
+            self.logger.error(f"Error generando respuesta: {e}")
+            return encode_json(self._get_error_response())
+    
+    def render_degraded(self, user_input: str) -> bytes:
+        """Respuesta barata bajo sobrecarga: desde la caché de resultados o, si no está, un aviso de espera.
+
+        No consulta la sesión ni evalúa patrones.
+        """
+        try:
+            corpus = self.intents_manager.corpus
+            intent_result, plan = self._respond_degraded(user_input)
             
-            return response_data
+            body = None
+            if self.prerender and self.intents_manager.corpus is corpus:
+                body = self._fragments_for(corpus).render(
+                    self._fragment_key(plan), intent_result["confidence"], len(user_input))
+            if body is None:
+                body = encode_json(self._response_data(user_input, intent_result, plan))
+            return body
             
         except Exception as e:
-            self.logger.error(f"Error generando respuesta: {e}")
+            self.logger.error(f"Error generando respuesta degradada: {e}")
+            return encode_json(self._get_error_response())
+    
+    def get_degraded_response(self, user_input: str) -> Dict[str, Any]:
+        """Como render_degraded, pero retorna el diccionario (streaming y lotes)"""
+        try:
+            intent_result, plan = self._respond_degraded(user_input)
+            return self._response_data(user_input, intent_result, plan)
+            
+        except Exception as e:
+            self.logger.error(f"Error generando respuesta degradada: {e}")
             return self._get_error_response()
     
-    def _get_intent_response(self, intent_result: Dict[str, Any]) -> Dict[str, Any]:
-        """Genera respuesta para un intent reconocido"""
-        intent = intent_result["intent"]
+    def _respond_degraded(self, user_input: str) -> Tuple[Dict[str, Any], ResponsePlan]:
+        """Plan del modo degradado: resultado cacheado o aviso de espera, sin sesión ni scoring"""
+        intent_result = self.intents_manager.find_cached_intent(user_input)
+        if intent_result is not None:
+            plan = self._plan(intent_result)
+        else:
+            intent_result = {"confidence": 0.0}
+            plan = ResponsePlan("degraded", "unknown", None, "busy",
+                                random.randrange(len(self.default_responses["busy"])), False, [])
+        self.intents_manager.stage_metrics.mark("response")
+        return intent_result, plan
+    
+    def _respond(self, user_input: str, session_id: str = None) -> Tuple[Dict[str, Any], ResponsePlan]:
+        """Clasifica la entrada (con el contexto de la sesión), elige la respuesta y registra el turno"""
+        session = None
+        if self.session_store is not None:
+            session = self.session_store.get(session_id)
+            self.intents_manager.stage_metrics.mark("session")
         
-        # Seleccionar respuesta aleatoria
-        response = random.choice(intent["responses"])
+        intent_result = self.intents_manager.find_best_intent(user_input, session.recent_tags if session else ())
+        plan = self._plan(intent_result, session)
+        if self.session_store is not None:
+            recognized_tag = intent_result["tag"] if intent_result["status"] == "success" else None
+            response_index = plan.index if plan.source == "responses" else None
+            self.session_store.record(session_id, recognized_tag, response_index)
+        self.intents_manager.stage_metrics.mark("response")
         
-        # Agregar sugerencias si el contexto lo permite
-        if intent_result["confidence"] < 0.6:  # Confianza media
-            response += "\n\n¿Es esto lo que necesitabas? Si no, por favor reformula tu pregunta."
+        self.logger.info(f"Respuesta generada - Tag: {plan.tag}, Confianza: {intent_result['confidence']:.3f}")
         
-        return {
-            "response": response,
-            "tag": intent_result["tag"],
+        return intent_result, plan
+    
+    def stream_response(self, user_input: str, session_id: str = None, chunk_size: int = 80,
+                        degraded: bool = False) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Respuesta por eventos: metadata (tag, confianza) primero, luego el texto en fragmentos"""
+        if degraded:
+            response_data = self.get_degraded_response(user_input)
+        else:
+            response_data = self.get_response(user_input, session_id)
+        text = response_data["response"]
+        yield "meta", {key: value for key, value in response_data.items() if key != "response"}
+        for chunk in self.split_chunks(text, chunk_size):
+            yield "chunk", {"text": chunk}
+        yield "done", {"response_length": len(text)}
+    
+    @staticmethod
+    def split_chunks(text: str, size: int) -> Iterator[str]:
+        """Divide el texto en fragmentos de hasta `size` caracteres, cortando en espacios o saltos de línea"""
+        size = max(1, size)
+        start = 0
+        while start < len(text):
+            end = min(start + size, len(text))
+            if end < len(text):
+                cut = max(text.rfind(" ", start, end), text.rfind("\n", start, end))
+                if cut > start:
+                    end = cut + 1
+            yield text[start:end]
+            start = end
+    
+    def get_responses(self, user_inputs: List[str], degraded: bool = False) -> List[Dict[str, Any]]:
+        """Genera respuestas para un lote de entradas con una sola clasificación (degraded: sin scoring)"""
+        if degraded:
+            return [self.get_degraded_response(user_input) for user_input in user_inputs]
+        try:
+            intent_results = self.intents_manager.find_best_intents(user_inputs)
+            responses = [
+                self._build_response(user_input, intent_result)
+                for user_input, intent_result in zip(user_inputs, intent_results)
+            ]
+            
+            recognized = sum(1 for response in responses if response["status"] == "success")
+            self.logger.info(f"Lote procesado - Mensajes: {len(responses)}, Reconocidos: {recognized}")
+            
+            return responses
+            
+        except Exception as e:
+            self.logger.error(f"Error generando respuestas del lote: {e}")
+            return [self._get_error_response() for _ in user_inputs]
+    
+    def _build_response(self, user_input: str, intent_result: Dict[str, Any],
+                        session: Optional[SessionState] = None) -> Dict[str, Any]:
+        """Construye la respuesta completa (con metadata) para un resultado de clasificación"""
+        return self._response_data(user_input, intent_result, self._plan(intent_result, session))
+    
+    def _response_data(self, user_input: str, intent_result: Dict[str, Any], plan: ResponsePlan) -> Dict[str, Any]:
+        """Campos de la respuesta elegida más la metadata de la petición"""
+        response_data = self._plan_fields(plan)
+        response_data.update({
             "confidence": intent_result["confidence"],
-            "status": "success",
-            "has_suggestions": intent_result["confidence"] < 0.6,
-            "context": intent.get("context", "general")
-        }
+            "timestamp": datetime.now().isoformat(),
+            "input_length": len(user_input)
+        })
+        return response_data
+    
+    def _plan(self, intent_result: Dict[str, Any], session: Optional[SessionState] = None) -> ResponsePlan:
+        """Elige la respuesta (sin construir el texto) para un resultado de clasificación"""
+        suggestions = self._get_suggestions(intent_result)
+        
+        if intent_result["status"] == "success":
+            intent = intent_result["intent"]
+            source, index = self._select_response(intent, session)
+            low_confidence = intent_result["confidence"] < 0.6  # Confianza media
+            return ResponsePlan("success", intent_result["tag"], intent, source, index, low_confidence,
+                                suggestions if low_confidence else [])
+        
+        if suggestions:
+            return ResponsePlan("unknown", "unknown", None, "suggestions", -1, False, suggestions)
+        
+        # Respuesta general y sugerencia de respaldo combinadas en un solo índice
+        tips = len(self.default_responses["fallback_suggestions"])
+        index = random.randrange(len(self.default_responses["general"])) * tips + random.randrange(tips)
+        return ResponsePlan("unknown", "unknown", None, "fallback", index, False, [])
     
-    def _get_unknown_response(self, intent_result: Dict[str, Any]) -> Dict[str, Any]:
-        """Genera respuesta para intent desconocido"""
-        base_response = random.choice(self.default_responses["general"])
-        suggestion = random.choice(self.default_responses["fallback_suggestions"])
+    def _select_response(self, intent: Dict[str, Any], session: Optional[SessionState]) -> Tuple[str, int]:
+        """Elige la respuesta: saludo de regreso en sesiones con turnos previos y sin repetir la anterior"""
+        if session is None:
+            return "responses", random.randrange(len(intent["responses"]))
         
-        response = f"{base_response}\n\n💡 **Sugerencia:** {suggestion}"
+        if intent.get("context") == "welcome" and session.turns > 0:
+            return "welcome", random.randrange(len(self.default_responses["welcome"]))
+        
+        choices = range(len(intent["responses"]))
+        repeated = session.recent_tags[:1] == (SessionStore.tag_key(intent["tag"]),)
+        if repeated and session.last_response is not None and len(choices) > 1:
+            choices = [index for index in choices if index != session.last_response]
+        return "responses", random.choice(choices)
+    
+    def _plan_fields(self, plan: ResponsePlan) -> Dict[str, Any]:
+        """Campos de la respuesta que no dependen de la petición (los que se precodifican)"""
+        if plan.status == "success":
+            if plan.source == "welcome":
+                response = self.default_responses["welcome"][plan.index]
+            else:
+                response = plan.intent["responses"][plan.index]
+            
+            # Agregar sugerencias si el contexto lo permite
+            if plan.low_confidence:
+                if plan.suggestions:
+                    response += f"\n\n¿Es esto lo que necesitabas? Si no, quizá buscabas: {self._format_suggestions(plan.suggestions)}"
+                else:
+                    response += "\n\n¿Es esto lo que necesitabas? Si no, por favor reformula tu pregunta."
+            context = plan.intent.get("context", "general")
+            has_suggestions = plan.low_confidence
+        elif plan.source == "busy":
+            response = self.default_responses["busy"][plan.index]
+            context = "general"
+            has_suggestions = False
+        elif plan.suggestions:
+            # "¿Quisiste decir...?" con los intents más cercanos aunque no alcancen el umbral
+            response = f"🤔 No estoy seguro de entender. ¿Quisiste decir: {self._format_suggestions(plan.suggestions)}"
+            context = "general"
+            has_suggestions = True
+        else:
+            base, tip = divmod(plan.index, len(self.default_responses["fallback_suggestions"]))
+            response = (f"{self.default_responses['general'][base]}\n\n"
+                        f"💡 **Sugerencia:** {self.default_responses['fallback_suggestions'][tip]}")
+            context = "general"
+            has_suggestions = True
         
         return {
             "response": response,
-            "tag": "unknown",
-            "confidence": intent_result["confidence"],
-            "status": "unknown",
-            "has_suggestions": True,
-            "context": "general"
+            "tag": plan.tag,
+            "status": plan.status,
+            "has_suggestions": has_suggestions,
+            "suggestions": plan.suggestions,
+            "context": context,
+            "response_length": len(response)
         }
     
+    @staticmethod
+    def _fragment_key(plan: ResponsePlan) -> Optional[Tuple]:
+        """Clave del fragmento de una respuesta; None si lleva sugerencias (dependen de la consulta)"""
+        if plan.suggestions:
+            return None
+        return plan.tag, plan.source, plan.index, plan.low_confidence
+    
+    def _fragment_variants(self, corpus) -> Iterator[Tuple[Tuple, Dict[str, Any]]]:
+        """Todas las respuestas sin sugerencias que puede producir el corpus, con sus campos estáticos"""
+        intents = corpus.intents["intents"]
+        tag_counts = Counter(intent["tag"] for intent in intents)
+        for intent in intents:
+            # Con tags repetidos la clave no identifica al intent: esas respuestas se serializan completas
+            if tag_counts[intent["tag"]] > 1:
+                continue
+            sources = [("responses", len(intent["responses"]))]
+            if intent.get("context") == "welcome":
+                sources.append(("welcome", len(self.default_responses["welcome"])))
+            for source, count in sources:
+                for index in range(count):
+                    for low_confidence in (False, True):
+                        plan = ResponsePlan("success", intent["tag"], intent, source, index, low_confidence, [])
+                        yield self._fragment_key(plan), self._plan_fields(plan)
+        
+        combinations = len(self.default_responses["general"]) * len(self.default_responses["fallback_suggestions"])
+        for index in range(combinations):
+            plan = ResponsePlan("unknown", "unknown", None, "fallback", index, False, [])
+            yield self._fragment_key(plan), self._plan_fields(plan)
+        
+        for index in range(len(self.default_responses["busy"])):
+            plan = ResponsePlan("degraded", "unknown", None, "busy", index, False, [])
+            yield self._fragment_key(plan), self._plan_fields(plan)
+    
+    def _fragments_for(self, corpus) -> ResponseFragments:
+        """Fragmentos de la versión del corpus; se regeneran una vez tras cada recarga"""
+        fragments = self._fragments
+        if fragments is None or fragments.generation != corpus.generation:
+            with self._fragments_lock:
+                fragments = self._fragments
+                if fragments is None or fragments.generation != corpus.generation:
+                    fragments = ResponseFragments(corpus.generation, self._fragment_variants(corpus))
+                    self._fragments = fragments
+        return fragments
+    
+    def get_fragment_statistics(self) -> Optional[Dict[str, Any]]:
+        """Tamaño de los fragmentos precodificados; None si están desactivados"""
+        if not self.prerender:
+            return None
+        return self._fragments_for(self.intents_manager.corpus).get_statistics()
+    
+    def _get_suggestions(self, intent_result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Alternativas del top-k para "¿quisiste decir...?" (incluye el mejor intent si no se reconoció)"""
+        candidates = list(intent_result.get("alternatives", []))
+        if intent_result["status"] != "success" and intent_result.get("best_guess"):
+            candidates.insert(0, intent_result["best_guess"])
+        return [
+            {"tag": candidate["tag"], "text": candidate["matched_pattern"], "confidence": candidate["confidence"]}
+            for candidate in candidates
+            if candidate["confidence"] >= self.intents_manager.suggestion_min_confidence
+        ]
+    
+    @staticmethod
+    def _format_suggestions(suggestions: List[Dict[str, Any]]) -> str:
+        return " o ".join(f"**{suggestion['text']}**" for suggestion in suggestions) + "?"
+    
     def _get_error_response(self) -> Dict[str, Any]:
         """Genera respuesta de error"""
         return {
@@ -0,0 +1,180 @@
+import hashlib
+import mmap
+import multiprocessing
+import struct
+import time
+from typing import Any, Dict, Tuple
+
+# Decisiones de AdmissionController.admit
+ADMIT = "admit"
+DEGRADE = "degrade"
+RATE_LIMITED = "rate_limited"
+OVERLOADED = "overloaded"
+
+
+class AdmissionController:
+    """Control de admisión de las rutas de chat: token bucket por cliente y límite de peticiones en curso.
+
+    Cada cliente tiene un bucket de `burst` tokens que se recarga a `rate` tokens por
+    segundo; sin tokens la petición se rechaza (429) con el tiempo de espera sugerido.
+    Una petición puede costar varios tokens (un lote, uno por mensaje): basta con tener
+    min(costo, burst) disponibles y el resto queda como deuda que la recarga salda.
+    Con `max_concurrent` peticiones en curso las nuevas se rechazan de inmediato en lugar
+    de encolarse; a partir de `degrade_at` se admiten en modo degradado (respuesta desde
+    la caché o de respaldo, sin scoring).
+
+    El estado vive en un mmap anónimo (MAP_SHARED) de tamaño fijo, como SessionStore:
+    los buckets en una tabla asociativa por conjuntos de `max_clients` registros (se
+    desaloja el de recarga más antigua del conjunto) y las peticiones en curso en una
+    fila por worker. Creado antes del fork, todos los workers de serve.py comparten
+    límites y contadores; cada uno declara su fila con use_slot.
+    """
+
+    BUCKET_SLOTS = 8
+    # Encabezado: admitidas, degradadas, limitadas por tasa, rechazadas por sobrecarga,
+    # pico de peticiones en curso y clientes con bucket
+    _HEADER = struct.Struct("=6Q")
+    _COUNTERS = ("admitted", "degraded", "rate_limited", "overloaded")
+    _FIELDS = _COUNTERS + ("peak_in_flight", "tracked_clients")
+    _IN_FLIGHT = struct.Struct("=q")
+    # Registro de bucket: hash del cliente (0 = libre), tokens disponibles, última recarga
+    _BUCKET = struct.Struct("=Qdd")
+    _SET = struct.Struct("=" + "Qdd" * BUCKET_SLOTS)
+
+    def __init__(self, rate: float = 2.0, burst: int = 10, max_clients: int = 10000,
+                 max_concurrent: int = 32, degrade_at: int = 24, workers: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_concurrent = max_concurrent
+        self.degrade_at = degrade_at
+        self.workers = max(1, int(workers))
+        self.buckets = max(1, -(-int(max_clients) // self.BUCKET_SLOTS))
+        self.max_clients = self.buckets * self.BUCKET_SLOTS
+        # Fila de peticiones en curso de este proceso
+        self.slot = 0
+        self._buckets_offset = self._HEADER.size + self._IN_FLIGHT.size * self.workers
+        self._mmap = mmap.mmap(-1, self._buckets_offset + self._BUCKET.size * self.max_clients)
+        self._lock = multiprocessing.Lock()
+
+    def use_slot(self, slot: int):
+        """Fila de peticiones en curso de este proceso (un worker de serve.py por fila)"""
+        if not 0 <= slot < self.workers:
+            raise IndexError(f"Fila fuera de rango: {slot}")
+        self.slot = slot
+
+    @staticmethod
+    def client_key(client_id: str) -> int:
+        key = int.from_bytes(hashlib.blake2b(client_id.encode("utf-8"), digest_size=8).digest(), "little")
+        return key or 1
+
+    def _bucket_offset(self, record: int) -> int:
+        return self._buckets_offset + record * self._BUCKET.size
+
+    def _find_bucket(self, key: int) -> Tuple[int, bool]:
+        """Registro del cliente en su conjunto: (registro, existe); si no existe, el libre o el más antiguo"""
+        first = (key % self.buckets) * self.BUCKET_SLOTS
+        # El conjunto completo se lee de una vez: claves, tokens y recargas intercalados
+        values = self._SET.unpack_from(self._mmap, self._bucket_offset(first))
+        keys = values[0::3]
+        if key in keys:
+            return first + keys.index(key), True
+        if 0 in keys:
+            return first + keys.index(0), False
+        refills = values[2::3]
+        return first + refills.index(min(refills)), False
+
+    def _count(self, field: str, delta: int = 1):
+        values = list(self._HEADER.unpack_from(self._mmap, 0))
+        values[self._FIELDS.index(field)] += delta
+        self._HEADER.pack_into(self._mmap, 0, *values)
+
+    def _raise_peak(self, in_flight: int):
+        values = list(self._HEADER.unpack_from(self._mmap, 0))
+        position = self._FIELDS.index("peak_in_flight")
+        if in_flight > values[position]:
+            values[position] = in_flight
+            self._HEADER.pack_into(self._mmap, 0, *values)
+
+    def _take_tokens(self, client_id: str, now: float, cost: int) -> float:
+        """Consume `cost` tokens del cliente; retorna 0 si los había o los segundos hasta tenerlos"""
+        key = self.client_key(client_id)
+        record, exists = self._find_bucket(key)
+        offset = self._bucket_offset(record)
+        if exists:
+            _, tokens, refilled = self._BUCKET.unpack_from(self._mmap, offset)
+            tokens = min(float(self.burst), tokens + (now - refilled) * self.rate)
+        else:
+            if not self._BUCKET.unpack_from(self._mmap, offset)[0]:
+                self._count("tracked_clients")
+            tokens = float(self.burst)
+
+        required = float(min(cost, self.burst))
+        if tokens < required:
+            self._BUCKET.pack_into(self._mmap, offset, key, tokens, now)
+            return (required - tokens) / self.rate
+        # Un costo mayor que burst deja el bucket en negativo
+        self._BUCKET.pack_into(self._mmap, offset, key, tokens - cost, now)
+        return 0.0
+
+    def _in_flight_offset(self, slot: int) -> int:
+        return self._HEADER.size + slot * self._IN_FLIGHT.size
+
+    def _total_in_flight(self) -> int:
+        return sum(self._IN_FLIGHT.unpack_from(self._mmap, self._in_flight_offset(slot))[0]
+                   for slot in range(self.workers))
+
+    def _add_in_flight(self, delta: int):
+        offset = self._in_flight_offset(self.slot)
+        self._IN_FLIGHT.pack_into(self._mmap, offset, self._IN_FLIGHT.unpack_from(self._mmap, offset)[0] + delta)
+
+    def admit(self, client_id: str, cost: int = 1) -> Tuple[str, float]:
+        """Decide si se atiende la petición; retorna (decisión, segundos sugeridos para reintentar).
+
+        Con ADMIT o DEGRADE la petición queda en curso y se debe llamar a release al terminar.
+        """
+        now = time.monotonic()
+        with self._lock:
+            in_flight = self._total_in_flight()
+            if self.max_concurrent and in_flight >= self.max_concurrent:
+                self._count("overloaded")
+                return OVERLOADED, 1.0
+            if self.rate > 0:
+                retry_after = self._take_tokens(client_id, now, max(1, cost))
+                if retry_after:
+                    self._count("rate_limited")
+                    return RATE_LIMITED, retry_after
+
+            decision = DEGRADE if self.degrade_at and in_flight >= self.degrade_at else ADMIT
+            self._count("degraded" if decision == DEGRADE else "admitted")
+            self._add_in_flight(1)
+            self._raise_peak(in_flight + 1)
+        return decision, 0.0
+
+    def release(self):
+        with self._lock:
+            self._add_in_flight(-1)
+
+    def retire(self, slot: int):
+        """Descarta las peticiones en curso de un worker terminado (solo el maestro)"""
+        with self._lock:
+            self._IN_FLIGHT.pack_into(self._mmap, self._in_flight_offset(slot), 0)
+
+    @property
+    def in_flight(self) -> int:
+        """Peticiones en curso en todos los workers"""
+        with self._lock:
+            return self._total_in_flight()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            values = dict(zip(self._FIELDS, self._HEADER.unpack_from(self._mmap, 0)))
+            in_flight = self._total_in_flight()
+        return {
+            **values,
+            "in_flight": in_flight,
+            "rate": self.rate,
+            "burst": self.burst,
+            "max_concurrent": self.max_concurrent,
+            "degrade_at": self.degrade_at,
+            "workers": self.workers
+        }
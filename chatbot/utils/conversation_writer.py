@@ -0,0 +1,194 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+from .metrics import ShardedCounters
+
+class ConversationWriter:
+    """Persistencia asíncrona de conversaciones en archivos JSON Lines (append-only).
+
+    Las peticiones solo encolan la entrada (put_nowait); un hilo en segundo plano agrupa
+    las entradas pendientes y las escribe en bloque (group commit) cada `flush_interval`
+    segundos o al acumular `batch_size`. Los archivos rotan por tiempo y por tamaño.
+    Si la cola está llena la entrada se descarta y se contabiliza, nunca se bloquea /chat.
+    """
+
+    _SHUTDOWN = object()
+
+    def __init__(self, directory: str, max_queue_size: int = 10000, flush_interval: float = 1.0,
+                 batch_size: int = 500, max_file_bytes: int = 10 * 1024 * 1024,
+                 rotate_interval: float = 3600, file_prefix: str = "conversations"):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_file_bytes = max_file_bytes
+        self.rotate_interval = rotate_interval
+        self.file_prefix = file_prefix
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self._closed = False
+
+        # Estado del archivo actual (solo lo usa el hilo escritor)
+        self._file = None
+        self._file_opened_at = 0.0
+        self.current_file: Optional[str] = None
+
+        self.counters = ShardedCounters(("submitted", "dropped", "written", "flushes", "rotations", "write_errors"))
+
+        # Apagado limpio: vaciar la cola al terminar el proceso
+        atexit.register(self.close)
+
+    def _ensure_started(self):
+        """Arranca el hilo escritor de forma perezosa (también tras un fork)"""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # Proceso hijo: la cola y el archivo heredados pertenecen al padre
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._file = None
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="ConversationWriter", daemon=True)
+            self._thread.start()
+
+    def submit(self, entry: Dict[str, Any]) -> bool:
+        """Encola una entrada sin bloquear; retorna False si se descartó"""
+        return self.submit_many([entry]) == 1
+
+    def submit_many(self, entries: Iterable[Dict[str, Any]]) -> int:
+        """Encola varias entradas sin bloquear; retorna cuántas se aceptaron"""
+        if self._closed:
+            return 0
+        self._ensure_started()
+
+        accepted = dropped = 0
+        for entry in entries:
+            try:
+                self._queue.put_nowait(entry)
+                accepted += 1
+            except queue.Full:
+                dropped += 1
+        self.counters.add_many({"submitted": accepted, "dropped": dropped})
+        return accepted
+
+    def close(self, timeout: float = 10.0):
+        """Detiene el escritor después de vaciar la cola y escribir lo pendiente"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is None or self._pid != os.getpid():
+            return
+        try:
+            self._queue.put(self._SHUTDOWN, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def _run(self):
+        pending: List[str] = []
+        last_flush = time.monotonic()
+        try:
+            while True:
+                wait = max(0.0, self.flush_interval - (time.monotonic() - last_flush))
+                try:
+                    entry = self._queue.get(timeout=wait)
+                except queue.Empty:
+                    entry = None
+
+                if entry is self._SHUTDOWN:
+                    break
+
+                if entry is not None:
+                    pending.append(self._encode(entry))
+                    # Vaciar lo que ya esté en cola sin bloquear, hasta batch_size
+                    while len(pending) < self.batch_size:
+                        try:
+                            entry = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if entry is self._SHUTDOWN:
+                            self._drain_into(pending)
+                            return
+                        pending.append(self._encode(entry))
+
+                if len(pending) >= self.batch_size or time.monotonic() - last_flush >= self.flush_interval:
+                    self._write(pending)
+                    pending = []
+                    last_flush = time.monotonic()
+
+            self._drain_into(pending)
+        finally:
+            self._close_file()
+
+    def _drain_into(self, pending: List[str]):
+        """Escribe lo pendiente y todo lo que quede en la cola (apagado limpio)"""
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not self._SHUTDOWN:
+                pending.append(self._encode(entry))
+        self._write(pending)
+        pending.clear()
+
+    @staticmethod
+    def _encode(entry: Dict[str, Any]) -> str:
+        return json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+
+    def _write(self, lines: List[str]):
+        """Escribe un bloque de líneas con una sola llamada y hace flush"""
+        if not lines:
+            return
+        try:
+            self._rotate_if_needed()
+            self._file.write("".join(lines))
+            self._file.flush()
+            self.counters.add_many({"written": len(lines), "flushes": 1})
+        except Exception as e:
+            self.counters.add("write_errors", len(lines))
+            print(f"❌ Error escribiendo log de conversaciones: {e}")
+            self._close_file()
+
+    def _rotate_if_needed(self):
+        """Abre un archivo nuevo si no hay uno abierto o si se excede tiempo o tamaño"""
+        if self._file is not None:
+            too_old = time.monotonic() - self._file_opened_at >= self.rotate_interval
+            too_big = self._file.tell() >= self.max_file_bytes
+            if not (too_old or too_big):
+                return
+            self._close_file()
+            self.counters.add("rotations")
+
+        os.makedirs(self.directory, exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        self.current_file = os.path.join(self.directory, f"{self.file_prefix}_{timestamp}_{os.getpid()}.jsonl")
+        self._file = open(self.current_file, 'a', encoding='utf-8')
+        self._file_opened_at = time.monotonic()
+
+    def _close_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+            self._file = None
+
+    def get_statistics(self, counters: Dict[str, float] = None) -> Dict[str, Any]:
+        """Retorna contadores del escritor (o los agregados que se indiquen) y ocupación de la cola"""
+        stats = dict(counters or self.counters.snapshot())
+        stats.update({
+            "queue_size": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "current_file": os.path.basename(self.current_file) if self.current_file else None
+        })
+        return stats
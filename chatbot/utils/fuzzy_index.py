@@ -0,0 +1,97 @@
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+class TrigramIndex:
+    """Índice de trigramas de caracteres sobre el vocabulario del corpus.
+
+    Para un token desconocido solo se visitan las palabras que comparten al menos un
+    trigrama (listas invertidas), en lugar de calcular distancia de edición contra todo
+    el vocabulario. La similitud es el coeficiente de Dice entre conjuntos de trigramas.
+    """
+
+    def __init__(self, vocabulary: Iterable[str], min_token_length: int = 4):
+        self.min_token_length = min_token_length
+        self.words: List[str] = []
+        self.word_trigram_counts: Sequence[int] = []
+        self.postings: Dict[str, Sequence[int]] = {}
+
+        for word in sorted(set(vocabulary)):
+            if len(word) < min_token_length:
+                continue
+            word_id = len(self.words)
+            trigrams = self.trigrams(word)
+            self.words.append(word)
+            self.word_trigram_counts.append(len(trigrams))
+            for trigram in trigrams:
+                self.postings.setdefault(trigram, []).append(word_id)
+
+    @classmethod
+    def from_tables(cls, words: List[str], word_trigram_counts: Sequence[int],
+                    postings: Dict[str, Sequence[int]], min_token_length: int = 4) -> "TrigramIndex":
+        """Construye el índice a partir de tablas ya compiladas (artefacto en disco)"""
+        index = cls.__new__(cls)
+        index.min_token_length = min_token_length
+        index.words = words
+        index.word_trigram_counts = word_trigram_counts
+        index.postings = postings
+        return index
+
+    @staticmethod
+    def trigrams(word: str) -> set:
+        """Trigramas con delimitadores de inicio y fin ('$pal', ...)"""
+        padded = f"${word}$"
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def lookup(self, token: str, min_similarity: float) -> Optional[Tuple[str, float]]:
+        """Retorna la palabra del vocabulario más parecida (palabra, similitud) o None"""
+        if len(token) < self.min_token_length:
+            return None
+
+        trigrams = self.trigrams(token)
+        shared: Dict[int, int] = {}
+        for trigram in trigrams:
+            for word_id in self.postings.get(trigram, ()):
+                shared[word_id] = shared.get(word_id, 0) + 1
+
+        best = None
+        best_similarity = min_similarity
+        token_count = len(trigrams)
+        for word_id, count in shared.items():
+            similarity = 2 * count / (token_count + self.word_trigram_counts[word_id])
+            if similarity > best_similarity or (similarity == best_similarity and (best is None or word_id < best)):
+                best = word_id
+                best_similarity = similarity
+
+        if best is None:
+            return None
+        return self.words[best], best_similarity
+
+    def expand(self, tokens: Iterable[str], known: Dict[str, object], min_similarity: float,
+               weight: float, time_budget: float) -> Tuple[Dict[str, float], bool]:
+        """Busca coincidencias parciales para los tokens fuera del vocabulario.
+
+        Retorna ({palabra del vocabulario: peso}, presupuesto_agotado). El peso es
+        similitud × weight; palabras ya presentes en la consulta no se duplican.
+        """
+        query_tokens = set(tokens)
+        fuzzy_matches: Dict[str, float] = {}
+        deadline = time.perf_counter() + time_budget
+
+        for token in query_tokens:
+            if token in known:
+                continue
+            if time.perf_counter() > deadline:
+                return fuzzy_matches, True
+
+            match = self.lookup(token, min_similarity)
+            if match is None:
+                continue
+            word, similarity = match
+            if word in query_tokens:
+                continue
+            fuzzy_matches[word] = max(fuzzy_matches.get(word, 0.0), similarity * weight)
+
+        return fuzzy_matches, False
+
+    def __len__(self) -> int:
+        return len(self.words)
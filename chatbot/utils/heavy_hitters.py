@@ -0,0 +1,73 @@
+import heapq
+from typing import Any, Dict, List, Tuple
+
+class SpaceSaving:
+    """Elementos más frecuentes de un flujo con memoria acotada (algoritmo Space-Saving).
+
+    Se vigilan a lo sumo `capacity` claves. Cuando llega una clave nueva y el resumen está
+    lleno, reemplaza a la de menor conteo y hereda ese conteo como error máximo: el conteo
+    reportado nunca subestima y sobreestima a lo sumo en `error`. Toda clave con frecuencia
+    real mayor que total / capacity está garantizada en el resumen. El mínimo se localiza
+    con un heap perezoso (las entradas obsoletas se descartan al extraerlas).
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = max(1, int(capacity))
+        self.total = 0
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        self._heap: List[Tuple[int, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def add(self, key: str, count: int = 1):
+        self.total += count
+        if key in self._counts:
+            self._counts[key] += count
+        elif len(self._counts) < self.capacity:
+            self._counts[key] = count
+            self._errors[key] = 0
+        else:
+            floor, victim = self._pop_min()
+            del self._counts[victim]
+            del self._errors[victim]
+            self._counts[key] = floor + count
+            self._errors[key] = floor
+        heapq.heappush(self._heap, (self._counts[key], key))
+        # Las entradas obsoletas se acumulan con cada incremento: compactar de vez en cuando
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, key) for key, count in self._counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self) -> Tuple[int, str]:
+        """Clave vigente con menor conteo (la retira del heap)"""
+        while True:
+            count, key = heapq.heappop(self._heap)
+            if self._counts.get(key) == count:
+                return count, key
+
+    def top(self, n: int) -> List[Dict[str, Any]]:
+        """Las n claves con mayor conteo estimado, con su error máximo"""
+        ranked = heapq.nsmallest(n, self._counts.items(), key=lambda item: (-item[1], item[0]))
+        return [{"key": key, "count": count, "error": self._errors[key]} for key, count in ranked]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "total": self.total,
+            "entries": [[key, count, self._errors[key]] for key, count in self._counts.items()]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], capacity: int = None) -> "SpaceSaving":
+        """Restaura un resumen guardado; con una capacidad menor se conservan las claves más frecuentes"""
+        sketch = cls(capacity or data["capacity"])
+        entries = sorted(data["entries"], key=lambda entry: -entry[1])[:sketch.capacity]
+        for key, count, error in entries:
+            sketch._counts[key] = count
+            sketch._errors[key] = error
+        sketch._heap = [(count, key) for key, count in sketch._counts.items()]
+        heapq.heapify(sketch._heap)
+        sketch.total = data["total"]
+        return sketch
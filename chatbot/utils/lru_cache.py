@@ -0,0 +1,71 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+from .metrics import ShardedCounters
+
+class LRUCache:
+    """Caché LRU acotada con contadores de aciertos, fallos y desalojos.
+
+    Cada operación de OrderedDict es atómica bajo el GIL, así que la caché no usa
+    locks: en el peor caso una carrera produce un desalojo de más, nunca un estado
+    inconsistente. Los contadores son por hilo (ShardedCounters).
+    """
+
+    _MISSING = object()
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max(0, int(max_size))
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.counters = ShardedCounters(("hits", "misses", "evictions", "invalidations"))
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Retorna el valor asociado a la clave y lo marca como usado recientemente"""
+        value = self._data.get(key, self._MISSING)
+        if value is self._MISSING:
+            self.counters.add("misses")
+            return default
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            pass  # desalojada por otro hilo entre get y move_to_end
+        self.counters.add("hits")
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        """Inserta un valor, desalojando el menos usado si se excede el tamaño máximo"""
+        if not self.max_size:
+            return
+        self._data[key] = value
+        # Sobrescribir una clave existente no cambia su posición: hay que marcarla como reciente
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            pass  # desalojada por otro hilo entre la asignación y move_to_end
+        while len(self._data) > self.max_size:
+            try:
+                self._data.popitem(last=False)
+            except KeyError:
+                break
+            self.counters.add("evictions")
+
+    def clear(self):
+        """Invalida todo el contenido de la caché (los contadores se conservan)"""
+        if self._data:
+            self.counters.add("invalidations")
+        self._data.clear()
+
+    def get_statistics(self, counters: Dict[str, float] = None) -> Dict[str, Any]:
+        """Retorna tamaño y contadores de la caché (o los contadores agregados que se indiquen)"""
+        counters = counters or self.counters.snapshot()
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": counters["hits"],
+            "misses": counters["misses"],
+            "evictions": counters["evictions"],
+            "invalidations": counters["invalidations"],
+            "hit_rate": round(counters["hits"] / lookups * 100, 2) if lookups else 0
+        }
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,269 @@
+import random
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+class ShardedCounters:
+    """Contadores con un shard por hilo: escritura sin locks, combinación al leer.
+
+    Cada hilo solo modifica su propio shard, así que el camino de las peticiones no
+    comparte estado mutable. Los lectores suman todos los shards y pliegan los de
+    hilos terminados en un acumulado, de modo que la lista de shards no crece sin
+    límite con servidores que crean un hilo por petición.
+    """
+
+    # A partir de este número de shards se intenta compactar al registrar uno nuevo
+    COMPACT_THRESHOLD = 64
+
+    def __init__(self, fields: Sequence[str]):
+        self.fields = tuple(fields)
+        self._positions = {field: position for position, field in enumerate(self.fields)}
+        self._local = threading.local()
+        self._shards: List[Tuple[threading.Thread, List[float]]] = []
+        self._retired = [0] * len(self.fields)
+        self._merge_lock = threading.Lock()
+
+    def _shard(self) -> List[float]:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = [0] * len(self.fields)
+            self._local.shard = shard
+            # list.append es atómico; no hace falta lock para registrar el shard
+            self._shards.append((threading.current_thread(), shard))
+            if len(self._shards) > self.COMPACT_THRESHOLD:
+                self._compact(blocking=False)
+        return shard
+
+    def add(self, field: str, value: float = 1):
+        """Incrementa un contador en el shard del hilo actual"""
+        self._shard()[self._positions[field]] += value
+
+    def add_many(self, values: Dict[str, float]):
+        """Incrementa varios contadores en el shard del hilo actual"""
+        shard = self._shard()
+        for field, value in values.items():
+            shard[self._positions[field]] += value
+
+    def _compact(self, blocking: bool = True) -> List[float]:
+        """Pliega los shards de hilos terminados y retorna los totales actuales"""
+        if not self._merge_lock.acquire(blocking):
+            return []
+        try:
+            totals = list(self._retired)
+            for entry in list(self._shards):
+                thread, shard = entry
+                # is_alive antes de copiar: un hilo terminado ya no escribe, así que su shard
+                # leído después es definitivo (copiar primero perdería un incremento tardío)
+                alive = thread.is_alive()
+                values = list(shard)
+                if not alive:
+                    # El hilo ya no escribe: su shard pasa al acumulado
+                    self._retired = [r + v for r, v in zip(self._retired, values)]
+                    self._shards.remove(entry)
+                totals = [t + v for t, v in zip(totals, values)]
+            return totals
+        finally:
+            self._merge_lock.release()
+
+    def snapshot(self) -> Dict[str, float]:
+        """Retorna la suma de todos los shards"""
+        return dict(zip(self.fields, self._compact()))
+
+    def __getitem__(self, field: str) -> float:
+        return self.snapshot()[field]
+
+
+# Límites de los buckets en segundos (estilo Prometheus), de 10µs a 1s
+DEFAULT_LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0
+)
+
+class LatencyHistogram:
+    """Histograma de latencias con buckets fijos sobre contadores por hilo"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # Un campo por bucket, más el bucket +Inf, la suma y el conteo
+        fields = [f"le_{bound}" for bound in self.buckets] + ["le_inf", "sum", "count"]
+        self.counters = ShardedCounters(fields)
+        self._sum_position = len(self.buckets) + 1
+        self._count_position = len(self.buckets) + 2
+
+    def observe(self, seconds: float, weight: float = 1):
+        """Registra una observación; weight > 1 compensa el muestreo"""
+        shard = self.counters._shard()
+        shard[bisect_left(self.buckets, seconds)] += weight
+        shard[self._sum_position] += seconds * weight
+        shard[self._count_position] += weight
+
+    def values(self) -> Dict[str, float]:
+        """Contadores sin acumular por campo (le_*, sum, count), para agregar entre procesos"""
+        return self.counters.snapshot()
+
+    def snapshot(self, values: Dict[str, float] = None) -> Dict[str, object]:
+        """Retorna buckets acumulados (como Prometheus), suma y conteo (de `values` si se indican)"""
+        values = self.counters._compact() if values is None else [values[field] for field in self.counters.fields]
+        cumulative = []
+        running = 0
+        for bound, value in zip(self.buckets + (float('inf'),), values):
+            running += value
+            cumulative.append((bound, running))
+        return {
+            "buckets": cumulative,
+            "sum": values[self._sum_position],
+            "count": values[self._count_position]
+        }
+
+    def quantile(self, fraction: float, snapshot: Dict[str, object] = None) -> float:
+        """Estimación del cuantil como límite superior del bucket que lo contiene"""
+        snapshot = snapshot or self.snapshot()
+        if not snapshot["count"]:
+            return 0.0
+        target = snapshot["count"] * fraction
+        for bound, cumulative in snapshot["buckets"]:
+            if cumulative >= target:
+                return bound
+        return float('inf')
+
+
+class _StageTimer:
+    __slots__ = ("started", "last", "weight")
+
+    def __init__(self, weight: float):
+        self.started = self.last = time.perf_counter()
+        self.weight = weight
+
+
+class StageMetrics:
+    """Instrumentación por etapa del camino de /chat con muestreo opcional.
+
+    begin() activa un cronómetro en el hilo actual (solo para la fracción sample_rate
+    de las peticiones); cada mark(etapa) registra el tiempo transcurrido desde la marca
+    anterior. Sin cronómetro activo, mark() se reduce a una lectura de threading.local.
+    Las etapas de STAGES se pueden agregar entre procesos (shared_fields / values).
+    """
+
+    # Etapas del pipeline de /chat; "total" es la petición completa (end)
+    STAGES = ("preprocess", "cache", "fuzzy", "retrieval", "scoring", "session",
+              "logging", "response", "serialization", "total")
+
+    def __init__(self, sample_rate: float = 1.0, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self.buckets = tuple(buckets)
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        # Sin observaciones: da los nombres de campo y reconstruye snapshots de contadores agregados
+        self._template = LatencyHistogram(self.buckets)
+        self._histograms_lock = threading.Lock()
+        self._local = threading.local()
+
+    def histogram(self, stage: str) -> LatencyHistogram:
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self._histograms_lock:
+                histogram = self.histograms.setdefault(stage, LatencyHistogram(self.buckets))
+        return histogram
+
+    def begin(self) -> bool:
+        """Inicia la medición de una petición; retorna False si no fue muestreada"""
+        if self.sample_rate <= 0.0 or (self.sample_rate < 1.0 and random.random() >= self.sample_rate):
+            self._local.timer = None
+            return False
+        # Cada petición muestreada representa 1/sample_rate peticiones
+        self._local.timer = _StageTimer(1.0 / self.sample_rate)
+        return True
+
+    def mark(self, stage: str):
+        """Registra la duración de la etapa que acaba de terminar"""
+        timer = getattr(self._local, 'timer', None)
+        if timer is None:
+            return
+        now = time.perf_counter()
+        self.histogram(stage).observe(now - timer.last, timer.weight)
+        timer.last = now
+
+    def end(self, stage: str = "total"):
+        """Cierra la medición registrando la duración total de la petición"""
+        timer = getattr(self._local, 'timer', None)
+        if timer is None:
+            return
+        self.histogram(stage).observe(time.perf_counter() - timer.started, timer.weight)
+        self._local.timer = None
+
+    def shared_fields(self) -> List[str]:
+        """Nombres planos ('stage_<etapa>_<campo>') de los histogramas de STAGES"""
+        return [f"stage_{stage}_{field}" for stage in self.STAGES for field in self._template.counters.fields]
+
+    def values(self) -> Dict[str, float]:
+        """Contadores de este proceso con los nombres de shared_fields"""
+        values = {}
+        for stage in self.STAGES:
+            histogram = self.histograms.get(stage)
+            if histogram is not None:
+                values.update({f"stage_{stage}_{field}": value for field, value in histogram.values().items()})
+        return values
+
+    def snapshots(self, values: Dict[str, float] = None) -> Dict[str, Dict[str, object]]:
+        """Snapshot por etapa: de este proceso o, con `values` (p. ej. sumados entre workers), de esos contadores"""
+        if values is None:
+            return {stage: histogram.snapshot() for stage, histogram in sorted(self.histograms.items())}
+        snapshots = {}
+        for stage in sorted(self.STAGES):
+            stage_values = {field: values.get(f"stage_{stage}_{field}", 0) for field in self._template.counters.fields}
+            if stage_values["count"]:
+                snapshots[stage] = self._template.snapshot(stage_values)
+        return snapshots
+
+    def get_statistics(self, values: Dict[str, float] = None) -> Dict[str, Dict[str, float]]:
+        """Resumen por etapa: conteo, media y cuantiles aproximados en milisegundos"""
+        summary = {}
+        for stage, snapshot in self.snapshots(values).items():
+            count = snapshot["count"]
+            summary[stage] = {
+                "count": round(count),
+                "mean_ms": round(snapshot["sum"] / count * 1000, 4) if count else 0.0,
+                "p50_ms": self._template.quantile(0.50, snapshot) * 1000,
+                "p99_ms": self._template.quantile(0.99, snapshot) * 1000
+            }
+        return summary
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render_prometheus(stage_metrics: StageMetrics, counters: Dict[str, float], gauges: Dict[str, float] = None,
+                      prefix: str = "chatbot", stage_values: Dict[str, float] = None) -> str:
+    """Formato de texto de Prometheus (0.0.4): histogramas por etapa, contadores y gauges.
+
+    stage_values: contadores de histogramas agregados entre workers (StageMetrics.values sumados).
+    """
+    lines = [
+        f"# HELP {prefix}_stage_latency_seconds Latencia por etapa del pipeline de /chat",
+        f"# TYPE {prefix}_stage_latency_seconds histogram"
+    ]
+    for stage, snapshot in stage_metrics.snapshots(stage_values).items():
+        for bound, cumulative in snapshot["buckets"]:
+            lines.append(
+                f'{prefix}_stage_latency_seconds_bucket{{stage="{stage}",le="{_format_value(bound)}"}} '
+                f'{_format_value(cumulative)}'
+            )
+        lines.append(f'{prefix}_stage_latency_seconds_sum{{stage="{stage}"}} {_format_value(snapshot["sum"])}')
+        lines.append(f'{prefix}_stage_latency_seconds_count{{stage="{stage}"}} {_format_value(snapshot["count"])}')
+
+    lines.append(f"# HELP {prefix}_metrics_sample_rate Fracción de peticiones instrumentadas")
+    lines.append(f"# TYPE {prefix}_metrics_sample_rate gauge")
+    lines.append(f"{prefix}_metrics_sample_rate {_format_value(stage_metrics.sample_rate)}")
+
+    for metric_type, values in (("counter", counters), ("gauge", gauges or {})):
+        for name, value in sorted(values.items()):
+            metric = f"{prefix}_{name}"
+            lines.append(f"# TYPE {metric} {metric_type}")
+            lines.append(f"{metric} {_format_value(value)}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,35 @@
+import threading
+from typing import Callable
+
+class PeriodicTask:
+    """Ejecuta una función cada `interval` segundos en un hilo daemon"""
+
+    def __init__(self, function: Callable[[], object], interval: float, name: str = "PeriodicTask"):
+        self.function = function
+        self.interval = interval
+        self.name = name
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Inicia el hilo si no está en ejecución"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        """Solicita la detención y espera a que el hilo termine"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.function()
+            except Exception as e:
+                # Un fallo puntual no debe detener la tarea
+                print(f"❌ Error en tarea periódica {self.name}: {e}")
@@ -0,0 +1,179 @@
+import hashlib
+import mmap
+import multiprocessing
+import struct
+import time
+import zlib
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+class SessionState(NamedTuple):
+    """Contexto de una conversación: turnos, tags recientes (el más reciente primero) y última respuesta"""
+    turns: int
+    recent_tags: Tuple[int, ...]
+    last_response: Optional[int]
+    last_seen: float
+
+
+class SessionStore:
+    """Contexto por sesión en una tabla de registros de tamaño fijo (mmap anónimo, MAP_SHARED).
+
+    La tabla se reserva completa al crearse: max_sessions registros de pocas decenas de
+    bytes, así que la memoria no crece con el número de sesiones. Es asociativa por
+    conjuntos: el hash del session_id elige un bucket de BUCKET_SLOTS registros; una
+    sesión nueva ocupa un registro vacío o expirado (TTL) y, si no hay, desaloja el menos
+    reciente del bucket. Los tags se guardan como crc32, válidos entre recargas y procesos.
+    Creada antes del fork, todos los workers comparten la misma tabla (lock entre procesos).
+    """
+
+    BUCKET_SLOTS = 8
+    MAX_SESSION_ID_LENGTH = 128
+    # Sin respuesta previa registrada
+    _NO_RESPONSE = 0xFFFF
+    # Encabezado: lecturas con contexto, sin contexto, sesiones nuevas, desalojos, expiraciones
+    # y registros ocupados (se mantiene al ocupar y liberar registros: /stats no recorre la tabla)
+    _HEADER = struct.Struct("=6Q")
+    _COUNTERS = ("hits", "misses", "created", "evictions", "expirations")
+    _FIELDS = _COUNTERS + ("occupied",)
+
+    def __init__(self, max_sessions: int = 50000, ttl: float = 1800.0, history: int = 4):
+        self.ttl = ttl
+        self.history = max(1, int(history))
+        self.buckets = max(1, -(-int(max_sessions) // self.BUCKET_SLOTS))
+        self.capacity = self.buckets * self.BUCKET_SLOTS
+        # Registro: hash del session_id (0 = libre), último acceso, turnos, última respuesta, tags
+        self._record = struct.Struct(f"=QdIH2x{self.history}I")
+        self._prefix = struct.Struct("=Qd")
+        self._mmap = mmap.mmap(-1, self._HEADER.size + self._record.size * self.capacity)
+        self._lock = multiprocessing.Lock()
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._mmap)
+
+    @staticmethod
+    def tag_key(tag: str) -> int:
+        """Representación compacta de un tag (crc32; 0 queda reservado para 'vacío')"""
+        return zlib.crc32(tag.encode("utf-8")) or 1
+
+    @classmethod
+    def session_key(cls, session_id: Any) -> Optional[int]:
+        """Hash de 64 bits del session_id; None si no es un identificador válido"""
+        if not isinstance(session_id, str) or not session_id or len(session_id) > cls.MAX_SESSION_ID_LENGTH:
+            return None
+        key = int.from_bytes(hashlib.blake2b(session_id.encode("utf-8"), digest_size=8).digest(), "little")
+        return key or 1
+
+    def _offset(self, slot: int) -> int:
+        return self._HEADER.size + slot * self._record.size
+
+    def _find(self, key: int) -> Tuple[Optional[int], int]:
+        """Busca la sesión en su bucket; retorna (registro encontrado, registro a usar si no está)"""
+        first = (key % self.buckets) * self.BUCKET_SLOTS
+        victim, victim_seen = first, None
+        for slot in range(first, first + self.BUCKET_SLOTS):
+            slot_key, last_seen = self._prefix.unpack_from(self._mmap, self._offset(slot))
+            if slot_key == key:
+                return slot, slot
+            if not slot_key:
+                # Registro libre: mejor candidato posible
+                victim_seen = -1.0
+                victim = slot
+            elif victim_seen is None or last_seen < victim_seen:
+                victim, victim_seen = slot, last_seen
+        return None, victim
+
+    def _count(self, counter: str, delta: int = 1):
+        values = list(self._HEADER.unpack_from(self._mmap, 0))
+        values[self._FIELDS.index(counter)] += delta
+        self._HEADER.pack_into(self._mmap, 0, *values)
+
+    def _expired(self, last_seen: float, now: float) -> bool:
+        return self.ttl > 0 and now - last_seen > self.ttl
+
+    def get(self, session_id: Any) -> Optional[SessionState]:
+        """Contexto vigente de la sesión; None si no existe, expiró o el id no es válido"""
+        key = self.session_key(session_id)
+        if key is None:
+            return None
+        now = time.time()
+        with self._lock:
+            slot, _ = self._find(key)
+            if slot is None:
+                self._count("misses")
+                return None
+            _, last_seen, turns, last_response, *tags = self._record.unpack_from(self._mmap, self._offset(slot))
+            if self._expired(last_seen, now):
+                self._clear(slot)
+                self._count("expirations")
+                self._count("misses")
+                return None
+            self._count("hits")
+        return SessionState(
+            turns=turns,
+            recent_tags=tuple(tag for tag in tags if tag),
+            last_response=None if last_response == self._NO_RESPONSE else last_response,
+            last_seen=last_seen
+        )
+
+    def record(self, session_id: Any, tag: Optional[str] = None, response_index: Optional[int] = None):
+        """Registra un turno de la sesión: el tag reconocido (si hay) pasa al frente del historial"""
+        key = self.session_key(session_id)
+        if key is None:
+            return
+        now = time.time()
+        with self._lock:
+            slot, free = self._find(key)
+            turns, tags = 0, (0,) * self.history
+            if slot is not None:
+                _, last_seen, turns, _, *tags = self._record.unpack_from(self._mmap, self._offset(slot))
+                if self._expired(last_seen, now):
+                    self._count("expirations")
+                    turns, tags = 0, (0,) * self.history
+            else:
+                slot = free
+                victim_key, victim_seen = self._prefix.unpack_from(self._mmap, self._offset(slot))
+                if victim_key:
+                    self._count("expirations" if self._expired(victim_seen, now) else "evictions")
+                else:
+                    self._count("occupied")
+                self._count("created")
+            if tag is not None:
+                tag_key = self.tag_key(tag)
+                tags = (tag_key,) + tuple(t for t in tags if t != tag_key)[:self.history - 1]
+                tags += (0,) * (self.history - len(tags))
+            last_response = self._NO_RESPONSE if response_index is None else min(response_index, self._NO_RESPONSE - 1)
+            self._record.pack_into(self._mmap, self._offset(slot), key, now, turns + 1, last_response, *tags)
+
+    def _clear(self, slot: int):
+        if self._prefix.unpack_from(self._mmap, self._offset(slot))[0]:
+            self._count("occupied", -1)
+        self._record.pack_into(self._mmap, self._offset(slot), 0, 0.0, 0, self._NO_RESPONSE,
+                               *((0,) * self.history))
+
+    def clear(self):
+        """Elimina todas las sesiones (los contadores se conservan)"""
+        with self._lock:
+            for slot in range(self.capacity):
+                self._clear(slot)
+
+    def active_sessions(self) -> int:
+        """Registros ocupados, leídos del encabezado en O(1).
+
+        Aproximado: incluye sesiones ya expiradas cuyo registro aún no se reclamó (se liberan
+        al volver a leerse o al reutilizar el registro).
+        """
+        return self._HEADER.unpack_from(self._mmap, 0)[self._FIELDS.index("occupied")]
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Ocupación, memoria reservada y contadores (compartidos entre workers)"""
+        counters = dict(zip(self._FIELDS, self._HEADER.unpack_from(self._mmap, 0)))
+        active = counters.pop("occupied")
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "active": active,
+            "capacity": self.capacity,
+            "ttl_seconds": self.ttl,
+            "memory_bytes": self.memory_bytes,
+            **counters,
+            "hit_rate": round(counters["hits"] / lookups * 100, 2) if lookups else 0
+        }
@@ -0,0 +1,100 @@
+import mmap
+import os
+import struct
+import time
+from typing import Dict, List, Optional, Sequence
+
+class SharedStatsTable:
+    """Tabla de contadores en memoria compartida entre procesos (mmap anónimo, MAP_SHARED).
+
+    Se crea en el proceso maestro antes del fork; cada worker publica sus contadores
+    en su propia fila (un solo escritor por fila, sin locks) y cualquier proceso puede
+    leer y sumar todas las filas. Cada fila lleva un número de secuencia (seqlock):
+    impar mientras se escribe, así los lectores reintentan en lugar de leer una mezcla.
+    La última fila acumula los contadores de workers terminados (la escribe el maestro);
+    los campos de `gauges` son niveles actuales (tamaño de una cola, de un log) y no se
+    acumulan al retirar un worker.
+    """
+
+    # Encabezado de fila: secuencia, pid y momento de la última publicación
+    _ROW_HEADER = struct.Struct("=Qqd")
+
+    def __init__(self, fields: Sequence[str], workers: int, gauges: Sequence[str] = ()):
+        self.fields = tuple(fields)
+        self.gauges = frozenset(gauges)
+        self.workers = workers
+        self._values = struct.Struct(f"={len(self.fields)}d")
+        self._row_size = self._ROW_HEADER.size + self._values.size
+        # Una fila por worker más la fila de workers retirados
+        self._mmap = mmap.mmap(-1, self._row_size * (workers + 1))
+
+    @property
+    def retired_slot(self) -> int:
+        return self.workers
+
+    def _offset(self, slot: int) -> int:
+        if not 0 <= slot <= self.workers:
+            raise IndexError(f"Fila fuera de rango: {slot}")
+        return slot * self._row_size
+
+    def publish(self, slot: int, values: Dict[str, float]):
+        """Escribe los contadores de un worker en su fila"""
+        offset = self._offset(slot)
+        sequence = self._ROW_HEADER.unpack_from(self._mmap, offset)[0]
+        # Secuencia impar: escritura en curso
+        struct.pack_into("=Q", self._mmap, offset, sequence + 1)
+        self._values.pack_into(self._mmap, offset + self._ROW_HEADER.size,
+                               *(float(values.get(field, 0)) for field in self.fields))
+        self._ROW_HEADER.pack_into(self._mmap, offset, sequence + 2, os.getpid(), time.time())
+
+    def read(self, slot: int) -> Optional[Dict[str, float]]:
+        """Lee una fila de forma consistente; None si nunca se publicó"""
+        offset = self._offset(slot)
+        while True:
+            sequence, pid, updated_at = self._ROW_HEADER.unpack_from(self._mmap, offset)
+            if sequence % 2:
+                time.sleep(0)
+                continue
+            values = self._values.unpack_from(self._mmap, offset + self._ROW_HEADER.size)
+            if self._ROW_HEADER.unpack_from(self._mmap, offset)[0] == sequence:
+                break
+        if not sequence:
+            return None
+        row = dict(zip(self.fields, values))
+        row.update({"pid": pid, "updated_at": updated_at})
+        return row
+
+    def retire(self, slot: int):
+        """Pliega la fila de un worker terminado en la fila de retirados (solo el maestro)"""
+        row = self.read(slot)
+        if row is None:
+            return
+        retired = self.read(self.retired_slot) or {}
+        self.publish(self.retired_slot, {
+            field: retired.get(field, 0) + (0 if field in self.gauges else row[field]) for field in self.fields
+        })
+        self.clear(slot)
+
+    def clear(self, slot: int):
+        """Deja una fila como nunca publicada (para el worker que ocupe ese lugar)"""
+        offset = self._offset(slot)
+        sequence = self._ROW_HEADER.unpack_from(self._mmap, offset)[0]
+        struct.pack_into("=Q", self._mmap, offset, sequence | 1)
+        self._values.pack_into(self._mmap, offset + self._ROW_HEADER.size, *([0.0] * len(self.fields)))
+        self._ROW_HEADER.pack_into(self._mmap, offset, 0, 0, 0.0)
+
+    def rows(self) -> List[Dict[str, float]]:
+        """Filas publicadas por los workers (sin la de retirados)"""
+        return [row for row in (self.read(slot) for slot in range(self.workers)) if row is not None]
+
+    def totals(self) -> Dict[str, float]:
+        """Suma de todas las filas, incluidos los workers retirados"""
+        totals = dict.fromkeys(self.fields, 0)
+        for slot in range(self.workers + 1):
+            row = self.read(slot)
+            if row is None:
+                continue
+            for field in self.fields:
+                totals[field] += row[field]
+        # Los contadores enteros se publican como double; se devuelven como int
+        return {field: int(value) if float(value).is_integer() else value for field, value in totals.items()}
@@ -1,6 +1,10 @@
 import re
 import unicodedata
-from typing import List
+from typing import List, Tuple
+
+# Patrones precompilados del pipeline de normalización
+SPECIAL_CHARS_RE = re.compile(r'[^a-z0-9áéíóúñü\s]')
+WHITESPACE_RE = re.compile(r'\s+')
 
 class TextPreprocessor:
     """Clase para preprocesamiento y normalización de texto"""
@@ -72,10 +76,10 @@ class TextPreprocessor:
         text = ''.join([c for c in text if not unicodedata.combining(c)])
         
         # Eliminar caracteres especiales, mantener letras, números y espacios
-        text = re.sub(r'[^a-z0-9áéíóúñü\s]', '', text)
+        text = SPECIAL_CHARS_RE.sub('', text)
         
         # Eliminar espacios múltiples
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = WHITESPACE_RE.sub(' ', text).strip()
         
         return text
     
@@ -97,4 +101,41 @@ class TextPreprocessor:
         processed = cls.normalize_text(text)
         if remove_stopwords:
             processed = cls.remove_stop_words(processed)
-        return processed
\ No newline at end of file
+        return processed
+    
+    @classmethod
+    def preprocess_tokens(cls, text: str, remove_stopwords: bool = True) -> Tuple[str, ...]:
+        """Pipeline fusionado: texto crudo → tupla de tokens, equivalente a full_preprocess + tokenize"""
+        if not text:
+            return ()
+        
+        # Una sola pasada de str.translate (minúsculas, acentos y caracteres especiales) y un split
+        words = text.translate(_TRANSLATION_TABLE).split()
+        
+        if remove_stopwords:
+            stop_words = cls.SPANISH_STOP_WORDS
+            return tuple(word for word in words if word not in stop_words)
+        return tuple(words)
+
+
+class _TranslationTable(dict):
+    """Tabla carácter → salida de normalize_text, calculada perezosamente por punto de código.
+
+    normalize_text es composicional carácter a carácter: NFKD no recompone, las marcas
+    combinantes se descartan y la única minúscula contextual (sigma final) termina
+    eliminada por SPECIAL_CHARS_RE, así que traducir cada carácter por separado da el
+    mismo resultado que el pipeline completo.
+    """
+
+    def __missing__(self, code_point: int) -> str:
+        # Mismos pasos que normalize_text aplicados a un solo carácter
+        char = unicodedata.normalize('NFKD', chr(code_point).lower())
+        char = ''.join(c for c in char if not unicodedata.combining(c))
+        char = SPECIAL_CHARS_RE.sub('', char)
+        # Todo espacio se unifica a ' '; el split posterior colapsa y recorta como WHITESPACE_RE + strip
+        char = WHITESPACE_RE.sub(' ', char)
+        self[code_point] = char
+        return char
+
+
+_TRANSLATION_TABLE = _TranslationTable()
@@ -11,12 +11,75 @@ class Config:
     # Rutas de archivos
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     INTENTS_FILE = os.path.join(BASE_DIR, 'data', 'intents.json')
+    # Corpus precompilado (mmap, compartido entre procesos); se regenera si intents.json cambia. None = desactivado
+    COMPILED_INTENTS_FILE = os.path.join(BASE_DIR, 'data', 'intents.compiled')
     CONVERSATIONS_DIR = os.path.join(BASE_DIR, 'data', 'conversations')
     
     # Configuración del chatbot
     MIN_CONFIDENCE = 0.3
     MAX_RESPONSES = 5
+    MAX_BATCH_SIZE = 500
+    STREAM_CHUNK_SIZE = 80  # Caracteres por evento en /chat/stream
+    PRERENDER_RESPONSES = True  # /chat: cuerpos JSON precodificados por respuesta (solo se intercalan confianza, longitud y timestamp)
     ENABLE_LOGGING = True
+    MATCHER_BACKEND = "index"  # "index" (Python puro), "pruned" (poda top-k, corpus grandes), "numpy" (vectorizado), "bm25" (ponderado por IDF)
+    BM25_K1 = 1.2  # Backend "bm25": saturación de términos
+    BM25_B = 0.75  # Backend "bm25": normalización por longitud del patrón
+    MAX_SUGGESTIONS = 2  # Alternativas "¿quisiste decir...?" (intents siguientes del top-k)
+    SUGGESTION_MIN_CONFIDENCE = 0.25  # Score mínimo para ofrecer una alternativa
+    # Contexto por sesión (session_id de chat.js): tabla de tamaño fijo compartida entre workers
+    SESSION_MAX_SESSIONS = 50000  # Memoria reservada: ~40 bytes por sesión (0 = sin sesiones)
+    SESSION_TTL_SECONDS = 1800
+    SESSION_HISTORY = 4  # Tags recientes que se recuerdan por sesión
+    CONTEXT_BOOST = 0.1  # Bono de score para intents del contexto del turno anterior
+    CONTEXT_DECAY = 0.5  # Factor por cada turno de antigüedad
+    # Control de admisión de /chat, /chat/stream y /chat/batch: token bucket por cliente y peticiones en curso.
+    # Con serve.py los límites son globales (memoria compartida) y los umbrales de concurrencia se escalan a los workers
+    ADMISSION_RATE = 2.0  # Mensajes por segundo por cliente, sostenidos (0 = sin límite)
+    ADMISSION_BURST = 10  # Ráfaga permitida por cliente
+    ADMISSION_MAX_CLIENTS = 10000  # Buckets recordados (LRU)
+    ADMISSION_MAX_CONCURRENT = 32  # Por encima se responde 429 de inmediato (0 = sin límite)
+    ADMISSION_DEGRADE_AT = 24  # Desde aquí, respuesta desde la caché o aviso de espera (0 = nunca)
+    ADMISSION_TRUST_FORWARDED = False  # Usar X-Forwarded-For (solo detrás de un proxy de confianza)
+    RESULT_CACHE_SIZE = 1024  # Entradas preprocesadas en caché (0 = desactivada)
+    INTENTS_RELOAD_INTERVAL = 5.0  # Segundos entre revisiones del mtime de intents.json (0 = desactivado)
+    
+    # Coincidencia parcial (errores de escritura, flexiones) con índice de trigramas
+    ENABLE_FUZZY_MATCHING = True
+    FUZZY_MIN_SIMILARITY = 0.7  # Coeficiente de Dice mínimo entre trigramas
+    FUZZY_WEIGHT = 0.9  # Peso de una coincidencia parcial frente a una exacta (1.0)
+    FUZZY_TIME_BUDGET_MS = 2.0  # Presupuesto de latencia por consulta para esta etapa
+    
+    # Métricas de latencia por etapa (/metrics); 0.1 = instrumentar 1 de cada 10 peticiones
+    METRICS_SAMPLE_RATE = 1.0
+    
+    # Servidor de producción pre-fork (serve.py)
+    SERVER_HOST = '0.0.0.0'
+    SERVER_PORT = 5000
+    SERVER_WORKERS = 0  # 0 = un proceso por núcleo
+    SERVER_BACKLOG = 1024
+    STATS_PUBLISH_INTERVAL = 1.0  # segundos entre publicaciones de contadores de cada worker
+    
+    # Servidor ASGI (asgi.py): hilos para el scoring y cola acotada (por encima → 503)
+    ASGI_EXECUTOR_WORKERS = 4
+    ASGI_MAX_PENDING = 256  # Peticiones en curso o en cola del executor
+    ASGI_MAX_BODY_BYTES = 1024 * 1024
+    ASGI_KEEP_ALIVE_SECONDS = 75  # Conexiones keep-alive inactivas no ocupan hilos
+    
+    # Administración (si ADMIN_TOKEN es None solo se aceptan peticiones locales)
+    ADMIN_TOKEN = None
+    
+    # Persistencia de conversaciones (JSON Lines en CONVERSATIONS_DIR)
+    CONVERSATION_LOG_QUEUE_SIZE = 10000
+    CONVERSATION_LOG_BATCH_SIZE = 500
+    CONVERSATION_LOG_FLUSH_INTERVAL = 1.0  # segundos
+    CONVERSATION_LOG_MAX_BYTES = 10 * 1024 * 1024
+    CONVERSATION_LOG_ROTATE_SECONDS = 3600
+    
+    # Análisis offline de conversaciones (python -m chatbot.conversation_analytics)
+    ANALYTICS_CHECKPOINT_FILE = os.path.join(BASE_DIR, 'data', 'analytics_checkpoint.json')
+    ANALYTICS_SKETCH_SIZE = 1000  # Consultas distintas vigiladas por resumen (memoria acotada)
+    ANALYTICS_TOP_QUERIES = 20
     
     # Configuración de NLP (para futuras fases)
     USE_NLP = False
@@ -0,0 +1,173 @@
+"""Servidor de producción multiproceso (pre-fork).
+
+El proceso maestro importa la aplicación (carga y compila el corpus una sola vez),
+abre el socket de escucha y crea N workers con fork: el corpus se hereda en páginas
+compartidas copy-on-write. Cada worker atiende peticiones con su propio servidor
+WSGI de un solo hilo, de modo que el scoring en Python no compite por el GIL.
+
+Uso: python serve.py --workers 4 --port 5000
+"""
+import argparse
+import gc
+import math
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict
+from werkzeug.serving import make_server
+from config import Config
+from chatbot.utils.admission import AdmissionController
+from chatbot.utils.shared_stats import SharedStatsTable
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Servidor pre-fork del chatbot")
+    parser.add_argument("--host", default=Config.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=Config.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=Config.SERVER_WORKERS,
+                        help="Número de procesos (0 = uno por núcleo)")
+    return parser.parse_args(argv)
+
+
+def create_listener(host: str, port: int) -> socket.socket:
+    """Socket de escucha compartido: el kernel reparte las conexiones entre los workers"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    listener = socket.socket(family, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(Config.SERVER_BACKLOG)
+    listener.set_inheritable(True)
+    return listener
+
+
+def scale_limit(limit: int, workers: int) -> int:
+    """Umbral de concurrencia de Config (pensado para ADMISSION_MAX_CONCURRENT en curso) escalado a N workers"""
+    if not limit:
+        return 0
+    if not Config.ADMISSION_MAX_CONCURRENT:
+        return min(limit, workers)
+    return max(1, math.ceil(limit * workers / Config.ADMISSION_MAX_CONCURRENT))
+
+
+def create_admission(workers: int) -> AdmissionController:
+    """Control de admisión compartido por todos los workers (se crea antes del fork).
+
+    Cada worker atiende una petición a la vez, así que las peticiones en curso nunca
+    superan el número de workers: los umbrales se escalan de ADMISSION_MAX_CONCURRENT a
+    `workers` (con todos ocupados, las conexiones nuevas esperan en el backlog del socket).
+    """
+    return AdmissionController(
+        rate=Config.ADMISSION_RATE,
+        burst=Config.ADMISSION_BURST,
+        max_clients=Config.ADMISSION_MAX_CLIENTS,
+        max_concurrent=scale_limit(Config.ADMISSION_MAX_CONCURRENT, workers),
+        degrade_at=scale_limit(Config.ADMISSION_DEGRADE_AT, workers),
+        workers=workers
+    )
+
+
+def run_worker(application, listener: socket.socket, table: SharedStatsTable, slot: int, host: str, port: int):
+    """Cuerpo de un worker: agrega sus estadísticas a la tabla compartida y atiende peticiones"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    manager = application.intents_manager
+    manager.attach_shared_stats(table, slot, Config.STATS_PUBLISH_INTERVAL)
+    application.admission.use_slot(slot)
+    # Los hilos no sobreviven al fork: cada worker arranca su vigilante. Solo el worker 0
+    # recompila intents.json y regenera el artefacto; los demás remapean el artefacto nuevo
+    manager.start_auto_reload(Config.INTENTS_RELOAD_INTERVAL, rebuild=slot == 0)
+
+    server = make_server(host, port, application.app, threaded=False, fd=listener.fileno())
+    print(f"✅ Worker {slot} (pid {os.getpid()}) atendiendo en http://{host}:{port}")
+    try:
+        server.serve_forever()
+    finally:
+        manager.publish_statistics()
+        if application.conversation_writer is not None:
+            application.conversation_writer.close()
+
+
+def spawn_worker(application, listener: socket.socket, table: SharedStatsTable, slot: int,
+                 host: str, port: int) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+    # Proceso hijo: nunca debe volver al código del maestro
+    exit_code = 0
+    try:
+        run_worker(application, listener, table, slot, host, port)
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else 0
+    except Exception as e:
+        print(f"❌ Error en worker {slot}: {e}")
+        exit_code = 1
+    finally:
+        sys.stdout.flush()
+        os._exit(exit_code)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workers = args.workers or os.cpu_count() or 1
+
+    print("🚀 Iniciando ChatBot Avanzado (pre-fork)...")
+    # Importar la aplicación carga el corpus una sola vez en el proceso maestro
+    import app as application
+    application.app.debug = False
+    manager = application.intents_manager
+    manager.stop_auto_reload()
+    os.makedirs(Config.CONVERSATIONS_DIR, exist_ok=True)
+
+    listener = create_listener(args.host, args.port)
+    table = SharedStatsTable(manager.shared_stats_fields(), workers, gauges=manager.SHARED_GAUGES)
+    # Buckets por cliente y peticiones en curso en memoria compartida: límites globales, no por worker
+    application.admission = create_admission(workers)
+
+    # Los objetos heredados quedan fuera del GC para que no se copien sus páginas
+    gc.collect()
+    gc.freeze()
+
+    children: Dict[int, int] = {}
+    for slot in range(workers):
+        children[spawn_worker(application, listener, table, slot, args.host, args.port)] = slot
+    print(f"✅ {workers} workers en http://{args.host}:{args.port}")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # Supervisión: un worker que termina inesperadamente se reemplaza en el mismo lugar
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        slot = children.pop(pid, None)
+        if slot is None:
+            continue
+        table.retire(slot)
+        application.admission.retire(slot)
+        if not stopping:
+            print(f"❌ Worker {slot} (pid {pid}) terminó con estado {status}, reiniciando")
+            time.sleep(0.5)
+            children[spawn_worker(application, listener, table, slot, args.host, args.port)] = slot
+
+    listener.close()
+    print("👋 Servidor detenido")
+
+
+if __name__ == "__main__":
+    main()
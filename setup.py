@@ -15,6 +15,7 @@ setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     packages=find_packages(),
+    py_modules=["app", "asgi", "config", "serve"],
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Education",
@@ -34,6 +35,9 @@ setup(
     entry_points={
         "console_scripts": [
             "chatbot-propedeutico=app:main",
+            "chatbot-propedeutico-serve=serve:main",
+            "chatbot-propedeutico-asgi=asgi:main",
+            "chatbot-propedeutico-analytics=chatbot.conversation_analytics:main",
         ],
     },
 )
\ No newline at end of file
@@ -3,6 +3,8 @@ class AdvancedChatBot {
     constructor() {
         this.utils = chatUtils;
         this.isTyping = false;
+        // Respuestas en streaming (SSE sobre fetch) si el navegador lo soporta
+        this.useStreaming = typeof ReadableStream !== 'undefined' && typeof TextDecoder !== 'undefined';
         this.currentSessionId = this.generateSessionId();
         this.initializeElements();
         this.setupEventListeners();
@@ -115,6 +117,11 @@ class AdvancedChatBot {
         this.showTypingIndicator();
 
         try {
+            if (this.useStreaming) {
+                await this.streamFromServer(userInput);
+                return;
+            }
+
             // Enviar al servidor
             const response = await this.sendToServer(userInput);
             
@@ -154,13 +161,140 @@ class AdvancedChatBot {
             })
         });
 
-        if (!response.ok) {
+        // 429 (control de admisión): el cuerpo trae un mensaje para mostrar
+        if (!response.ok && response.status !== 429) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
 
         return await response.json();
     }
 
+    // Recibir la respuesta por eventos (meta, chunk, done) y mostrarla a medida que llega
+    async streamFromServer(message) {
+        const response = await fetch('/chat/stream', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream'
+            },
+            body: JSON.stringify({
+                message: message,
+                session_id: this.currentSessionId,
+                timestamp: new Date().toISOString()
+            })
+        });
+
+        // 429 (control de admisión): respuesta JSON con el mensaje para mostrar, no un stream
+        if (response.status === 429) {
+            const rejection = await response.json();
+            this.hideTypingIndicator();
+            this.addMessageToChat(rejection.response, false, { isError: true });
+            return;
+        }
+
+        if (!response.ok || !response.body) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let botMessage = null;
+        let text = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            // Los eventos SSE terminan con una línea en blanco
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const event = this.parseServerEvent(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+                if (!event) continue;
+
+                if (event.type === 'meta') {
+                    // Tag y confianza llegan antes que el texto
+                    this.hideTypingIndicator();
+                    botMessage = this.createBotMessage({
+                        confidence: event.data.confidence,
+                        tag: event.data.tag,
+                        isError: event.data.status === 'error'
+                    });
+                } else if (event.type === 'chunk' && botMessage) {
+                    text += event.data.text;
+                    botMessage.content.innerHTML = this.utils.formatMessage(text);
+                    this.scrollToBottom();
+                } else if (event.type === 'done' && botMessage) {
+                    this.utils.addToHistory(text, false);
+                    this.utils.log('Mensaje bot agregado (streaming)', 'info');
+                } else if (event.type === 'error') {
+                    this.hideTypingIndicator();
+                    this.addMessageToChat(event.data.response, false, { isError: true });
+                }
+            }
+        }
+
+        if (!botMessage) {
+            this.hideTypingIndicator();
+        }
+    }
+
+    // Interpretar un evento SSE ("event: ..." y "data: ...")
+    parseServerEvent(block) {
+        let type = 'message';
+        let data = '';
+        block.split('\n').forEach(line => {
+            if (line.startsWith('event:')) {
+                type = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                data += line.slice(5).trim();
+            }
+        });
+        if (!data) return null;
+
+        try {
+            return { type: type, data: JSON.parse(data) };
+        } catch (error) {
+            this.utils.log('Evento inválido: ' + error, 'error');
+            return null;
+        }
+    }
+
+    // Crear un mensaje del bot vacío que se completa a medida que llega el texto
+    createBotMessage(metadata = {}) {
+        const messageDiv = document.createElement('div');
+        messageDiv.className = 'message bot-message';
+
+        const content = document.createElement('div');
+        content.className = 'message-content';
+        messageDiv.appendChild(content);
+
+        if (metadata.confidence && !metadata.isError) {
+            const metadataDiv = document.createElement('div');
+            metadataDiv.className = 'message-metadata';
+            metadataDiv.innerHTML = `
+                <span class="confidence-badge">Confianza: ${(metadata.confidence * 100).toFixed(1)}%</span>
+                <span class="message-tag">#${metadata.tag}</span>
+            `;
+            messageDiv.appendChild(metadataDiv);
+        }
+
+        if (metadata.isError) {
+            messageDiv.classList.add('error-message');
+        }
+
+        this.elements.chatMessages.appendChild(messageDiv);
+        this.scrollToBottom();
+
+        if (!metadata.isError) {
+            this.animateMessageAppearance(messageDiv);
+        }
+
+        return { element: messageDiv, content: content };
+    }
+
     // Agregar mensaje al chat
     addMessageToChat(content, isUser = false, metadata = {}) {
         const messageDiv = document.createElement('div');
@@ -0,0 +1,29 @@
+"""Fixtures compartidos: la aplicación Flask con datos de ejecución en un directorio temporal"""
+import pytest
+
+from config import Config
+
+
+@pytest.fixture(scope="session")
+def application(tmp_path_factory):
+    """Módulo app importado una sola vez, sin escribir en data/ ni vigilar intents.json"""
+    runtime_dir = tmp_path_factory.mktemp("runtime")
+    Config.CONVERSATIONS_DIR = str(runtime_dir / "conversations")
+    Config.COMPILED_INTENTS_FILE = None
+    Config.INTENTS_RELOAD_INTERVAL = 0
+    import app
+    return app
+
+
+@pytest.fixture
+def client(application):
+    """Cliente de pruebas con el control de admisión y la caché de resultados en estado inicial"""
+    application.admission = type(application.admission)(
+        rate=Config.ADMISSION_RATE,
+        burst=Config.ADMISSION_BURST,
+        max_clients=Config.ADMISSION_MAX_CLIENTS,
+        max_concurrent=Config.ADMISSION_MAX_CONCURRENT,
+        degrade_at=Config.ADMISSION_DEGRADE_AT
+    )
+    application.intents_manager.result_cache.clear()
+    return application.app.test_client()
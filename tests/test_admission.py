@@ -0,0 +1,99 @@
+"""Control de admisión: token bucket por cliente, peticiones en curso y estado compartido entre workers"""
+import os
+
+from chatbot.utils.admission import ADMIT, DEGRADE, OVERLOADED, RATE_LIMITED, AdmissionController
+
+
+def test_batch_cost_is_charged_per_message(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr("chatbot.utils.admission.time.monotonic", lambda: clock[0])
+    controller = AdmissionController(rate=2.0, burst=10, max_concurrent=0, degrade_at=0)
+
+    # Un lote mayor que burst se admite con el bucket lleno y deja deuda
+    assert controller.admit("cliente", cost=30) == (ADMIT, 0.0)
+    controller.release()
+    decision, retry_after = controller.admit("cliente")
+    assert decision == RATE_LIMITED
+    assert retry_after == 10.5
+
+    clock[0] += 10.5
+    assert controller.admit("cliente")[0] == ADMIT
+    # Otro cliente no se ve afectado
+    assert controller.admit("otro", cost=10)[0] == ADMIT
+    assert controller.admit("otro")[0] == RATE_LIMITED
+
+
+def test_stream_rejects_a_body_that_is_not_a_json_object(application, client):
+    for body in ("[1, 2]", "7", "no es json"):
+        response = client.post('/chat/stream', data=body, content_type='application/json')
+        assert response.status_code == 400
+    assert application.admission.in_flight == 0
+    assert application.admission.get_statistics()["admitted"] == 0
+
+
+def test_stream_and_batch_release_their_admission_slot(application, client):
+    response = client.post('/chat/stream', json={'message': 'hola'})
+    response.get_data()
+    response.close()
+    client.post('/chat/batch', json={'messages': ['hola', 'adios']})
+    statistics = application.admission.get_statistics()
+    assert statistics["admitted"] == 2
+    assert statistics["in_flight"] == 0
+
+
+def test_limits_are_shared_between_forked_workers():
+    controller = AdmissionController(rate=0.001, burst=3, max_concurrent=2, degrade_at=1, workers=2)
+    admitted_read, admitted_write = os.pipe()
+    release_read, release_write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # Worker 1: ocupa una petición en curso y dos tokens del cliente, y termina sin release
+        try:
+            controller.use_slot(1)
+            controller.admit("cliente", cost=2)
+            os.write(admitted_write, b"1")
+            os.read(release_read, 1)
+        finally:
+            os._exit(0)
+
+    os.read(admitted_read, 1)
+    assert controller.in_flight == 1
+    assert controller.admit("cliente") == (DEGRADE, 0.0)
+    assert controller.admit("otro")[0] == OVERLOADED
+    controller.release()
+    assert controller.admit("cliente")[0] == RATE_LIMITED
+
+    os.write(release_write, b"1")
+    os.waitpid(pid, 0)
+    # El maestro descarta las peticiones en curso del worker terminado
+    assert controller.in_flight == 1
+    controller.retire(1)
+    assert controller.in_flight == 0
+
+    statistics = controller.get_statistics()
+    assert statistics["admitted"] == 1 and statistics["degraded"] == 1
+    assert statistics["overloaded"] == 1 and statistics["rate_limited"] == 1
+    assert statistics["peak_in_flight"] == 2 and statistics["tracked_clients"] == 1
+
+
+def test_chat_degrades_then_rejects_as_requests_pile_up(application, client, monkeypatch):
+    controller = AdmissionController(rate=0, burst=10, max_concurrent=2, degrade_at=1)
+    monkeypatch.setattr(application, "admission", controller)
+    # Con el cliente de pruebas, el resultado de "hola" queda en la caché de resultados
+    assert client.post('/chat', json={'message': 'hola'}).get_json()["tag"] == "saludo"
+
+    assert controller.admit("otro cliente") == (ADMIT, 0.0)
+    cached = client.post('/chat', json={'message': 'hola'}).get_json()
+    assert cached["status"] == "success" and cached["tag"] == "saludo"
+    busy = client.post('/chat', json={'message': 'una consulta que no está en la caché'}).get_json()
+    assert busy["status"] == "degraded"
+
+    assert controller.admit("otro cliente")[0] == DEGRADE
+    response = client.post('/chat', json={'message': 'hola'})
+    assert response.status_code == 429 and response.headers["Retry-After"] == "1"
+
+    controller.release()
+    controller.release()
+    statistics = controller.get_statistics()
+    assert statistics["in_flight"] == 0
+    assert (statistics["admitted"], statistics["degraded"], statistics["overloaded"]) == (2, 3, 1)
@@ -0,0 +1,33 @@
+"""Recarga en modo pre-fork: un proceso recompila el artefacto y los demás solo lo remapean"""
+import json
+import os
+
+from chatbot.intents_manager import IntentsManager
+
+
+def write_intents(path, greeting):
+    intents = {"intents": [{"tag": "saludo", "patterns": [greeting], "responses": ["¡Hola!"]}]}
+    path.write_text(json.dumps(intents), encoding="utf-8")
+
+
+def test_follower_remaps_artifact_written_by_leader(tmp_path):
+    intents_file, compiled_file = tmp_path / "intents.json", tmp_path / "intents.compiled"
+    write_intents(intents_file, "hola buenos dias")
+    leader = IntentsManager(str(intents_file), compiled_file=str(compiled_file))
+    follower = IntentsManager(str(intents_file), compiled_file=str(compiled_file))
+    assert follower.corpus.source == "artifact"
+    # Primera revisión: el artefacto es el que ya está en servicio
+    assert not follower.remap_if_changed()
+
+    write_intents(intents_file, "buenas tardes amigo")
+    assert not follower.remap_if_changed()
+    artifact_mtime = os.stat(compiled_file).st_mtime_ns
+
+    assert leader.reload_if_changed()
+    assert os.stat(compiled_file).st_mtime_ns != artifact_mtime
+    assert follower.remap_if_changed()
+    assert follower.corpus.source == "artifact"
+    assert follower.corpus.source_checksum == leader.corpus.source_checksum
+    assert follower.find_best_intent("buenas tardes")["status"] == "success"
+    # Sin nuevos cambios no se vuelve a remapear
+    assert not follower.remap_if_changed()
@@ -0,0 +1,85 @@
+"""asgi.py: mismas respuestas que la aplicación Flask y streaming evento por evento"""
+import asyncio
+import json
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def asgi(application, client):
+    import asgi
+    return asgi
+
+
+def call(asgi, method, path, body=b"", on_send=None):
+    """Ejecuta una petición contra la aplicación ASGI; retorna los mensajes enviados"""
+    async def scenario():
+        sent = []
+        requests = [{"type": "http.request", "body": body, "more_body": False}]
+
+        async def receive():
+            return requests.pop(0) if requests else {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+            if on_send is not None:
+                await on_send(message)
+
+        scope = {"type": "http", "method": method, "path": path, "headers": [], "client": ("127.0.0.1", 1)}
+        await asgi.app(scope, receive, send)
+        return sent
+
+    return asyncio.run(scenario())
+
+
+def test_chat_has_the_same_schema_as_the_flask_app(client, asgi):
+    sent = call(asgi, "POST", "/chat", json.dumps({"message": "hola"}).encode())
+    assert sent[0]["status"] == 200
+    asgi_response = json.loads(sent[1]["body"])
+    flask_response = client.post("/chat", json={"message": "hola"}).get_json()
+    assert asgi_response.keys() == flask_response.keys()
+    assert asgi_response["tag"] == flask_response["tag"] == "saludo"
+
+
+def test_saturated_executor_answers_503_with_retry_after(asgi, monkeypatch):
+    monkeypatch.setattr(asgi.executor, "max_pending", 0)
+    for path in ("/chat", "/chat/stream"):
+        sent = call(asgi, "POST", path, json.dumps({"message": "hola"}).encode())
+        assert sent[0]["status"] == 503
+        assert (b"retry-after", b"1") in sent[0]["headers"]
+    assert asgi.executor.pending == 0
+
+
+@pytest.mark.parametrize("path", ["/chat", "/chat/stream", "/chat/batch"])
+@pytest.mark.parametrize("body", [b"no es json", b"[1, 2]", b""])
+def test_invalid_json_is_rejected_with_400_in_both_front_ends(application, client, asgi, path, body):
+    sent = call(asgi, "POST", path, body)
+    assert sent[0]["status"] == 400
+    assert json.loads(sent[1]["body"])["status"] == "error"
+    assert client.post(path, data=body, content_type='application/json').status_code == 400
+    assert application.admission.in_flight == 0
+
+
+def test_stream_sends_each_event_as_soon_as_it_is_produced(application, asgi, monkeypatch):
+    release = threading.Event()
+
+    def stream_response(user_input, session_id=None, chunk_size=80, degraded=False):
+        yield "meta", {"tag": "saludo", "status": "success"}
+        # El resto de la respuesta espera a que el cliente haya recibido el primer evento
+        assert release.wait(5)
+        yield "done", {"response_length": 0}
+
+    monkeypatch.setattr(application.response_generator, "stream_response", stream_response)
+
+    async def on_send(message):
+        if message["type"] == "http.response.body" and b"event: meta" in message["body"]:
+            assert message["more_body"] is True
+            release.set()
+
+    sent = call(asgi, "POST", "/chat/stream", json.dumps({"message": "hola"}).encode(), on_send)
+    assert release.is_set()
+    bodies = b"".join(message.get("body", b"") for message in sent[1:])
+    assert bodies.index(b"event: meta") < bodies.index(b"event: done")
+    assert sent[-1] == {"type": "http.response.body", "body": b""}
+    assert asgi.executor.pending == 0
@@ -0,0 +1,46 @@
+"""Un lote debe clasificarse igual que sus mensajes uno por uno"""
+import os
+
+import pytest
+
+from chatbot.intents_manager import IntentsManager
+from config import Config
+
+INTENTS_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "intents.json")
+MESSAGES = ["hola", "¿cuánto dura el curso?", "hola", "xyzzy", "gracias por la ayuda", "¿qué es la plataforma?"]
+
+
+def summary(result):
+    return result["tag"], result["confidence"], result["matched_pattern"], result["status"]
+
+
+@pytest.fixture
+def manager():
+    return IntentsManager(INTENTS_FILE)
+
+
+def test_batch_matches_one_by_one(manager):
+    expected = [summary(manager.find_best_intent(message)) for message in MESSAGES]
+    assert [summary(result) for result in manager.find_best_intents(MESSAGES)] == expected
+    assert manager.find_best_intents([]) == []
+
+    stats = manager.get_statistics()
+    assert stats["total_queries"] == 2 * len(MESSAGES)
+    assert stats["recognized_intents"] + stats["unknown_intents"] == stats["total_queries"]
+
+
+def test_batch_endpoint_answers_every_message_in_order(client):
+    response = client.post('/chat/batch', json={'messages': ['hola', '  ', 'gracias']})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['count'] == 3
+    assert [item['status'] for item in body['responses']] == ['success', 'error', 'success']
+
+
+@pytest.mark.parametrize("messages, status", [
+    ([], 400),
+    ("hola", 400),
+    (["hola"] * (Config.MAX_BATCH_SIZE + 1), 413),
+])
+def test_batch_endpoint_rejects_invalid_batches(client, messages, status):
+    assert client.post('/chat/batch', json={'messages': messages}).status_code == status
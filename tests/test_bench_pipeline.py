@@ -0,0 +1,41 @@
+"""Prueba de humo del benchmark del pipeline: corpus reproducibles y reporte JSON comparable"""
+import json
+import os
+import random
+import subprocess
+import sys
+
+from benchmarks import bench_pipeline
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_corpus_and_queries_are_reproducible():
+    def generate(seed):
+        rng = random.Random(seed)
+        corpus = bench_pipeline.generate_corpus(200, rng)
+        return corpus, bench_pipeline.generate_queries(corpus, 50, bench_pipeline.QUERY_MIX, rng)
+
+    corpus, queries = generate(42)
+    assert (corpus, queries) == generate(42)
+    assert sum(len(intent["patterns"]) for intent in corpus["intents"]) == 200
+    assert len(queries) == 50
+
+
+def test_report_has_every_stage_and_can_be_compared(tmp_path):
+    output = tmp_path / "report.json"
+    command = [sys.executable, "-m", "benchmarks.bench_pipeline", "--sizes", "50", "--queries", "40",
+               "--no-http", "--output", str(output)]
+    subprocess.run(command, cwd=ROOT, check=True, capture_output=True)
+
+    report = json.loads(output.read_text(encoding="utf-8"))
+    result = report["results"]["50"]
+    assert result["patterns"] == 50
+    assert result["recognition_rate"] > 0
+    for stage in ("preprocess", "fuzzy", "match", "response", "pipeline"):
+        metrics = result["stages"][stage]
+        assert metrics["p50_ms"] <= metrics["p95_ms"] <= metrics["p99_ms"]
+        assert metrics["throughput_ops"] > 0
+
+    compare = [sys.executable, "-m", "benchmarks.bench_pipeline", "--compare", str(output), str(output)]
+    assert "(+0.0%)" in subprocess.run(compare, cwd=ROOT, check=True, capture_output=True, text=True).stdout
@@ -0,0 +1,65 @@
+"""BM25: los tokens raros pesan más, la confianza queda en [0, 1] y la comparación offline corre"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from chatbot.bm25_matcher import BM25Matcher
+from chatbot.intents_manager import IntentsManager
+from chatbot.matchers import IndexMatcher, create_matcher
+from chatbot.pattern_index import PatternIndex
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+INTENTS = {"intents": [
+    {"tag": "curso_general", "patterns": ["hola curso", "curso precio", "curso horario"], "responses": ["A"]},
+    {"tag": "curso_python", "patterns": ["hola python"], "responses": ["B"]},
+]}
+
+
+@pytest.fixture(scope="module")
+def index():
+    return PatternIndex(INTENTS)
+
+
+def test_rare_token_outranks_a_common_one(index):
+    query = ("curso", "python")
+    # Con el índice ambos patrones cubren la mitad de sus tokens; BM25 prefiere el token raro
+    assert IndexMatcher(index).best_match(query)[1] == 0.5
+    pattern_id, confidence = BM25Matcher(index).best_match(query)
+    assert index.intent_for(pattern_id)["tag"] == "curso_python"
+    assert 0.0 < confidence < 1.0
+
+
+def test_full_pattern_has_confidence_one_and_alternatives_stay_in_range(index):
+    matcher = BM25Matcher(index)
+    pattern_id, confidence = matcher.best_match(("hola", "python"))
+    assert index.intent_for(pattern_id)["tag"] == "curso_python" and confidence == 1.0
+    assert all(0.0 <= score <= 1.0 for score in matcher.intent_scores(("hola", "curso", "python")))
+    assert matcher.best_match(("desconocido",)) == (None, 0.0)
+
+
+def test_backend_is_selected_by_name(tmp_path, index):
+    assert isinstance(create_matcher("bm25", index), BM25Matcher)
+    with pytest.raises(ValueError):
+        create_matcher("bm26", index)
+
+    intents_file = tmp_path / "intents.json"
+    intents_file.write_text(json.dumps(INTENTS), encoding="utf-8")
+    manager = IntentsManager(str(intents_file), matcher_backend="bm25")
+    assert manager.find_best_intent("curso python")["tag"] == "curso_python"
+
+
+def test_compare_matchers_reports_every_backend(tmp_path):
+    output = tmp_path / "comparacion.json"
+    command = [sys.executable, "-m", "benchmarks.compare_matchers", "--folds", "2", "--output", str(output)]
+    subprocess.run(command, cwd=ROOT, check=True, capture_output=True)
+
+    results = json.loads(output.read_text(encoding="utf-8"))["results"]
+    assert set(results) == {"index", "bm25"}
+    for result in results.values():
+        assert 0.0 <= result["accuracy"] <= 100.0
+        assert 0.0 <= result["mrr"] <= 1.0
+        assert result["queries"] > 0
@@ -0,0 +1,46 @@
+"""El bono de contexto solo reordena candidatos: no cambia la confianza ni el umbral de reconocimiento"""
+import json
+
+import pytest
+
+from chatbot.intents_manager import IntentsManager
+from chatbot.utils.session_store import SessionStore
+
+INTENTS = {"intents": [
+    {"tag": "curso_duracion", "context": "cursos", "patterns": ["cuanto dura el curso"], "responses": ["Seis semanas."]},
+    {"tag": "envio_duracion", "context": "envios", "patterns": ["cuanto tarda el envio"], "responses": ["Tres días."]}
+]}
+CURSOS = [SessionStore.tag_key("curso_duracion")]
+
+
+@pytest.fixture
+def manager(tmp_path):
+    intents_file = tmp_path / "intents.json"
+    intents_file.write_text(json.dumps(INTENTS), encoding="utf-8")
+    return IntentsManager(str(intents_file), min_confidence=0.3, context_boost=0.1)
+
+
+def test_boost_reorders_without_changing_confidence(manager):
+    matches = manager._apply_context(manager.corpus, ((1, 0.35), (0, 0.32)), CURSOS)
+    assert matches == ((0, 0.32), (1, 0.35))
+
+
+def test_boost_does_not_make_a_weak_match_recognized(manager):
+    matches = manager._apply_context(manager.corpus, ((0, 0.21),), CURSOS)
+    assert matches == ((0, 0.21),)
+    result = manager._finish_result(manager.corpus, "dura", matches)
+    assert result["status"] != "success"
+    assert result["confidence"] == 0.21
+
+
+def test_weak_match_never_outranks_a_recognized_one(manager):
+    matches = manager._apply_context(manager.corpus, ((1, 0.31), (0, 0.28)), CURSOS)
+    assert matches == ((1, 0.31), (0, 0.28))
+
+
+def test_match_at_the_threshold_is_not_recognized_and_never_outranks(manager):
+    # El reconocimiento exige score > min_confidence: 0.3 cuenta como no reconocido
+    without_context = manager._finish_result(manager.corpus, "dura", ((1, 0.31), (0, 0.3)))
+    matches = manager._apply_context(manager.corpus, ((1, 0.31), (0, 0.3)), CURSOS)
+    assert matches == ((1, 0.31), (0, 0.3))
+    assert manager._finish_result(manager.corpus, "dura", matches)["status"] == without_context["status"] == "success"
@@ -0,0 +1,84 @@
+"""Analítica incremental: el checkpoint reproduce una pasada completa y los resúmenes no subestiman"""
+import json
+import random
+from collections import Counter
+
+from chatbot.conversation_analytics import ConversationAnalytics, load_checkpoint, process_directory
+from chatbot.utils.heavy_hitters import SpaceSaving
+
+QUERIES = [("hola", "saludo", 0.95), ("Cuánto dura el curso?", "duracion", 0.5),
+           ("qué es pomodoro", "tecnicas", 0.8), ("asdf qwer", "unknown", 0.1)]
+
+
+def entries(count, rng):
+    for index in range(count):
+        text, tag, confidence = rng.choice(QUERIES)
+        yield {"timestamp": f"2026-10-17T10:{index // 60:02d}:{index % 60:02d}", "user_input": text,
+               "intent_tag": tag, "confidence": confidence, "recognized": tag != "unknown"}
+
+
+def lines(items):
+    return "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in items)
+
+
+def full_report(directory):
+    analytics = ConversationAnalytics()
+    process_directory(str(directory), analytics, {})
+    return analytics.report()
+
+
+def test_incremental_run_matches_a_full_scan(tmp_path):
+    rng = random.Random(7)
+    directory = tmp_path / "conversations"
+    directory.mkdir()
+    checkpoint = str(tmp_path / "checkpoint.json")
+
+    first, second = list(entries(300, rng)), list(entries(200, rng))
+    partial = json.dumps(second[0], ensure_ascii=False)
+    (directory / "conversations_1.jsonl").write_text(lines(first) + partial[:25], encoding="utf-8")
+    analytics, files = load_checkpoint(checkpoint, 1000)
+    process_directory(str(directory), analytics, files, checkpoint)
+    # La última línea está a medio escribir: se deja para la siguiente ejecución
+    assert analytics.entries == 300 and analytics.invalid == 0
+
+    with open(directory / "conversations_1.jsonl", "a", encoding="utf-8") as file:
+        file.write(partial[25:] + "\n" + lines(second[1:100]))
+    (directory / "conversations_2.jsonl").write_text(lines(second[100:]), encoding="utf-8")
+    (directory / "legacy.json").write_text(json.dumps(list(entries(50, rng))), encoding="utf-8")
+
+    analytics, files = load_checkpoint(checkpoint, 1000)
+    summary = process_directory(str(directory), analytics, files, checkpoint)
+    assert summary["entries"] == 250
+    assert analytics.report() == full_report(directory)
+
+    analytics, files = load_checkpoint(checkpoint, 1000)
+    assert process_directory(str(directory), analytics, files, checkpoint)["skipped"] == 3
+
+
+def test_half_written_legacy_file_leaves_no_partial_counts(tmp_path):
+    text = json.dumps(list(entries(10, random.Random(1))))
+    (tmp_path / "legacy.json").write_text(text[:len(text) // 2], encoding="utf-8")
+    analytics, files = ConversationAnalytics(), {}
+    process_directory(str(tmp_path), analytics, files)
+    assert analytics.entries == 0 and "legacy.json" not in files
+
+    (tmp_path / "legacy.json").write_text(text, encoding="utf-8")
+    process_directory(str(tmp_path), analytics, files)
+    assert analytics.entries == 10
+
+
+def test_space_saving_never_underestimates_and_keeps_heavy_hitters():
+    rng = random.Random(3)
+    stream = [f"q{min(int(rng.paretovariate(1.1)), 500)}" for _ in range(20000)]
+    sketch = SpaceSaving(50)
+    for key in stream:
+        sketch.add(key)
+
+    exact = Counter(stream)
+    reported = {item["key"]: item for item in sketch.top(50)}
+    for key, item in reported.items():
+        assert item["count"] - item["error"] <= exact[key] <= item["count"]
+    assert all(key in reported for key, count in exact.items() if count > len(stream) / 50)
+
+    restored = SpaceSaving.from_dict(json.loads(json.dumps(sketch.to_dict())))
+    assert restored.top(10) == sketch.top(10) and restored.total == sketch.total
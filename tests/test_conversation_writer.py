@@ -0,0 +1,47 @@
+"""ConversationWriter: rotación por tamaño, vaciado al cerrar y descarte sin bloquear"""
+import json
+
+from chatbot.utils.conversation_writer import ConversationWriter
+
+
+def read_entries(directory):
+    entries = []
+    for path in sorted(directory.glob("*.jsonl")):
+        with open(path, encoding="utf-8") as file:
+            entries.extend(json.loads(line) for line in file)
+    return entries
+
+
+def test_rotates_by_size(tmp_path):
+    writer = ConversationWriter(str(tmp_path), flush_interval=0.01, batch_size=5, max_file_bytes=200)
+    for position in range(40):
+        assert writer.submit({"position": position, "user_input": "¿cuánto dura el curso?"})
+    writer.close()
+
+    assert [entry["position"] for entry in read_entries(tmp_path)] == list(range(40))
+    statistics = writer.get_statistics()
+    assert statistics["written"] == statistics["submitted"] == 40
+    assert statistics["rotations"] >= 1
+    assert len(list(tmp_path.glob("*.jsonl"))) == statistics["rotations"] + 1
+
+
+def test_close_drains_pending_entries(tmp_path):
+    # Sin flush periódico a la vista: todo lo pendiente se escribe al cerrar
+    writer = ConversationWriter(str(tmp_path), flush_interval=60, batch_size=1000)
+    writer.submit_many({"position": position} for position in range(25))
+    assert read_entries(tmp_path) == []
+    writer.close()
+
+    assert [entry["position"] for entry in read_entries(tmp_path)] == list(range(25))
+    assert writer.get_statistics()["written"] == 25
+    # Cerrado, ya no acepta entradas
+    assert writer.submit({"position": 25}) is False
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    writer = ConversationWriter(str(tmp_path), max_queue_size=2)
+    writer._ensure_started = lambda: None  # sin hilo escritor la cola no se vacía
+
+    assert writer.submit_many({"position": position} for position in range(5)) == 2
+    statistics = writer.get_statistics()
+    assert (statistics["submitted"], statistics["dropped"], statistics["queue_size"]) == (2, 3, 2)
@@ -0,0 +1,58 @@
+"""Artefacto compilado: da los mismos resultados que el JSON y se descarta si está corrupto o desactualizado"""
+import os
+import shutil
+
+import pytest
+
+from chatbot.corpus_artifact import load_artifact
+from chatbot.intents_manager import IntentsManager
+from chatbot.utils.text_preprocessor import TextPreprocessor
+
+INTENTS_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "intents.json")
+QUERIES = ["hola", "¿cuánto dura el curso?", "gracias por la ayuda", "inscripsion al modulo", "xyzzy", ""]
+
+
+@pytest.fixture
+def paths(tmp_path):
+    source = tmp_path / "intents.json"
+    shutil.copy(INTENTS_FILE, source)
+    return str(source), str(tmp_path / "intents.compiled")
+
+
+def summaries(manager):
+    return [(result["tag"], result["confidence"], result["matched_pattern"])
+            for result in (manager.find_best_intent(query) for query in QUERIES)]
+
+
+def test_artifact_round_trip_matches_the_json_corpus(paths):
+    source, compiled = paths
+    from_json = IntentsManager(source, compiled_file=compiled)
+    assert from_json.corpus.source == "json" and os.path.exists(compiled)
+
+    from_artifact = IntentsManager(source, compiled_file=compiled)
+    assert from_artifact.corpus.source == "artifact"
+    assert list(from_artifact.pattern_index.patterns) == list(from_json.pattern_index.patterns)
+    assert [intent["tag"] for intent in from_artifact.intents["intents"]] == \
+        [intent["tag"] for intent in from_json.intents["intents"]]
+    assert summaries(from_artifact) == summaries(from_json)
+
+
+def test_corrupt_or_stale_artifact_falls_back_to_the_json(paths):
+    source, compiled = paths
+    IntentsManager(source, compiled_file=compiled)
+    preprocessor = TextPreprocessor()
+    assert load_artifact(compiled, source, preprocessor) is not None
+
+    with open(compiled, "r+b") as file:
+        file.seek(-1, os.SEEK_END)
+        last = file.read(1)
+        file.seek(-1, os.SEEK_END)
+        file.write(bytes([last[0] ^ 0xFF]))
+    assert load_artifact(compiled, source, preprocessor) is None
+    # El JSON se compila de nuevo y el artefacto se regenera
+    assert IntentsManager(source, compiled_file=compiled).corpus.source == "json"
+    assert load_artifact(compiled, source, preprocessor) is not None
+
+    with open(source, "a", encoding="utf-8") as file:
+        file.write("\n")
+    assert load_artifact(compiled, source, preprocessor) is None
@@ -0,0 +1,46 @@
+"""Etapa difusa: corrige errores de escritura sin alterar los scores exactos ni cachear expansiones incompletas"""
+import json
+
+import pytest
+
+from chatbot.intents_manager import IntentsManager
+
+INTENTS = {"intents": [
+    {"tag": "saludo", "patterns": ["hola buenos dias"], "responses": ["¡Hola!"]},
+    {"tag": "despedida", "patterns": ["adios hasta luego"], "responses": ["¡Adiós!"]}
+]}
+
+
+def make_manager(tmp_path, budget_ms=1000.0, enable_fuzzy=True):
+    intents_file = tmp_path / "intents.json"
+    intents_file.write_text(json.dumps(INTENTS), encoding="utf-8")
+    return IntentsManager(str(intents_file), enable_fuzzy=enable_fuzzy, fuzzy_time_budget_ms=budget_ms)
+
+
+def test_typo_is_recognized_with_a_lower_score(tmp_path):
+    manager = make_manager(tmp_path)
+    result = manager.find_best_intent("hola buenoss dias")
+    assert result["tag"] == "saludo"
+    assert 2 / 3 < result["confidence"] < 1.0
+    assert make_manager(tmp_path, enable_fuzzy=False).find_best_intent("hola buenoss dias")["confidence"] == 2 / 3
+
+
+@pytest.mark.parametrize("message", ["hola buenos dias", "adios", "hasta luego amigo", "xyzzy"])
+def test_exact_only_queries_keep_their_scores(tmp_path, message):
+    fuzzy = make_manager(tmp_path).find_best_intent(message)
+    exact = make_manager(tmp_path, enable_fuzzy=False).find_best_intent(message)
+    assert (fuzzy["tag"], fuzzy["confidence"]) == (exact["tag"], exact["confidence"])
+
+
+@pytest.mark.parametrize("budget_ms, cached", [(-1.0, False), (1000.0, True)])
+def test_find_best_intent_caches_only_complete_expansions(tmp_path, budget_ms, cached):
+    manager = make_manager(tmp_path, budget_ms)
+    manager.find_best_intent("holaa buenos")
+    assert (len(manager.result_cache) == 1) is cached
+
+
+@pytest.mark.parametrize("budget_ms, cached", [(-1.0, False), (1000.0, True)])
+def test_find_best_intents_caches_only_complete_expansions(tmp_path, budget_ms, cached):
+    manager = make_manager(tmp_path, budget_ms)
+    manager.find_best_intents(["holaa buenos", "adioss hasta"])
+    assert (len(manager.result_cache) == 2) is cached
@@ -0,0 +1,53 @@
+"""Recarga en caliente: el corpus nuevo se intercambia completo y uno inválido se rechaza"""
+import json
+
+import pytest
+
+from chatbot.intents_manager import IntentsManager
+
+INTENTS = {"intents": [
+    {"tag": "saludo", "patterns": ["hola buenos dias"], "responses": ["¡Hola!"]}
+]}
+RELOADED = {"intents": [
+    {"tag": "saludo", "patterns": ["hola buenos dias"], "responses": ["¡Hola!"]},
+    {"tag": "despedida", "patterns": ["adios hasta luego"], "responses": ["¡Hasta luego!"]}
+]}
+
+
+@pytest.fixture
+def intents_file(tmp_path):
+    path = tmp_path / "intents.json"
+    path.write_text(json.dumps(INTENTS), encoding="utf-8")
+    return path
+
+
+def test_reload_swaps_the_corpus_and_invalidates_cached_results(intents_file):
+    manager = IntentsManager(str(intents_file))
+    assert manager.find_best_intent("adios hasta luego")["tag"] == "unknown"
+    assert manager.reload_if_changed() is False
+
+    intents_file.write_text(json.dumps(RELOADED), encoding="utf-8")
+    assert manager.reload_if_changed() is True
+
+    # La misma entrada ya no se responde desde la caché de la versión anterior
+    assert manager.find_best_intent("adios hasta luego")["tag"] == "despedida"
+    statistics = manager.get_statistics()
+    assert statistics["intents_version"] == 1
+    assert statistics["intents_reloads"] == 1
+
+
+@pytest.mark.parametrize("content", [
+    "{ no es json",
+    json.dumps({"intents": {}}),
+    json.dumps({"intents": [{"tag": "sin_respuestas", "patterns": ["hola"], "responses": []}]}),
+])
+def test_invalid_file_is_rejected_and_the_previous_version_keeps_serving(intents_file, content):
+    manager = IntentsManager(str(intents_file))
+    intents_file.write_text(content, encoding="utf-8")
+
+    assert manager.reload_intents() is False
+    assert manager.get_statistics()["last_reload_error"]
+    assert manager.get_statistics()["intents_version"] == 0
+    assert manager.find_best_intent("hola buenos dias")["tag"] == "saludo"
+    # La firma rechazada no se reintenta hasta que el archivo vuelva a cambiar
+    assert manager.reload_if_changed() is False
@@ -0,0 +1,51 @@
+"""LRUCache: desalojo del menos usado, contadores e invalidación"""
+import os
+
+from chatbot.intents_manager import IntentsManager
+from chatbot.utils.lru_cache import LRUCache
+
+INTENTS_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "intents.json")
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.get_statistics()["evictions"] == 1
+
+
+def test_overwrite_marks_key_as_recent():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("a", 10)
+    cache.put("c", 3)
+    assert cache.get("a") == 10
+    assert cache.get("b") is None
+
+
+def test_zero_size_disables_cache_and_clear_counts_invalidation():
+    disabled = LRUCache(0)
+    disabled.put("a", 1)
+    assert disabled.get("a") is None
+
+    cache = LRUCache(4)
+    cache.put("a", 1)
+    cache.clear()
+    statistics = cache.get_statistics()
+    assert statistics["size"] == 0 and statistics["invalidations"] == 1
+    assert statistics["hits"] == 0 and statistics["misses"] == 0
+
+
+def test_equivalent_inputs_share_one_cached_result():
+    manager = IntentsManager(INTENTS_FILE)
+    first = manager.find_best_intent("Hola, ¿cuánto dura el curso?")
+    second = manager.find_best_intent("¿cuánto dura el curso? hola")
+
+    assert (second["tag"], second["confidence"]) == (first["tag"], first["confidence"])
+    statistics = manager.get_statistics()["result_cache"]
+    assert (statistics["hits"], statistics["misses"]) == (1, 1)
@@ -0,0 +1,117 @@
+"""Contadores por hilo: no se pierden incrementos ni consultas concurrentes"""
+import os
+import threading
+
+from chatbot.intents_manager import IntentsManager
+from chatbot.utils.metrics import ShardedCounters
+
+INTENTS_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "intents.json")
+
+
+def test_no_updates_lost_under_thread_churn():
+    counters = ShardedCounters(("queries",))
+    stop = threading.Event()
+
+    def reader():
+        # Compacta continuamente mientras los hilos escritores terminan
+        while not stop.is_set():
+            counters.snapshot()
+
+    def writer():
+        for _ in range(200):
+            counters.add("queries")
+
+    reader_thread = threading.Thread(target=reader)
+    reader_thread.start()
+    for _ in range(50):
+        writers = [threading.Thread(target=writer) for _ in range(10)]
+        for thread in writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+    stop.set()
+    reader_thread.join()
+
+    assert counters["queries"] == 50 * 10 * 200
+    # Todos los hilos terminaron: sus shards quedaron en el acumulado
+    assert len(counters._shards) <= 1
+
+
+def test_statistics_count_every_concurrent_query():
+    manager = IntentsManager(INTENTS_FILE)
+    messages = ["hola", "xyzzy", "¿cuánto dura el curso?", "gracias"]
+    confidences = [manager.find_best_intent(message)["confidence"] for message in messages]
+
+    def worker():
+        for _ in range(25):
+            for message in messages:
+                manager.find_best_intent(message)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    statistics = manager.get_statistics()
+    total = len(messages) * (1 + 8 * 25)
+    assert statistics["total_queries"] == total
+    assert statistics["recognized_intents"] + statistics["unknown_intents"] == total
+    assert statistics["average_confidence"] == round(sum(confidences) / len(messages), 3)
+    assert statistics["conversation_log_size"] == manager.MAX_LOG_ENTRIES
+
+
+def _metric(body, name):
+    for line in body.splitlines():
+        if line.startswith(name + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{name} no está en /metrics")
+
+
+def test_metrics_endpoint_exposes_a_histogram_per_stage(client, application):
+    stage_metrics = application.intents_manager.stage_metrics
+    before = stage_metrics.get_statistics().get("total", {}).get("count", 0)
+    for message in ("hola", "adiós", "xyzzy"):
+        assert client.post('/chat', json={'message': message}).status_code == 200
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    count = _metric(body, 'chatbot_stage_latency_seconds_count{stage="total"}')
+    assert count == before + 3
+    assert _metric(body, 'chatbot_stage_latency_seconds_bucket{stage="total",le="+Inf"}') == count
+    for stage in ("preprocess", "retrieval", "scoring", "serialization"):
+        assert _metric(body, f'chatbot_stage_latency_seconds_count{{stage="{stage}"}}') > 0
+    assert _metric(body, "chatbot_queries_total") >= 3
+    # Los snapshots reconstruidos desde contadores planos coinciden con los del proceso
+    assert stage_metrics.snapshots(stage_metrics.values()) == stage_metrics.snapshots()
+
+
+def test_metrics_aggregate_stage_histograms_and_gauges_across_workers(client, application):
+    """En modo pre-fork /metrics suma las filas de todos los workers, responda quien responda"""
+    from chatbot.utils.shared_stats import SharedStatsTable
+
+    manager = application.intents_manager
+    for message in ("hola", "adiós"):
+        assert client.post('/chat', json={'message': message}).status_code == 200
+
+    table = SharedStatsTable(manager.shared_stats_fields(), 2, gauges=manager.SHARED_GAUGES)
+    manager.shared_stats, manager.worker_slot = table, 0
+    try:
+        # Otro worker con los mismos contadores que este
+        table.publish(1, manager._local_counters())
+        local = manager._local_counters()
+        total_count = 'chatbot_stage_latency_seconds_count{stage="total"}'
+
+        body = client.get('/metrics').get_data(as_text=True)
+        assert _metric(body, total_count) == 2 * local["stage_total_count"]
+        assert _metric(body, "chatbot_conversation_log_size") == 2 * local["conversation_log_size"]
+        assert manager.get_statistics()["stage_latency"]["total"]["count"] == 2 * local["stage_total_count"]
+
+        # Al retirar el worker sus histogramas se conservan, pero sus gauges dejan de contar
+        table.retire(1)
+        body = client.get('/metrics').get_data(as_text=True)
+        assert _metric(body, total_count) == 2 * local["stage_total_count"]
+        assert _metric(body, "chatbot_conversation_log_size") == local["conversation_log_size"]
+    finally:
+        manager.shared_stats = None
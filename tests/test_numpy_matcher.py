@@ -0,0 +1,54 @@
+"""El backend numpy debe dar exactamente los mismos scores que el índice de referencia"""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from chatbot.pattern_index import PatternIndex
+from chatbot.matchers import IndexMatcher, PrunedMatcher
+from chatbot.numpy_matcher import NumpyMatcher
+
+INTENTS = {
+    "intents": [
+        {"tag": "a", "patterns": ["alfa beta gamma delta", "alfa epsilon"], "responses": ["A"]},
+        {"tag": "b", "patterns": ["beta gamma zeta", "eta theta"], "responses": ["B"]},
+    ]
+}
+
+
+@pytest.fixture(scope="module")
+def index():
+    return PatternIndex(INTENTS)
+
+
+def test_fuzzy_weights_on_same_pattern_are_bit_identical(index):
+    # Dos tokens parciales caen en el mismo patrón: (1 + 0.1) + 0.3 != 1 + (0.1 + 0.3)
+    query, fuzzy = ("alfa",), {"beta": 0.1, "gamma": 0.3}
+    reference = IndexMatcher(index).retrieve(query, fuzzy)
+    overlaps = NumpyMatcher(index).retrieve(query, fuzzy)
+
+    assert reference[0] == (1 + 0.1) + 0.3
+    for pattern_id, overlap in reference.items():
+        assert overlaps[pattern_id] == overlap
+    assert np.count_nonzero(overlaps) == len(reference)
+
+
+@pytest.mark.parametrize("query, fuzzy", [
+    (("alfa",), None),
+    (("alfa", "eta"), None),
+    (("zeta", "theta", "omega"), None),
+    ((), None),
+    (("alfa",), {"beta": 0.1, "gamma": 0.3}),
+    (("alfa",), {"beta": 0.9, "gamma": 0.7}),
+    (("zeta",), {"beta": 0.7, "gamma": 0.3, "delta": 0.45}),
+    ((), {"beta": 0.1, "gamma": 0.2, "theta": 0.9}),
+    (("alfa", "beta"), None),
+])
+def test_backends_rank_identically(index, query, fuzzy):
+    reference = IndexMatcher(index)
+    expected = reference.select_top(reference.retrieve(query, fuzzy), 3)
+    numpy_matcher = NumpyMatcher(index)
+
+    assert numpy_matcher.top_matches(query, fuzzy, k=3) == expected
+    assert PrunedMatcher(index).top_matches(query, fuzzy, k=3) == expected
+    assert numpy_matcher.best_matches([query], [fuzzy]) == [reference.best_match(query, fuzzy)]
+    assert numpy_matcher.intent_scores(query, fuzzy) == reference.intent_scores(query, fuzzy)
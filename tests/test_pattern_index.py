@@ -0,0 +1,41 @@
+"""El índice compilado debe elegir el mismo patrón y score que el recorrido completo original"""
+import json
+import os
+
+import pytest
+
+from chatbot.pattern_index import PatternIndex
+from chatbot.utils.text_preprocessor import TextPreprocessor
+
+INTENTS_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "intents.json")
+
+
+@pytest.fixture(scope="module")
+def intents():
+    with open(INTENTS_FILE, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def reference_best_match(intents, user_input):
+    """Recorrido de calculate_similarity sobre todos los patrones (gana el primero con mayor score)"""
+    preprocessor = TextPreprocessor()
+    user_words = set(preprocessor.tokenize(preprocessor.full_preprocess(user_input)))
+    best_id, best_score, pattern_id = None, 0.0, 0
+    for intent in intents["intents"]:
+        for pattern in intent["patterns"]:
+            pattern_words = set(preprocessor.tokenize(preprocessor.full_preprocess(pattern)))
+            score = len(user_words & pattern_words) / len(pattern_words) if user_words and pattern_words else 0.0
+            if score > best_score:
+                best_id, best_score = pattern_id, score
+            pattern_id += 1
+    return best_id, min(best_score, 1.0)
+
+
+def test_index_matches_the_full_scan(intents):
+    index = PatternIndex(intents)
+    queries = [pattern for intent in intents["intents"] for pattern in intent["patterns"]]
+    queries += ["", "???", "hola, ¿cuánto dura el curso?", "quiero información de la plataforma y el módulo",
+                "no entiendo nada de esto", "gracias por la ayuda con las tareas"]
+
+    for query in queries:
+        assert index.best_match(index.tokenize(query)) == reference_best_match(intents, query), query
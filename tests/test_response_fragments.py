@@ -0,0 +1,52 @@
+"""Cuerpos precodificados: mismos bytes que serializar la respuesta completa"""
+import json
+
+import pytest
+
+from chatbot.intents_manager import IntentsManager
+from chatbot.response_fragments import encode_json
+from chatbot.response_generator import ResponseGenerator
+
+INTENTS = {"intents": [
+    {"tag": "saludo", "context": "welcome", "patterns": ["hola"], "responses": ["¡Hola! \"Bienvenido\"", "Buenas"]},
+    {"tag": "precio", "context": "cursos", "patterns": ["cuanto cuesta el curso"], "responses": ["Es gratis ✨"]},
+]}
+
+
+@pytest.fixture
+def generator(tmp_path):
+    intents_file = tmp_path / "intents.json"
+    intents_file.write_text(json.dumps(INTENTS), encoding="utf-8")
+    return ResponseGenerator(IntentsManager(str(intents_file)))
+
+
+def test_every_fragment_renders_the_same_bytes_as_the_full_serialization(generator):
+    fragments = generator._fragments_for(generator.intents_manager.corpus)
+    variants = dict(generator._fragment_variants(generator.intents_manager.corpus))
+    assert set(fragments.templates) == set(variants)
+
+    for key, fields in variants.items():
+        body = fragments.render(key, 0.4567, 12)
+        payload = json.loads(body)
+        assert payload == {**fields, "confidence": 0.4567, "input_length": 12, "timestamp": payload["timestamp"]}
+        assert body == encode_json(payload)
+
+
+@pytest.mark.parametrize("user_input", ["hola", "cuanto cuesta", "xyz qwerty"])
+def test_render_response_matches_get_response(generator, user_input):
+    payload = json.loads(generator.render_response(user_input))
+    expected = generator.get_response(user_input)
+    for field in ("tag", "status", "confidence", "context", "input_length", "has_suggestions", "suggestions"):
+        assert payload[field] == expected[field]
+    assert payload.keys() == expected.keys()
+
+
+def test_fragments_follow_the_corpus_version(generator, tmp_path):
+    manager = generator.intents_manager
+    before = generator._fragments_for(manager.corpus)
+    (tmp_path / "intents.json").write_text(json.dumps({"intents": INTENTS["intents"][:1]}), encoding="utf-8")
+    assert manager.reload_intents()
+
+    after = generator._fragments_for(manager.corpus)
+    assert after.generation == manager.corpus.generation != before.generation
+    assert all(key[0] != "precio" for key in after.templates)
@@ -0,0 +1,115 @@
+"""serve.py: workers pre-fork con estadísticas y control de admisión compartidos"""
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import serve
+from config import Config
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER_SCRIPT = """
+import sys
+from config import Config
+Config.CONVERSATIONS_DIR = sys.argv[1]
+Config.COMPILED_INTENTS_FILE = None
+Config.INTENTS_RELOAD_INTERVAL = 0
+Config.STATS_PUBLISH_INTERVAL = 0.1
+Config.ADMISSION_RATE = 0.001
+Config.ADMISSION_BURST = 10
+import serve
+serve.main(["--workers", "2", "--host", "127.0.0.1", "--port", sys.argv[2]])
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def request(port: int, path: str, payload=None):
+    data = json.dumps(payload).encode() if payload is not None else None
+    http_request = urllib.request.Request(f"http://127.0.0.1:{port}{path}", data=data,
+                                          headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(http_request, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+@pytest.fixture
+def server(tmp_path):
+    port = free_port()
+    process = subprocess.Popen([sys.executable, "-c", SERVER_SCRIPT, str(tmp_path / "conversations"), str(port)],
+                               cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            request(port, "/health")
+            break
+        except OSError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                pytest.fail("serve.py no arrancó")
+            time.sleep(0.1)
+    yield port
+    process.send_signal(signal.SIGTERM)
+    process.wait(timeout=10)
+
+
+def metric(text: str, name: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{name} no está en /metrics")
+
+
+def test_statistics_are_summed_across_workers(server):
+    # Menos consultas que ADMISSION_BURST: ninguna se rechaza por tasa
+    for _ in range(8):
+        assert request(server, "/chat", {"message": "hola"})[0] == 200
+    # Las filas de los demás workers se publican cada STATS_PUBLISH_INTERVAL
+    time.sleep(0.3)
+
+    for _ in range(4):
+        _, body = request(server, "/stats")
+        statistics = body["statistics"]
+        assert statistics["workers"]["count"] == 2
+        assert statistics["total_queries"] == 8
+        assert statistics["stage_latency"]["total"]["count"] == 8
+
+        with urllib.request.urlopen(f"http://127.0.0.1:{server}/metrics", timeout=5) as response:
+            text = response.read().decode()
+        assert metric(text, "chatbot_queries_total") == 8
+        assert metric(text, 'chatbot_stage_latency_seconds_count{stage="total"}') == 8
+
+
+def test_rate_limit_is_shared_by_all_workers(server):
+    statuses = [request(server, "/chat", {"message": "hola"})[0] for _ in range(14)]
+    assert statuses.count(200) == 10
+    assert statuses.count(429) == 4
+
+    _, body = request(server, "/stats")
+    admission = body["statistics"]["admission"]
+    assert admission["workers"] == 2
+    assert admission["admitted"] == 10 and admission["rate_limited"] == 4
+    assert admission["in_flight"] == 0
+
+
+def test_concurrency_thresholds_scale_to_the_worker_count(monkeypatch):
+    monkeypatch.setattr(Config, "ADMISSION_MAX_CONCURRENT", 32)
+    monkeypatch.setattr(Config, "ADMISSION_DEGRADE_AT", 24)
+    controller = serve.create_admission(4)
+    assert (controller.max_concurrent, controller.degrade_at, controller.workers) == (4, 3, 4)
+    monkeypatch.setattr(Config, "ADMISSION_DEGRADE_AT", 0)
+    assert serve.create_admission(4).degrade_at == 0
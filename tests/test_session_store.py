@@ -0,0 +1,57 @@
+"""El contador de sesiones activas se mantiene al ocupar y liberar registros, sin recorrer la tabla"""
+from chatbot.utils.session_store import SessionStore
+
+
+def scan_occupied(store):
+    return sum(
+        1 for slot in range(store.capacity)
+        if store._prefix.unpack_from(store._mmap, store._offset(slot))[0]
+    )
+
+
+def test_active_count_follows_create_evict_and_expire(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("chatbot.utils.session_store.time.time", lambda: clock[0])
+    store = SessionStore(max_sessions=16, ttl=60.0)
+
+    for index in range(100):
+        store.record(f"sesion-{index}", "saludo")
+        store.record(f"sesion-{index}", "despedida")
+    assert store.active_sessions() == scan_occupied(store) == store.capacity
+    assert store.get_statistics()["evictions"] > 0
+
+    # Una sesión expirada se libera al leerla
+    clock[0] += 120.0
+    assert store.get("sesion-99") is None
+    assert store.active_sessions() == scan_occupied(store) == store.capacity - 1
+
+    store.clear()
+    assert store.active_sessions() == scan_occupied(store) == 0
+    assert "occupied" not in store.get_statistics()
+
+
+def test_history_keeps_most_recent_tag_first_without_duplicates():
+    store = SessionStore(max_sessions=16, ttl=60.0, history=3)
+    for tag in ("saludo", "cursos", "saludo", "precios", "horario"):
+        store.record("sesion", tag)
+    state = store.get("sesion")
+    assert state.turns == 5
+    assert state.recent_tags == tuple(SessionStore.tag_key(tag) for tag in ("horario", "precios", "saludo"))
+    assert store.get("otra") is None
+    assert store.get(None) is None
+
+
+def test_repeated_intent_does_not_repeat_the_last_response(tmp_path):
+    import json
+
+    from chatbot.intents_manager import IntentsManager
+    from chatbot.response_generator import ResponseGenerator
+
+    intents_file = tmp_path / "intents.json"
+    intents_file.write_text(json.dumps({"intents": [
+        {"tag": "chiste", "context": "humor", "patterns": ["cuentame un chiste"], "responses": ["uno", "dos"]}
+    ]}), encoding="utf-8")
+    generator = ResponseGenerator(IntentsManager(str(intents_file)), SessionStore(max_sessions=16))
+
+    responses = [generator.get_response("cuentame un chiste", "sesion")["response"] for _ in range(6)]
+    assert all(previous != current for previous, current in zip(responses, responses[1:]))
@@ -0,0 +1,39 @@
+"""SharedStatsTable: suma de filas por worker, fila de retirados y niveles (gauges) que no se acumulan"""
+import os
+
+from chatbot.utils.shared_stats import SharedStatsTable
+
+FIELDS = ("total_queries", "confidence_sum", "queue_size")
+
+
+def test_totals_sum_live_and_retired_workers():
+    table = SharedStatsTable(FIELDS, 3, gauges=("queue_size",))
+    table.publish(0, {"total_queries": 5, "confidence_sum": 1.25, "queue_size": 2})
+    table.publish(1, {"total_queries": 7, "confidence_sum": 0.5, "queue_size": 3})
+
+    rows = table.rows()
+    assert [row["pid"] for row in rows] == [os.getpid()] * 2
+    assert table.read(2) is None
+    assert table.totals() == {"total_queries": 12, "confidence_sum": 1.75, "queue_size": 5}
+
+    # El worker 1 termina: sus contadores se conservan, su nivel de cola deja de sumarse
+    table.retire(1)
+    assert table.read(1) is None
+    assert table.totals() == {"total_queries": 12, "confidence_sum": 1.75, "queue_size": 2}
+
+    # Su reemplazo empieza de cero en la misma fila
+    table.publish(1, {"total_queries": 1, "confidence_sum": 0.25, "queue_size": 1})
+    assert table.totals() == {"total_queries": 13, "confidence_sum": 2.0, "queue_size": 3}
+
+
+def test_rows_are_visible_across_fork():
+    table = SharedStatsTable(FIELDS, 2)
+    pid = os.fork()
+    if pid == 0:
+        table.publish(1, {"total_queries": 3, "confidence_sum": 0.75, "queue_size": 0})
+        os._exit(0)
+    os.waitpid(pid, 0)
+
+    row = table.read(1)
+    assert row["pid"] == pid
+    assert (row["total_queries"], row["confidence_sum"]) == (3, 0.75)
@@ -0,0 +1,45 @@
+"""/chat/stream: metadata primero, el texto en fragmentos y un evento final"""
+import json
+
+import pytest
+
+from chatbot.response_generator import ResponseGenerator
+
+
+def read_events(response):
+    events = []
+    for block in response.get_data(as_text=True).split("\n\n"):
+        if block:
+            event_line, data_line = block.split("\n")
+            events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    return events
+
+
+def test_stream_sends_meta_then_chunks_then_done(client):
+    response = client.post("/chat/stream", json={"message": "hola"})
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+
+    events = read_events(response)
+    names = [name for name, _ in events]
+    assert names[0] == "meta" and names[-1] == "done"
+    assert set(names[1:-1]) == {"chunk"}
+
+    meta = events[0][1]
+    assert meta["status"] == "success" and meta["tag"] == "saludo"
+    assert "response" not in meta
+    text = "".join(data["text"] for name, data in events if name == "chunk")
+    assert len(text) == events[-1][1]["response_length"] == meta["response_length"]
+
+
+def test_empty_message_is_an_error_event(client):
+    events = read_events(client.post("/chat/stream", json={"message": "  "}))
+    assert [name for name, _ in events] == ["error"]
+
+
+@pytest.mark.parametrize("size", [1, 5, 17, 80, 1000])
+def test_chunks_rejoin_to_the_text_and_respect_the_size(size):
+    text = "Hola, soy el asistente.\nPuedo ayudarte con cursos, precios y horarios de atención."
+    chunks = list(ResponseGenerator.split_chunks(text, size))
+    assert "".join(chunks) == text
+    assert all(0 < len(chunk) <= size for chunk in chunks)
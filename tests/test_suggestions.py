@@ -0,0 +1,65 @@
+"""Top-k: la poda da el mismo ranking que el recorrido completo y alimenta "¿Quisiste decir...?\""""
+import json
+import random
+
+import pytest
+
+from chatbot.intents_manager import IntentsManager
+from chatbot.matchers import IndexMatcher, PrunedMatcher
+from chatbot.pattern_index import PatternIndex
+from chatbot.response_generator import ResponseGenerator
+
+INTENTS = {"intents": [
+    {"tag": "saludo", "patterns": ["hola buenos dias"], "responses": ["¡Hola!"]},
+    {"tag": "curso_duracion", "patterns": ["duracion total curso propedeutico"], "responses": ["Seis semanas."]},
+    {"tag": "curso_costo", "patterns": ["costo total curso propedeutico"], "responses": ["Es gratuito."]}
+]}
+
+
+def synthetic_intents(rng, n_intents=60, vocabulary=40):
+    # Palabras con frecuencia tipo Zipf: unas pocas aparecen en casi todos los patrones
+    words = [f"w{i}" for i in range(vocabulary)]
+    weights = [1 / (rank + 1) for rank in range(vocabulary)]
+    return {"intents": [
+        {"tag": f"t{i}", "responses": ["r"],
+         "patterns": [" ".join(rng.choices(words, weights, k=rng.randint(1, 6))) for _ in range(rng.randint(1, 5))]}
+        for i in range(n_intents)
+    ]}, words
+
+
+def test_pruned_top_k_matches_the_exhaustive_scan():
+    rng = random.Random(7)
+    intents, words = synthetic_intents(rng)
+    index = PatternIndex(intents)
+    reference, pruned = IndexMatcher(index), PrunedMatcher(index)
+
+    for _ in range(300):
+        query = tuple(rng.sample(words, rng.randint(1, 5)))
+        fuzzy = {word: round(rng.uniform(0.6, 0.9), 2) for word in rng.sample(words, 2)} if rng.random() < 0.3 else None
+        for k, min_score in ((1, 0.0), (3, 0.0), (3, 0.25)):
+            expected = reference.select_top(reference.retrieve(query, fuzzy), k, min_score)
+            assert pruned.top_matches(query, fuzzy, k, min_score) == expected, (query, fuzzy, k)
+        assert pruned.best_match(query, fuzzy) == reference.best_match(query, fuzzy)
+
+
+@pytest.fixture
+def generator(tmp_path):
+    intents_file = tmp_path / "intents.json"
+    intents_file.write_text(json.dumps(INTENTS), encoding="utf-8")
+    manager = IntentsManager(str(intents_file), min_confidence=0.3, max_suggestions=2,
+                             suggestion_min_confidence=0.25)
+    return ResponseGenerator(manager)
+
+
+def test_unrecognized_input_suggests_the_closest_intents(generator):
+    response = generator.get_response("propedeutico")
+    assert response["status"] == "unknown"
+    assert [suggestion["tag"] for suggestion in response["suggestions"]] == ["curso_duracion", "curso_costo"]
+    assert "¿Quisiste decir: **duracion total curso propedeutico** o **costo total curso propedeutico**?" \
+        in response["response"]
+
+
+def test_no_suggestions_below_the_minimum_confidence(generator):
+    response = generator.get_response("xyzzy")
+    assert response["status"] == "unknown"
+    assert response["suggestions"] == []
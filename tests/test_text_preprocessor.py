@@ -0,0 +1,20 @@
+"""preprocess_tokens debe producir exactamente lo mismo que full_preprocess + tokenize"""
+import pytest
+
+from chatbot.utils.text_preprocessor import TextPreprocessor
+
+TEXTS = [
+    "", "   ", "¡Hola! ¿Cómo estás?", "ÁRBOL   Ñandú\tpingüino\n", "El CURSO de la plataforma",
+    "éxito y café",  # acentos como marcas combinantes
+    "ΟΔΥΣΣΕΥΣ σοφός", "ﬁnal ① ½ ＡＢＣ", "İstanbul straße", "no separado aquí", "tab​cero",
+]
+# Todos los puntos de código de los planos latino, griego, cirílico, puntuación y formas de ancho completo
+CODE_POINT_BLOCKS = [range(start, start + 256) for start in range(0, 0x3000, 256)] + [range(0xFF00, 0x10000)]
+
+
+@pytest.mark.parametrize("remove_stopwords", [True, False])
+def test_fused_path_matches_the_reference_pipeline(remove_stopwords):
+    texts = TEXTS + [" ".join(f"a{chr(c)}b {chr(c)}" for c in block) for block in CODE_POINT_BLOCKS]
+    for text in texts:
+        expected = tuple(TextPreprocessor.tokenize(TextPreprocessor.full_preprocess(text, remove_stopwords)))
+        assert TextPreprocessor.preprocess_tokens(text, remove_stopwords) == expected, repr(text)